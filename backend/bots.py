@@ -0,0 +1,250 @@
+"""
+Server-side AI players.
+
+`Knowledge` tracks, per room, what anyone at the table can infer about who
+holds which card. It is updated incrementally from the public messages the room
+broadcasts (asks, answers, passes, laydowns), never from hidden hands. `decide`
+turns a bot's `BotView` (its own hand plus that public knowledge) into the
+message a human client would have sent. It is a pure function on plain values,
+so it can run in a thread or process pool (see services/bot_service.py).
+"""
+from __future__ import annotations
+import random
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Tuple
+
+from cards import CARD_RANK, DECK_SIZE, SET_TYPES, SUITS, derive_seed, ids_of, mask_of_dicts, ranks_mask, set_mask
+
+if TYPE_CHECKING:
+    from game import Game
+
+# (suit, set_type, mask) for the 8 half-suits
+HALF_SUITS: List[Tuple[str, str, int]] = [(s, t, set_mask(s, t)) for s in SUITS for t in SET_TYPES]
+# card id -> mask of its half-suit
+CARD_SET: Tuple[int, ...] = tuple(next(m for _, _, m in HALF_SUITS if m >> cid & 1) for cid in range(DECK_SIZE))
+
+# How much more likely a player is to hold a card of a half-suit they asked for
+ASKED_SET_WEIGHT = 3.0
+
+
+class Knowledge:
+    """Public card-location knowledge for one room"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.holds: Dict[str, int] = {}     # pid -> cards known to be in the hand
+        self.lacks: Dict[str, int] = {}     # pid -> cards known not to be in the hand
+        self.asked_sets: Dict[str, int] = {}  # pid -> half-suits they asked for (so hold a card of)
+        self.out = 0                        # cards laid down on the table
+
+    def _gain(self, pid: str, mask: int):
+        for other in set(self.holds) | set(self.lacks):
+            if other != pid:
+                self.holds[other] = self.holds.get(other, 0) & ~mask
+                self.lacks[other] = self.lacks.get(other, 0) | mask
+        self.holds[pid] = self.holds.get(pid, 0) | mask
+        self.lacks[pid] = self.lacks.get(pid, 0) & ~mask
+
+    def _lose(self, pid: str, mask: int):
+        self.holds[pid] = self.holds.get(pid, 0) & ~mask
+        self.lacks[pid] = self.lacks.get(pid, 0) | mask
+
+    def observe(self, type_: str, payload: Optional[dict]):
+        """Update from one broadcast message (unknown types are ignored)"""
+        p = payload or {}
+        if type_ in ("new_game_started", "back_to_lobby_success", "game_aborted"):
+            self.reset()
+        elif type_ == "ask_started":
+            pid = p["asker_id"]
+            self.asked_sets[pid] = self.asked_sets.get(pid, 0) | set_mask(p["suit"], p["set_type"])
+        elif type_ == "ask_result" and p.get("reason") != "target_empty":
+            moved = mask_of_dicts(p.get("transferred"))
+            if moved:
+                self._lose(p["target_id"], moved)
+                self._gain(p["asker_id"], moved)
+            if p.get("suit") and p.get("ranks"):
+                self._lose(p["target_id"], ranks_mask(p["suit"], p["ranks"]) & ~moved)
+        elif type_ == "cards_passed":
+            moved = mask_of_dicts(p.get("cards"))
+            self._lose(p["from_player"], moved)
+            self._gain(p["to_player"], moved)
+        elif type_ == "laydown_result":
+            gone = set_mask(p["suit"], p["set_type"])
+            self.out |= gone
+            for pid in self.holds:
+                self.holds[pid] &= ~gone
+            for pid in self.asked_sets:
+                self.asked_sets[pid] &= ~gone
+
+
+class BotView(NamedTuple):
+    """Everything one bot may use to decide; plain values only so it can be pickled"""
+    me: str
+    seed: int                 # decisions are reproducible for a given seed
+    phase: str
+    turn_player: Optional[str]
+    dealer: Optional[str]
+    hand: int                 # the bot's own hand mask
+    teams: Dict[str, str]     # seated pid -> team
+    counts: Dict[str, int]    # seated pid -> number of cards (public)
+    holds: Dict[str, int]
+    lacks: Dict[str, int]
+    asked_sets: Dict[str, int]
+    out: int
+    vote_back_to_lobby: bool  # a back-to-lobby vote is open and this bot has not voted
+    vote_abort: bool          # same for an abort vote
+
+
+Decision = Tuple[str, dict]  # (message type, payload) as a client would send it
+
+
+def is_bot(game: "Game", player_id: Optional[str]) -> bool:
+    player = game.state.players.get(player_id) if player_id else None
+    return bool(player and player.is_ai)
+
+
+def next_to_act(game: "Game") -> Optional[str]:
+    """The bot that has something to do in this room right now, if any"""
+    s = game.state
+    for pid, player in s.players.items():
+        if not player.is_ai or player.seat is None:
+            continue
+        if s.phase == "playing" and s.abort_votes and pid not in s.abort_votes:
+            return pid
+        if s.back_to_lobby_votes and pid not in s.back_to_lobby_votes:
+            return pid
+    if s.phase == "ready" and is_bot(game, s.current_dealer):
+        return s.current_dealer
+    if s.phase != "playing" or s.turn_player not in s.players:
+        return None
+    turn_team = s.players[s.turn_player].team
+    if not game.team_has_cards(turn_team):
+        # The team to play has no cards left: the other team lays down what remains
+        return next((pid for pid in s.seats.values() if pid and is_bot(game, pid) and game.hand_mask(pid)), None)
+    if is_bot(game, s.turn_player):
+        return s.turn_player
+    return None
+
+
+def view_for(game: "Game", bot_id: str, knowledge: Knowledge) -> BotView:
+    """What `bot_id` may see: its own hand, public counts and the room's public knowledge"""
+    s = game.state
+    seated = [pid for pid in s.seats.values() if pid]
+    return BotView(
+        me=bot_id,
+        seed=derive_seed(game.seed, "bot", bot_id, game.events.seq),
+        phase=s.phase,
+        turn_player=s.turn_player,
+        dealer=s.current_dealer,
+        hand=game.hand_mask(bot_id),
+        teams={pid: s.players[pid].team for pid in seated},
+        counts={pid: game.cards_held(pid) for pid in seated},
+        holds=dict(knowledge.holds),
+        lacks=dict(knowledge.lacks),
+        asked_sets=dict(knowledge.asked_sets),
+        out=knowledge.out,
+        vote_back_to_lobby=bool(s.back_to_lobby_votes) and bot_id not in s.back_to_lobby_votes,
+        vote_abort=s.phase == "playing" and bool(s.abort_votes) and bot_id not in s.abort_votes,
+    )
+
+
+def _holder_odds(view: BotView, cid: int, players: List[str]) -> Dict[str, float]:
+    """Probability that each of `players` (everyone else with cards) holds card `cid`"""
+    bit = 1 << cid
+    for pid, known in view.holds.items():
+        if known & bit:
+            return {q: float(q == pid) for q in players}
+    weights: Dict[str, float] = {}
+    for pid in players:
+        free = view.counts[pid] - bin(view.holds.get(pid, 0)).count("1")
+        if free <= 0 or view.lacks.get(pid, 0) & bit:
+            weights[pid] = 0.0
+            continue
+        asked = view.asked_sets.get(pid, 0) & CARD_SET[cid]
+        weights[pid] = free * (ASKED_SET_WEIGHT if asked else 1.0)
+    total = sum(weights.values())
+    return {q: (w / total if total else 0.0) for q, w in weights.items()}
+
+
+def _laydown(view: BotView, others: List[str], team: List[str], must: bool) -> Optional[Decision]:
+    """
+    Lay down a half-suit the team is known to hold. With `must` (no opponent
+    can hold the missing cards) take the likeliest split, however unlikely.
+    """
+    best: Optional[Tuple[float, str, str, Dict[str, int]]] = None
+    for suit, set_type, m in HALF_SUITS:
+        if not view.hand & m or view.out & m:
+            continue
+        chance, split = 1.0, {}
+        for cid in ids_of(m & ~view.hand):
+            odds = _holder_odds(view, cid, team if must else others)
+            pid = max(odds, key=odds.get) if odds else None
+            if pid is None or pid not in team:
+                chance = 0.0
+                break
+            chance *= odds[pid]
+            split[pid] = split.get(pid, 0) | (1 << cid)
+        if chance >= 1.0 or (must and (best is None or chance > best[0])):
+            best = (chance, suit, set_type, split)
+            if chance >= 1.0:
+                break
+    if best is None:
+        return None
+    _, suit, set_type, split = best
+    collaborators = [{"player_id": pid, "ranks": [CARD_RANK[c] for c in ids_of(mask)]} for pid, mask in split.items()]
+    return "laydown", {"who_id": view.me, "suit": suit, "set_type": set_type, "collaborators": collaborators}
+
+
+def _ask(view: BotView, opponents: List[str], others: List[str], rng: random.Random) -> Optional[Decision]:
+    """Ask the opponent most likely to hold a card missing from one of our half-suits"""
+    candidates: List[Tuple[float, float, str, str, str, str]] = []
+    for suit, set_type, m in HALF_SUITS:
+        if not view.hand & m or view.out & m:
+            continue
+        for cid in ids_of(m & ~view.hand):
+            odds = _holder_odds(view, cid, others)
+            for pid in opponents:
+                if odds.get(pid):
+                    candidates.append((odds[pid], rng.random(), pid, suit, set_type, CARD_RANK[cid]))
+    if not candidates:
+        return None
+    _, _, target, suit, set_type, rank = max(candidates)
+    return "ask", {"asker_id": view.me, "target_id": target, "suit": suit, "set_type": set_type, "ranks": [rank]}
+
+
+def decide(view: BotView) -> Optional[Decision]:
+    """What the bot does next, or None when it has nothing to do"""
+    if view.vote_abort:
+        return "vote_abort", {"voter_id": view.me, "vote": True}
+    if view.vote_back_to_lobby:
+        return "vote_back_to_lobby", {"voter_id": view.me, "vote": True}
+    if view.phase == "ready" and view.dealer == view.me:
+        return "shuffle_deal", {"dealer_id": view.me}
+    if view.phase != "playing" or view.turn_player not in view.teams:
+        return None
+
+    my_team = view.teams.get(view.me)
+    others = [pid for pid, n in view.counts.items() if pid != view.me and n > 0]
+    team = [pid for pid in others if view.teams.get(pid) == my_team]
+    opponents = [pid for pid in others if view.teams.get(pid) != my_team]
+
+    if view.turn_player != view.me:
+        # Not our turn, but the other team ran out of cards: lay down what is left
+        if view.hand and not opponents and view.teams[view.turn_player] != my_team:
+            return _laydown(view, others, team, must=True)
+        return None
+
+    if not view.hand:
+        # Our turn but nothing left to play with (after a laydown): pass the turn on
+        if not team:
+            return None
+        to_id = max(team, key=lambda pid: view.counts[pid])
+        return "handoff_after_laydown", {"who_id": view.me, "to_id": to_id}
+
+    decision = _laydown(view, others, team, must=False)
+    if decision is None and opponents:
+        decision = _ask(view, opponents, others, random.Random(view.seed))
+    if decision is None:
+        decision = _laydown(view, others, team, must=True)
+    return decision
@@ -0,0 +1,165 @@
+"""
+Compact card encoding used by the game engine.
+
+Every card has an integer id (suit-major: hearts 2..A, diamonds 2..A, ...) and a
+hand is an int bitmask over those ids, so membership, "any card of this
+half-suit" and transfers between hands are single bitwise operations. Pydantic
+`Card` objects only appear at the API edge (`to_cards` / `mask_of`).
+"""
+from __future__ import annotations
+import hashlib
+import random
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from models import Card, Suit
+
+RANKS_LOWER = ["2", "3", "4", "5", "6", "7"]
+RANKS_UPPER = ["8", "9", "10", "J", "Q", "K", "A"]
+RANKS = RANKS_LOWER + RANKS_UPPER
+SUITS: List[Suit] = ["hearts", "diamonds", "clubs", "spades"]
+SET_TYPES = ["lower", "upper"]
+
+DECK_SIZE = len(SUITS) * len(RANKS)
+FULL_DECK_MASK = (1 << DECK_SIZE) - 1
+
+SUIT_INDEX: Dict[str, int] = {s: i for i, s in enumerate(SUITS)}
+RANK_INDEX: Dict[str, int] = {r: i for i, r in enumerate(RANKS)}
+
+CARD_SUIT: Tuple[str, ...] = tuple(s for s in SUITS for _ in RANKS)
+CARD_RANK: Tuple[str, ...] = tuple(r for _ in SUITS for r in RANKS)
+
+# Shared, never-mutated Card instances, one per id
+_CARDS: Tuple[Card, ...] = tuple(Card(suit=CARD_SUIT[i], rank=CARD_RANK[i]) for i in range(DECK_SIZE))
+_CARD_DICTS: Tuple[dict, ...] = tuple({"suit": CARD_SUIT[i], "rank": CARD_RANK[i]} for i in range(DECK_SIZE))
+
+
+def card_id(suit: str, rank: str) -> int:
+    return SUIT_INDEX[suit] * len(RANKS) + RANK_INDEX[rank]
+
+
+def _half_suit_mask(suit: str, set_type: str) -> int:
+    ranks = RANKS_LOWER if set_type == "lower" else RANKS_UPPER
+    mask = 0
+    for r in ranks:
+        mask |= 1 << card_id(suit, r)
+    return mask
+
+
+# (suit, set_type) -> mask of the 6/7 cards in that half-suit
+SET_MASKS: Dict[Tuple[str, str], int] = {(s, t): _half_suit_mask(s, t) for s in SUITS for t in SET_TYPES}
+# Bit index of each half-suit in a "claimed sets" mask (8 bits)
+SET_INDEX: Dict[Tuple[str, str], int] = {key: i for i, key in enumerate(SET_MASKS)}
+ALL_SETS_CLAIMED = (1 << len(SET_INDEX)) - 1
+
+
+def set_mask(suit: str, set_type: str) -> int:
+    return SET_MASKS[(suit, set_type)]
+
+
+def ranks_mask(suit: str, ranks: Iterable[str]) -> int:
+    """Mask of the given ranks within one suit; unknown ranks are ignored"""
+    base = SUIT_INDEX[suit] * len(RANKS)
+    mask = 0
+    for r in ranks:
+        idx = RANK_INDEX.get(r)
+        if idx is not None:
+            mask |= 1 << (base + idx)
+    return mask
+
+
+def mask_of(cards: Iterable[Card]) -> int:
+    mask = 0
+    for c in cards:
+        mask |= 1 << card_id(c.suit, c.rank)
+    return mask
+
+
+def mask_of_dicts(cards: Optional[List[dict]]) -> int:
+    """Bitmask of cards given as {"suit", "rank"} dicts (as they appear in payloads and state)"""
+    mask = 0
+    for c in cards or []:
+        mask |= 1 << card_id(c["suit"], c["rank"])
+    return mask
+
+
+def ids_of(mask: int) -> List[int]:
+    """Card ids set in `mask`, ascending"""
+    ids = []
+    while mask:
+        low = mask & -mask
+        ids.append(low.bit_length() - 1)
+        mask ^= low
+    return ids
+
+
+def to_cards(mask: int) -> List[Card]:
+    return [_CARDS[i] for i in ids_of(mask)]
+
+
+def to_dicts(mask: int) -> List[dict]:
+    return [dict(_CARD_DICTS[i]) for i in ids_of(mask)]
+
+
+def card_of(cid: int) -> Card:
+    return _CARDS[cid]
+
+
+def card_dict(cid: int) -> dict:
+    return dict(_CARD_DICTS[cid])
+
+
+def rank_list(mask: int) -> List[str]:
+    return [CARD_RANK[i] for i in ids_of(mask)]
+
+
+# ---------------- Shuffling ----------------
+def derive_seed(seed: int, *parts: object) -> int:
+    """Stable 64-bit seed derived from `seed` and `parts` (same inputs -> same seed on any host)"""
+    text = ":".join(str(p) for p in (seed, *parts))
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def shuffled_deck(seed: int) -> List[int]:
+    """Card ids in the order produced by shuffling with `seed`"""
+    deck = list(range(DECK_SIZE))
+    random.Random(seed).shuffle(deck)
+    return deck
+
+
+def precompute_shuffles(seed: int, count: int) -> Iterator[Tuple[int, List[int]]]:
+    """
+    `count` (deal seed, deck) pairs generated up front, e.g. for load tests that
+    should not pay for shuffling while measuring. Feed to Game(shuffles=...).
+    """
+    rng = random.Random(seed)
+    seeds = [rng.getrandbits(64) for _ in range(count)]
+    return iter([(s, shuffled_deck(s)) for s in seeds])
+
+
+# ---------------- Dealing ----------------
+SEAT_COUNT = 6
+
+
+def deal(deck: List[int], seats: Dict[int, Optional[str]], start_seat: int = 0) -> Tuple[Dict[str, int], List[dict]]:
+    """
+    Deal `deck` (top card = last element) one card at a time, clockwise from
+    `start_seat`, skipping empty seats. Returns each seated player's hand mask
+    and the dealing sequence for the animation, both from the same single pass
+    so the animation always shows the real deal.
+    """
+    order = [(seat, seats[seat]) for seat in ((start_seat + i) % SEAT_COUNT for i in range(SEAT_COUNT)) if seats.get(seat)]
+    hands = {pid: 0 for _, pid in order}
+    sequence: List[dict] = []
+    if not order:
+        return hands, sequence
+    n = len(order)
+    for i, cid in enumerate(reversed(deck)):
+        seat, pid = order[i % n]
+        hands[pid] |= 1 << cid
+        sequence.append({
+            "seat": seat,
+            "player_id": pid,
+            "round": i // n,
+            "card": card_dict(cid),
+            "from_seat": None,  # animation origin handled on frontend
+        })
+    return hands, sequence
@@ -1,3 +1,4 @@
-from .logging import setup_logging
+from .logging import AUDIT, CHANNEL_AUDIT, CHANNEL_GAME, CHANNEL_WEBSOCKET, flush_logging, setup_logging
+from . import settings
 
-__all__ = ["setup_logging"]
+__all__ = ["setup_logging", "flush_logging", "settings", "AUDIT", "CHANNEL_AUDIT", "CHANNEL_GAME", "CHANNEL_WEBSOCKET"]
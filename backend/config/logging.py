@@ -1,67 +1,178 @@
 from __future__ import annotations
+import copy
+import queue
 import sys
+import threading
 from pathlib import Path
+from typing import Optional
 from loguru import logger
 
-def setup_logging():
-    """Configure loguru logging for the application"""
-    
-    # Remove default handler
-    logger.remove()
-    
-    # Create logs directory if it doesn't exist
-    logs_dir = Path("logs")
-    logs_dir.mkdir(exist_ok=True)
-    
+from . import settings
+
+# Modules pick the file they log to with `logger = logger.bind(channel=...)`;
+# sinks route on that field instead of scanning every message
+CHANNEL_WEBSOCKET = "websocket"
+CHANNEL_GAME = "game"
+CHANNEL_AUDIT = "audit"
+
+# Card-move audit records (Game._audit_hands) use their own level below TRACE,
+# so no ordinary sink takes them and, unless AUDIT_LOG adds the audit sink,
+# they are never even formatted
+AUDIT = "AUDIT"
+try:
+    logger.level(AUDIT)
+except ValueError:
+    logger.level(AUDIT, no=3)
+
+FILE_FORMAT = "{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}"
+
+
+def _channel(name: str):
+    return lambda record: record["extra"].get("channel") == name
+
+
+class _BackgroundWriter:
+    """
+    Takes logging off the event loop: the app's logger has a single sink that
+    hands each record to a queue, and a thread writes it to the real sinks,
+    which live on a private copy of the logger.
+    """
+
+    def __init__(self):
+        self.logger = copy.deepcopy(logger)
+        self.queue: queue.Queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def sink(self, message):
+        self.queue.put(message.record)
+
+    def _run(self):
+        while True:
+            record = self.queue.get()
+            try:
+                if record is None:
+                    return
+                # Re-emit with the original record (time, caller, extra, exception) in place
+                self.logger.patch(lambda r: r.update(record)).log(record["level"].name, "")
+            except Exception as e:
+                print(f"Log writer failed: {e}", file=sys.stderr)
+            finally:
+                self.queue.task_done()
+
+    def flush(self):
+        self.queue.join()
+
+    def stop(self):
+        self.queue.put(None)
+        self.thread.join()
+        self.logger.remove()
+
+
+_writer: Optional[_BackgroundWriter] = None
+
+
+def _add_sinks(target, logs_dir: Path):
+    file_level = settings.LOG_FILE_LEVEL
+
     # Console logging with colors
-    logger.add(
+    target.add(
         sys.stdout,
         format="<green>{time:YYYY-MM-DD HH:mm:ss}</green> | <level>{level: <8}</level> | <cyan>{name}</cyan>:<cyan>{function}</cyan>:<cyan>{line}</cyan> - <level>{message}</level>",
-        level="INFO",
+        level=settings.LOG_CONSOLE_LEVEL,
         colorize=True
     )
-    
+
     # File logging for all levels
-    logger.add(
+    target.add(
         logs_dir / "app.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level="DEBUG",
+        format=FILE_FORMAT,
+        level=file_level,
         rotation="10 MB",
         retention="7 days",
         compression="zip"
     )
-    
+
     # Separate file for errors only
-    logger.add(
+    target.add(
         logs_dir / "errors.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
+        format=FILE_FORMAT,
         level="ERROR",
         rotation="5 MB",
         retention="30 days",
         compression="zip"
     )
-    
+
     # WebSocket specific logging
-    logger.add(
+    target.add(
         logs_dir / "websocket.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level="DEBUG",
+        format=FILE_FORMAT,
+        level=file_level,
         rotation="5 MB",
         retention="3 days",
         compression="zip",
-        filter=lambda record: "websocket" in record["name"].lower() or "ws" in record["message"].lower()
+        filter=_channel(CHANNEL_WEBSOCKET)
     )
-    
+
     # Game logic specific logging
-    logger.add(
+    target.add(
         logs_dir / "game.log",
-        format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
-        level="DEBUG",
+        format=FILE_FORMAT,
+        level=file_level,
         rotation="5 MB",
         retention="7 days",
         compression="zip",
-        filter=lambda record: "game" in record["name"].lower() or any(keyword in record["message"].lower() for keyword in ["laydown", "ask", "pass", "deal", "shuffle"])
+        filter=_channel(CHANNEL_GAME)
     )
-    
+
+    # Card moves, one JSON line per action
+    if settings.AUDIT_LOG:
+        target.add(
+            logs_dir / "audit.log",
+            format="{time:YYYY-MM-DD HH:mm:ss.SSS} | {message}",
+            level=AUDIT,
+            rotation="10 MB",
+            retention="3 days",
+            compression="zip",
+            filter=_channel(CHANNEL_AUDIT)
+        )
+
+
+def setup_logging(subdir: str | None = None):
+    """Configure loguru logging for the application"""
+    global _writer
+
+    # Remove default handler
+    logger.remove()
+    if _writer is not None:
+        _writer.stop()
+        _writer = None
+
+    # Create logs directory if it doesn't exist; each process of a sharded
+    # deployment writes its own files so rotation does not collide
+    logs_dir = Path("logs")
+    if subdir is None and settings.WORKER_COUNT > 1:
+        subdir = f"worker-{settings.WORKER_INDEX}"
+    if subdir:
+        logs_dir = logs_dir / subdir
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    if settings.LOG_ASYNC:
+        _writer = _BackgroundWriter()
+        _add_sinks(_writer.logger, logs_dir)
+        # Only as verbose as the most verbose real sink, so e.g. debug calls
+        # return before formatting when every sink is above DEBUG
+        levels = [settings.LOG_FILE_LEVEL, settings.LOG_CONSOLE_LEVEL] + ([AUDIT] if settings.AUDIT_LOG else [])
+        level = min(logger.level(name).no for name in levels)
+        logger.add(_writer.sink, format=lambda record: "", level=level)  # the writer formats
+    else:
+        _add_sinks(logger, logs_dir)
+
     logger.info("Logging configured successfully")
     return logger
+
+
+def flush_logging():
+    """Wait until every queued record is written. Call on shutdown."""
+    if _writer is not None:
+        _writer.flush()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import os
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# ---------------- WebSocket fan-out ----------------
+# Max frames waiting for a single socket before it is considered too slow and kicked
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "256"))
+# How long messages for a room are collected before being flushed together.
+# 0 flushes on the next event-loop tick, i.e. once the current handler yields.
+WS_BATCH_WINDOW_MS = float(os.getenv("WS_BATCH_WINDOW_MS", "0"))
+# Messages kept per room so a reconnecting client (?resume=<last seq>) gets only
+# what it missed; a longer gap falls back to a full snapshot
+WS_RESUME_BUFFER = int(os.getenv("WS_RESUME_BUFFER", "256"))
+# Application-level ping to every socket this often (0 = off); a socket the client
+# has sent nothing on (pongs included) for WS_HEARTBEAT_MISSES intervals is closed
+# and its player handled as disconnected
+WS_HEARTBEAT_INTERVAL_S = float(os.getenv("WS_HEARTBEAT_INTERVAL_S", "15"))
+WS_HEARTBEAT_MISSES = int(os.getenv("WS_HEARTBEAT_MISSES", "3"))
+
+# ---------------- Room sharding ----------------
+# Number of backend worker processes rooms are spread over (1 = no sharding)
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))
+# This process's worker index (0..WORKER_COUNT-1)
+WORKER_INDEX = int(os.getenv("WORKER_INDEX", "0"))
+# Worker i listens on WORKER_BASE_PORT + i behind the shard router
+WORKER_HOST = os.getenv("WORKER_HOST", "127.0.0.1")
+WORKER_BASE_PORT = int(os.getenv("WORKER_BASE_PORT", "8101"))
+
+# ---------------- Room persistence ----------------
+# "memory" (rooms are lost on restart) or "sqlite" (snapshots restored on startup)
+ROOM_STORE = os.getenv("ROOM_STORE", "memory")
+ROOM_STORE_PATH = os.getenv("ROOM_STORE_PATH", "data/rooms.sqlite3")
+# Write-behind interval: dirty rooms are written together at most this often
+ROOM_STORE_FLUSH_MS = float(os.getenv("ROOM_STORE_FLUSH_MS", "500"))
+# Rooms are stored as a snapshot plus the events after it; re-snapshot after this many events
+ROOM_STORE_SNAPSHOT_EVERY = int(os.getenv("ROOM_STORE_SNAPSHOT_EVERY", "200"))
+
+# ---------------- Randomness ----------------
+# Deterministic mode: when set, every room's seed (and so every deal) is derived
+# from this value and the room id, making deals reproducible across runs
+GAME_SEED = int(os.environ["GAME_SEED"]) if os.getenv("GAME_SEED") else None
+
+# ---------------- State projection ----------------
+# Hide other players' hands (clients get `hand_count` instead)
+REDACT_HANDS = _env_bool("REDACT_HANDS", True)
+# What approved spectators see: "full" (every hand) or "redacted" (counts only)
+SPECTATOR_VIEW = os.getenv("SPECTATOR_VIEW", "full")
+
+# ---------------- Engine checks ----------------
+# After every action, compare Game's incremental counters (room_index.py) with a
+# full recompute and raise on drift. Costs a rebuild per action: tests and fuzzing only
+VERIFY_COUNTERS = _env_bool("VERIFY_COUNTERS", False)
+
+# ---------------- Room timers ----------------
+# Resolution of the shared timer wheel (services/timer_service.py): deadlines fire up to one tick late
+TIMER_TICK_MS = float(os.getenv("TIMER_TICK_MS", "100"))
+# An abort / back-to-lobby vote still open after this long fails as timed out
+VOTE_TIMEOUT_S = float(os.getenv("VOTE_TIMEOUT_S", "60"))
+# Time a human has for their turn before it passes to the next opponent (0 = no limit)
+TURN_TIMEOUT_S = float(os.getenv("TURN_TIMEOUT_S", "0"))
+# A seated player disconnected mid-game this long is played by a bot until they reconnect (0 = never)
+DISCONNECT_GRACE_S = float(os.getenv("DISCONNECT_GRACE_S", "120"))
+# A room nobody is connected to is removed after this long (0 = keep it)
+ROOM_IDLE_TTL_S = float(os.getenv("ROOM_IDLE_TTL_S", "900"))
+
+# ---------------- AI players ----------------
+# Delay before a bot acts, so humans can follow its moves
+BOT_THINK_MS = float(os.getenv("BOT_THINK_MS", "800"))
+# Bot decisions run off the event loop: "thread" or "process" pool of this size
+BOT_EXECUTOR = os.getenv("BOT_EXECUTOR", "thread")
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "2"))
+
+# ---------------- Logging ----------------
+# Hand records to a background writer thread instead of formatting and writing on the event loop
+LOG_ASYNC = _env_bool("LOG_ASYNC", True)
+# Lowest level written to the log files / console. Above DEBUG, debug calls
+# return before formatting anything (no sink wants them)
+LOG_FILE_LEVEL = os.getenv("LOG_FILE_LEVEL", "DEBUG")
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "INFO")
+# Write every card move to logs/audit.log (one line per action, hands as bitmasks)
+AUDIT_LOG = _env_bool("AUDIT_LOG", False)
+# Expose GET /api/v1/rooms/{room_id}/debug/hands, which reveals every hand
+DEBUG_ENDPOINTS = _env_bool("DEBUG_ENDPOINTS", False)
@@ -0,0 +1,15 @@
+from __future__ import annotations
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional fast encoder
+    orjson = None
+
+
+def dumps(obj: Any) -> str:
+    """Encode to compact JSON text, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(",", ":"))
@@ -0,0 +1,100 @@
+"""
+Per-room log of the actions applied to a Game.
+
+Mutating Game methods are wrapped with `recorded`; every top-level call is
+appended as a compact event (card lists stored as bitmasks, deals with the
+seed their deck was shuffled with), so a room can be rebuilt by replaying its log
+(`Game.replay`) instead of storing full snapshots.
+"""
+from __future__ import annotations
+import functools
+import inspect
+from typing import Any, Callable, Dict, List, Optional
+
+from cards import mask_of, to_cards
+
+# Event keys, kept short since logs are persisted
+SEQ = "s"
+ACTION = "a"
+ARGS = "k"
+DEAL_SEED = "r"
+DECK = "d"  # explicit deck order (logs written before deals were seeded)
+
+
+class EventLog:
+    def __init__(self, base_seq: int = 0):
+        self.base_seq = base_seq  # seq of the last event folded into a snapshot
+        self.events: List[dict] = []
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the last event (0 = none yet)"""
+        return self.events[-1][SEQ] if self.events else self.base_seq
+
+    def append(self, action: str, args: Dict[str, Any], deal_seed: Optional[int] = None) -> dict:
+        event = {SEQ: self.seq + 1, ACTION: action, ARGS: args}
+        if deal_seed is not None:
+            event[DEAL_SEED] = deal_seed
+        self.events.append(event)
+        return event
+
+    def since(self, seq: int) -> List[dict]:
+        """Events after `seq`, oldest first"""
+        if seq < self.base_seq:
+            raise ValueError(f"Events up to {self.base_seq} were compacted away")
+        return self.events[seq - self.base_seq:]
+
+    def compact(self, seq: int):
+        """Forget events up to `seq` (they are covered by a snapshot)"""
+        drop = max(0, min(seq, self.seq) - self.base_seq)
+        del self.events[:drop]
+        self.base_seq += drop
+
+
+def recorded(*card_params: str) -> Callable:
+    """
+    Log calls to a mutating Game method. Parameters named in `card_params`
+    hold card lists and are stored as bitmasks. Nested calls (one recorded
+    method calling another) are only logged at the outermost level, and calls
+    that raise are logged too, since they may have changed state before failing.
+    """
+    def decorate(method: Callable) -> Callable:
+        signature = inspect.signature(method)
+        name = method.__name__
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self._action_depth:
+                return method(self, *args, **kwargs)
+            bound = signature.bind(self, *args, **kwargs)
+            event_args = {k: v for k, v in bound.arguments.items() if k != "self"}
+            for param in card_params:
+                if event_args.get(param) is not None:
+                    event_args[param] = mask_of(event_args[param])
+            self._action_depth += 1
+            self._dealt_seed = None
+            try:
+                result = method(self, *args, **kwargs)
+            finally:
+                self._action_depth -= 1
+                event = self.events.append(name, event_args, self._dealt_seed)
+                self._dealt_seed = None
+                self._audit_hands(event)
+            # Only after success, so a failed check never hides the action's own exception
+            if self.verify_counters:
+                self.check_counters()
+            return result
+
+        wrapper.card_params = card_params
+        return wrapper
+
+    return decorate
+
+
+def event_call_args(method: Callable, event: dict) -> Dict[str, Any]:
+    """Keyword arguments to re-apply `event` with the recorded `method`"""
+    args = dict(event[ARGS])
+    for param in getattr(method, "card_params", ()):
+        if args.get(param) is not None:
+            args[param] = to_cards(args[param])
+    return args
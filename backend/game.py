@@ -1,22 +1,41 @@
 from __future__ import annotations
 import random
-from typing import Dict, List, Tuple, Optional
+import secrets
+from typing import Any, Callable, Dict, FrozenSet, Iterator, List, Tuple, Optional
 from loguru import logger
-from models import Card, RoomState, Player, TableSet, Suit
-
-RANKS_LOWER = ["2", "3", "4", "5", "6", "7"]
-RANKS_UPPER = ["8", "9", "10", "J", "Q", "K", "A"]
-SUITS: List[Suit] = ["hearts", "diamonds", "clubs", "spades"]
+from models import Card, collaborator_ranks
+from room_state import Player, RoomState, TableSet
+from cards import (
+    RANKS_LOWER, RANKS_UPPER, set_mask, ranks_mask, mask_of, to_cards, to_dicts, rank_list,
+    derive_seed, shuffled_deck, deal, SEAT_COUNT, SET_INDEX, ALL_SETS_CLAIMED,
+)
+from state_sync import StateTracker
+from room_index import VOTE_ABORT, VOTE_FIELDS, VOTE_LOBBY, RoomIndex, VoteTally
+from event_log import ACTION, DEAL_SEED, DECK, SEQ, EventLog, event_call_args, recorded
+from config import AUDIT, CHANNEL_AUDIT, CHANNEL_GAME, settings
+from encoding import dumps
+import metrics
+
+logger = logger.bind(channel=CHANNEL_GAME)
+audit = logger.bind(channel=CHANNEL_AUDIT)
 
 POINTS = {"lower": 20, "upper": 30}
 
+# State view roles (see Game.view_role)
+VIEW_ALL = "all"          # every hand visible
+VIEW_PUBLIC = "public"    # no hands visible, counts only
+VIEW_PLAYER_PREFIX = "p:"  # own hand visible, e.g. "p:<player_id>"
+
 
-def card_tuple(c: Card) -> Tuple[str, str]:
-    return (c.suit, c.rank)
+def room_seed(room_id: str) -> int:
+    """Seed for a new room: derived from GAME_SEED in deterministic mode, random otherwise"""
+    if settings.GAME_SEED is not None:
+        return derive_seed(settings.GAME_SEED, room_id)
+    return secrets.randbits(64)
 
 
 class Game:
-    def __init__(self, room_id: str):
+    def __init__(self, room_id: str, seed: Optional[int] = None, shuffles: Optional[Iterator[Tuple[int, List[int]]]] = None):
         self.state = RoomState(
             room_id=room_id,
             players={},
@@ -26,78 +45,514 @@ class Game:
             phase="lobby",
             current_dealer=None,
         )
-        self._deck: List[Card] = []
+        self._deck: List[int] = []  # card ids, dealt from the end
+        self._hands: Dict[str, int] = {}  # player_id -> hand bitmask (authoritative; Player.hand mirrors it)
+        self._hands_before: Dict[str, int] = {}  # player_id -> hand before the running action changed it (audit)
+        self._index = RoomIndex()  # seat/team/card/table/vote lookups, see room_index.py
+        self._vote_rounds = {kind: 0 for kind in VOTE_FIELDS}  # votes opened so far, by kind (not persisted)
+        self.verify_counters = settings.VERIFY_COUNTERS  # check the index after every action (slow)
+        self._sync = StateTracker()
+        self._views: Dict[str, StateTracker] = {}  # view role -> projected state history
+        self._view_cache: Dict[Tuple[str, str], Tuple[int, Any]] = {}  # (view role, codec) -> (version, encoded state)
+        self.events = EventLog()  # accepted actions, see event_log.py
+        self._action_depth = 0  # >0 while a recorded action runs
+        # Randomness is per room: `seed` fixes every deal (deal n uses derive_seed(seed, n)),
+        # `rng` serves anything else that needs randomness for this room
+        self.seed = seed if seed is not None else room_seed(room_id)
+        self.rng = random.Random(self.seed)
+        self._deals = 0  # decks built so far
+        self._shuffles = shuffles  # optional precomputed (deal seed, deck) pairs, see cards.precompute_shuffles
+        self._dealt_seed: Optional[int] = None  # deal seed used by the current action
+        self._replay_seed: Optional[int] = None  # deal seed to use instead of drawing one (replay)
+        self._replay_deck: Optional[List[int]] = None  # explicit deck order to use (replay of older logs)
+
+    # ---------------- State versioning & per-viewer views ----------------
+    @property
+    def state_version(self) -> int:
+        return self._sync.version
+
+    def commit_state(self) -> int:
+        """Snapshot the current state, bumping the version if it changed since the last commit"""
+        with metrics.state_serialize.time():
+            snapshot = self.state.to_dict()
+        return self._sync.commit(snapshot)
+
+    def state_snapshot(self) -> dict:
+        """Last committed state snapshot (JSON-ready, all hands visible)"""
+        if self._sync.snapshot is None:
+            self.commit_state()
+        return self._sync.snapshot
+
+    def view_role(self, viewer_id: Optional[str]) -> str:
+        """
+        Which projection of the state a viewer gets. Viewers sharing a role see
+        identical bytes, so each role is rendered once per state version.
+        """
+        if not settings.REDACT_HANDS:
+            return VIEW_ALL
+        player = self.state.players.get(viewer_id) if viewer_id else None
+        if player is None:
+            return VIEW_PUBLIC
+        if player.is_spectator:
+            if settings.SPECTATOR_VIEW == "full" and not player.spectator_request_pending:
+                return VIEW_ALL
+            return VIEW_PUBLIC
+        if self._has_cards(viewer_id):
+            return f"{VIEW_PLAYER_PREFIX}{viewer_id}"
+        return VIEW_PUBLIC
+
+    def _project(self, role: str) -> dict:
+        snapshot = self.state_snapshot()
+        own = role[len(VIEW_PLAYER_PREFIX):] if role.startswith(VIEW_PLAYER_PREFIX) else None
+        players = {}
+        for pid, p in snapshot["players"].items():
+            visible = role == VIEW_ALL or pid == own
+            players[pid] = {**p, "hand": p["hand"] if visible else [], "hand_count": len(p["hand"])}
+        return {**snapshot, "players": players}
+
+    def _view_tracker(self, role: str) -> StateTracker:
+        tracker = self._views.get(role)
+        if tracker is None:
+            tracker = self._views[role] = StateTracker()
+        if tracker.version != self.state_version or tracker.snapshot is None:
+            tracker.commit(self._project(role), version=self.state_version)
+        return tracker
+
+    def state_view(self, role: str) -> dict:
+        """State as seen by `role` at the current version"""
+        return self._view_tracker(role).snapshot
+
+    def _forget_view(self, role: str):
+        """Drop the cached projections of a role nobody can have any more (a player who left)"""
+        self._views.pop(role, None)
+        for key in [k for k in self._view_cache if k[0] == role]:
+            del self._view_cache[key]
+
+    def state_view_encoded(self, role: str, codec: str, encode: Callable[[dict], Any]) -> Any:
+        """`encode(view)` for `role`, cached per (version, role, codec)"""
+        key = (role, codec)
+        cached = self._view_cache.get(key)
+        if cached is None or cached[0] != self.state_version:
+            cached = self._view_cache[key] = (self.state_version, encode(self.state_view(role)))
+        return cached[1]
+
+    def state_view_json(self, role: str) -> str:
+        """Encoded state for `role`, cached per (version, role)"""
+        return self.state_view_encoded(role, "json", dumps)
+
+    def dealing_view(self, sequence: List[dict], role: str) -> List[dict]:
+        """A dealing sequence as `role` sees it: cards only where that hand is visible, seat and player otherwise"""
+        if role == VIEW_ALL:
+            return sequence
+        own = role[len(VIEW_PLAYER_PREFIX):] if role.startswith(VIEW_PLAYER_PREFIX) else None
+        return [step if step["player_id"] == own else {k: v for k, v in step.items() if k != "card"} for step in sequence]
+
+    def state_patch_since(self, version: Optional[int], role: str) -> Optional[List[dict]]:
+        """Patch operations for `role` from `version` to now, or None if a full snapshot is needed"""
+        return self._view_tracker(role).patches_since(version)
+
+    # ---------------- Persistence ----------------
+    def to_snapshot(self) -> dict:
+        """Everything needed to rebuild this game after a restart (JSON-ready)"""
+        self.commit_state()
+        return {
+            "state": self.state_snapshot(),
+            "deck": list(self._deck),
+            "seq": self.events.seq,
+            "seed": self.seed,
+            "deals": self._deals,
+        }
 
-    def log_all_player_hands(self, context: str = ""):
-        """Log all player hands for debugging purposes"""
-        if not self.state.players:
-            logger.info(f"[HANDS LOG] {context} - No players in room")
-            return
-            
-        logger.info(f"[HANDS LOG] {context} - Room: {self.state.room_id}")
-        logger.info(f"[HANDS LOG] {context} - Phase: {self.state.phase}")
-        
-        for player_id, player in self.state.players.items():
-            hand_str = ", ".join([f"{card.rank} of {card.suit}" for card in player.hand]) if player.hand else "No cards"
-            logger.info(f"[HANDS LOG] {context} - {player.name} (Seat {player.seat}, Team {player.team}): {len(player.hand)} cards - [{hand_str}]")
-        
-        logger.info(f"[HANDS LOG] {context} - Deck count: {self.state.deck_count}")
-        logger.info(f"[HANDS LOG] {context} - " + "="*50)
+    @classmethod
+    def from_snapshot(cls, room_id: str, data: dict) -> "Game":
+        game = cls(room_id, seed=data.get("seed"))
+        game._deals = data.get("deals", 0)
+        game.state = RoomState.from_dict(data["state"])
+        game._deck = list(data.get("deck") or [])
+        game._hands = {pid: p.hand for pid, p in game.state.players.items() if p.hand}
+        game._index.rebuild(game.state, game._hands)
+        game.events = EventLog(base_seq=data.get("seq", 0))
+        game.commit_state()
+        return game
+
+    def apply_events(self, events: List[dict]):
+        """Re-apply logged actions in order (the log is rebuilt as they run)"""
+        for event in events:
+            method = getattr(self, event[ACTION])
+            if not hasattr(method, "card_params"):
+                raise ValueError(f"Not a recorded action: {event[ACTION]}")
+            self._replay_seed = event.get(DEAL_SEED)
+            self._replay_deck = event.get(DECK)
+            try:
+                method(**event_call_args(method, event))
+            except (ValueError, KeyError) as e:
+                # A rule the action broke when it was first applied; anything else is a real divergence
+                logger.debug("Replayed event {} ({}) was rejected: {!r}", event[SEQ], event[ACTION], e)
+            finally:
+                self._replay_seed = None
+                self._replay_deck = None
+
+    @classmethod
+    def replay(cls, room_id: str, events: List[dict], snapshot: Optional[dict] = None, seed: Optional[int] = None) -> "Game":
+        """
+        Rebuild a room from its event log, optionally starting from a snapshot.
+        Pass the room's `seed` when replaying from scratch so later deals match too.
+        """
+        game = cls.from_snapshot(room_id, snapshot) if snapshot else cls(room_id, seed=seed)
+        logger.disable("game")  # per-action logging dominates replay time
+        try:
+            game.apply_events(events)
+        finally:
+            logger.enable("game")
+        game.commit_state()
+        return game
+
+    def hands_dump(self) -> Dict[str, dict]:
+        """Every player's hand, readable (debug endpoint; never sent to clients)"""
+        return {
+            pid: {
+                "name": p.name,
+                "seat": p.seat,
+                "team": p.team,
+                "count": self.cards_held(pid),
+                "cards": [f"{c.rank} of {c.suit}" for c in to_cards(self.hand_mask(pid))],
+            }
+            for pid, p in self.state.players.items()
+        }
+
+    def _audit_hands(self, event: dict):
+        """
+        Write the hand changes made by the action that produced `event` to the
+        audit stream, as one record of per-player masks. Built lazily: nothing
+        is formatted unless an audit sink is installed (settings.AUDIT_LOG).
+        """
+        before, self._hands_before = self._hands_before, {}
+        if before:
+            audit.opt(lazy=True).log(AUDIT, "{}", lambda: self._hand_delta(event, before))
+
+    def _hand_delta(self, event: dict, before: Dict[str, int]) -> str:
+        hands = {}
+        for pid, old in before.items():
+            new = self._hands.get(pid, 0)
+            delta = {k: m for k, m in (("+", new & ~old), ("-", old & ~new)) if m}
+            if delta:
+                hands[pid] = delta
+        return dumps({"room": self.state.room_id, "seq": event[SEQ], "action": event[ACTION], "hands": hands})
 
     # ---------------- Deck ----------------
     def build_deck(self):
-        self._deck = []
-        for s in SUITS:
-            for r in RANKS_LOWER + RANKS_UPPER:
-                self._deck.append(Card(suit=s, rank=r))
-        random.shuffle(self._deck)
+        replaying = self._replay_seed is not None or self._replay_deck is not None
+        precomputed = next(self._shuffles, None) if self._shuffles is not None and not replaying else None
+        if self._replay_deck is not None:
+            deal_seed, self._deck = None, list(self._replay_deck)
+        elif self._replay_seed is not None:
+            deal_seed, self._deck = self._replay_seed, shuffled_deck(self._replay_seed)
+        elif precomputed is not None:
+            deal_seed, self._deck = precomputed[0], list(precomputed[1])
+        else:
+            deal_seed = derive_seed(self.seed, self._deals)
+            self._deck = shuffled_deck(deal_seed)
+        self._deals += 1
+        self._dealt_seed = deal_seed  # recorded with the action's event
         self.state.deck_count = len(self._deck)
+        logger.info(f"Built deck #{self._deals} for room {self.state.room_id} (deal seed {deal_seed})")
 
-    def deal_all(self, start_from_seat: int = 0):
-        """Deal cards starting from the specified seat (clockwise)"""
-        # Create dealing order starting from the specified seat
-        order = [(start_from_seat + i) % 6 for i in range(6)]
-        hands_by_pid = {pid: [] for pid in self.state.players}
-        while self._deck:
-            for seat in order:
-                if not self._deck:
-                    break
-                pid = self.state.seats.get(seat)
-                if pid:
-                    hands_by_pid[pid].append(self._deck.pop())
-        for pid, cards in hands_by_pid.items():
-            self.state.players[pid].hand = cards
+    def deal_all(self, start_from_seat: int = 0) -> List[dict]:
+        """Deal the whole deck starting from the specified seat (clockwise); returns the dealing sequence"""
+        hands, sequence = deal(self._deck, self.state.seats, start_from_seat)
+        for pid in self.state.players:
+            self._set_hand(pid, hands.get(pid, 0))
+        self._deck = []
         self.state.deck_count = 0
-        
-        # Log all player hands after dealing
-        self.log_all_player_hands("AFTER DEALING")
+        return sequence
+
+    # ---------------- Membership & connections ----------------
+    @recorded()
+    def join(self, player_id: str, name: str, avatar: str) -> dict:
+        """
+        Add a player (or refresh a returning one). When the lobby is locked,
+        newcomers join as spectators with a pending request.
+        """
+        room_id = self.state.room_id
+        is_reconnection = player_id in self.state.players
+        logger.info(f"Join request for player {player_id} in room {room_id}: is_reconnection={is_reconnection}, lobby_locked={self.state.lobby_locked}, phase={self.state.phase}, player_count={len(self.state.players)}")
+
+        # Check if room is full (only for new players, not reconnections, and only if lobby is not locked)
+        if not is_reconnection and not self.state.lobby_locked and len(self.state.players) >= 6:
+            return {"success": False, "reason": "room_full"}
+
+        if is_reconnection:
+            # Update existing player info (reconnection)
+            existing_player = self.state.players[player_id]
+            existing_player.name = name
+            existing_player.avatar = avatar
+            existing_player.connected = True  # Mark as connected
+            logger.info(f"Player {player_id} reconnected to room {room_id} (existing player)")
+        elif self.state.lobby_locked:
+            # Add as spectator with pending request when lobby is locked
+            self.state.players[player_id] = Player(
+                id=player_id,
+                name=name,
+                avatar=avatar,
+                team=None,  # No team for spectators
+                seat=None,  # No seat for spectators
+                connected=True,
+                is_spectator=True,
+                spectator_request_pending=True
+            )
+            self.state.spectator_requests[player_id] = name
+            logger.info(f"Player {player_id} joined locked room {room_id} as spectator with pending request")
+        else:
+            # Add as normal player when lobby is not locked
+            self.state.players[player_id] = Player(id=player_id, name=name, avatar=avatar)
+
+            # Set first player as admin
+            if self.state.admin_player_id is None:
+                self.state.admin_player_id = player_id
+                logger.info(f"Player {player_id} ({name}) is now the admin of room {room_id}")
+
+            logger.info(f"Player {player_id} successfully joined room {room_id}. Total players: {len(self.state.players)}")
+
+        return {"success": True, "is_reconnection": is_reconnection}
+
+    @recorded()
+    def add_ai_player(self, player_id: str, name: str, avatar: str, team: str):
+        self.state.players[player_id] = Player(
+            id=player_id,
+            name=name,
+            avatar=avatar,
+            team=team,
+            connected=True,
+            is_ai=True
+        )
+        self._index.set_team(player_id, team)
+        self.assign_seat(player_id, team)
+
+    @recorded()
+    def resolve_spectator_request(self, spectator_id: str, approved: bool) -> dict:
+        """Approve a pending spectator, or reject and remove them from the room"""
+        spectator = self.state.players.get(spectator_id)
+        if spectator is None:
+            return {"success": False, "reason": "not_found", "error": "Spectator not found"}
+        if not spectator.is_spectator or not spectator.spectator_request_pending:
+            return {"success": False, "reason": "no_pending_request", "error": "No pending spectator request"}
+
+        self.state.spectator_requests.pop(spectator_id, None)
+        if approved:
+            spectator.spectator_request_pending = False
+            logger.info(f"Spectator {spectator_id} ({spectator.name}) approved in room {self.state.room_id}")
+        else:
+            self._remove_player(spectator_id)
+            logger.info(f"Spectator {spectator_id} ({spectator.name}) rejected and removed from room {self.state.room_id}")
+        return {"success": True, "spectator_id": spectator_id, "spectator_name": spectator.name, "approved": approved}
+
+    @recorded()
+    def player_connected(self, player_id: str) -> dict:
+        """Mark a player's socket as connected, tidying up the lobby first"""
+        player = self.state.players.get(player_id)
+        was_disconnected = player is not None and not player.connected
+        # Also check if player has a seat (indicates they were in an active game)
+        has_seat = player is not None and player.seat is not None
+        is_reconnection = was_disconnected or (has_seat and self.state.phase in ["ready", "playing"])
+
+        logger.info(f"WebSocket connection for {player_id}: was_disconnected={was_disconnected}, has_seat={has_seat}, is_reconnection={is_reconnection}, player_exists={player is not None}, connected={player.connected if player else 'N/A'}")
+
+        # Clean up any disconnected players' seats in lobby phase
+        if self.state.phase == "lobby":
+            cleaned_count = self.cleanup_disconnected_seats()
+            if cleaned_count > 0:
+                logger.info(f"Cleaned up {cleaned_count} disconnected seats when {player_id} connected")
+
+            # Remove disconnected players entirely from lobby
+            removed_count = self.remove_disconnected_players()
+            if removed_count > 0:
+                logger.info(f"Removed {removed_count} disconnected players when {player_id} connected")
+
+        player = self.state.players.get(player_id)
+        if player is not None:
+            player.connected = True
+            if player.stand_in:
+                # Take the seat back from the bot that played it while they were away
+                player.is_ai = player.stand_in = False
+                logger.info(f"Player {player_id} took their seat back from the bot in room {self.state.room_id}")
+        return {
+            "known": player is not None,
+            "player_name": player.name if player is not None else None,
+            "was_disconnected": was_disconnected,
+            "is_reconnection": is_reconnection,
+        }
+
+    @recorded()
+    def player_disconnected(self, player_id: str) -> Optional[str]:
+        """
+        Handle a closed socket: in the lobby the player leaves the room, during
+        a game they are only marked disconnected. Returns the player's name.
+        """
+        player = self.state.players.get(player_id)
+        if player is None:
+            return None
+        if self.state.phase == "lobby":
+            # Free their seat, if any, and drop them
+            seat_num = self._remove_player(player_id)
+            if seat_num is not None:
+                logger.info(f"Freed seat {seat_num} for disconnected player {player_id}")
+            logger.info(f"Removed disconnected player {player_id} from lobby")
+        else:
+            player.connected = False
+            logger.info(f"Marked player {player_id} as disconnected in room {self.state.room_id}")
+        return player.name
+
+    @recorded()
+    def bot_stand_in(self, player_id: str) -> Optional[dict]:
+        """
+        Let a bot play a disconnected player's seat until they reconnect
+        (grace period in services/room_timers.py). None if that no longer applies.
+        """
+        player = self.state.players.get(player_id)
+        if player is None or player.connected or player.is_ai or player.seat is None or self.state.phase == "lobby":
+            return None
+        player.is_ai = player.stand_in = True
+        logger.info(f"Bot stands in for disconnected player {player_id} in room {self.state.room_id}")
+        return {"player_id": player_id, "player_name": player.name}
+
+    # ---------------- Lookups (read-only, see room_index.py) ----------------
+    def seat_of(self, pid: Optional[str]) -> Optional[int]:
+        return self._index.seat_of.get(pid) if pid else None
+
+    def player_at(self, seat: int) -> Optional[str]:
+        return self._index.at_seat[seat]
+
+    def team_of(self, pid: str) -> Optional[str]:
+        return self._index.team_of.get(pid)
+
+    def team_members(self, team: str) -> FrozenSet[str]:
+        return frozenset(self._index.members.get(team, ()))
+
+    def team_size(self, team: str) -> int:
+        return len(self._index.members.get(team, ()))
+
+    def team_has_cards(self, team: str) -> bool:
+        return bool(self._index.holding.get(team))
+
+    def players_with_cards(self, team: Optional[str] = None) -> FrozenSet[str]:
+        if team is None:
+            return frozenset(self._index.card_count)
+        return frozenset(self._index.holding.get(team, ()))
+
+    def cards_held(self, pid: str) -> int:
+        return self._index.card_count.get(pid, 0)
+
+    def team_cards(self, team: str) -> int:
+        """Cards left in the hands of the team's players"""
+        return self._index.team_cards.get(team, 0)
+
+    def sets_won(self, team: str) -> int:
+        return self._index.sets_won.get(team, 0)
+
+    def claimed_sets(self) -> int:
+        """Half-suits on the table, as a mask over cards.SET_INDEX"""
+        return self._index.claimed
+
+    def open_vote(self, kind: str) -> Optional[int]:
+        """Number identifying the open `kind` vote (a new vote gets a new one); None when no vote is open"""
+        return self._vote_rounds[kind] if getattr(self.state, VOTE_FIELDS[kind]) else None
+
+    def vote_tally(self, kind: str) -> VoteTally:
+        """Ballot counts for VOTE_ABORT or VOTE_LOBBY, by team"""
+        return self._index.tally(kind)
+
+    # Every change to seats, teams, membership or ballots goes through these so the index stays current
+    def _seat(self, pid: str, seat: int, team: str):
+        self.state.seats[seat] = pid
+        self.state.players[pid].seat = seat
+        self._set_team(pid, team)
+        self._index.seat(pid, seat)
+
+    def _unseat(self, pid: str) -> Optional[int]:
+        """Free the player's seat and clear their team; returns the seat they had"""
+        player = self.state.players[pid]
+        seat = player.seat
+        if seat is None:
+            return None
+        self.state.seats[seat] = None
+        player.seat = None
+        self._set_team(pid, None)
+        self._index.unseat(pid)
+        return seat
+
+    def _set_team(self, pid: str, team: Optional[str]):
+        self.state.players[pid].team = team
+        self._index.set_team(pid, team)
+
+    def _remove_player(self, pid: str) -> Optional[int]:
+        """Drop a player from the room, freeing their seat; returns that seat"""
+        seat = self.seat_of(pid)
+        if seat is not None:
+            self.state.seats[seat] = None
+        self._set_hand(pid, 0)
+        self._index.remove(pid)
+        del self.state.players[pid]
+        self._forget_view(f"{VIEW_PLAYER_PREFIX}{pid}")
+        return seat
+
+    def _cast_vote(self, kind: str, pid: str, vote: bool):
+        ballots = getattr(self.state, VOTE_FIELDS[kind])
+        if not ballots:
+            self._vote_rounds[kind] += 1
+        ballots[pid] = vote
+        self._index.cast(kind, pid, vote)
+
+    def _clear_votes(self, kind: str):
+        setattr(self.state, VOTE_FIELDS[kind], {})
+        self._index.clear_votes(kind)
+
+    def _claim_set(self, suit: str, set_type: str, cards: int, team: str):
+        """Put a half-suit on the table for `team` (once) and score it"""
+        if not self._table_has_set(suit, set_type):
+            self.state.table_sets.append(TableSet(suit=suit, set_type=set_type, cards=cards, owner_team=team))
+            self._index.claim(suit, set_type, team)
+        self.state.team_scores[team] += POINTS[set_type]
+
+    def _clear_table(self):
+        self.state.table_sets = []
+        self._index.clear_table()
+
+    def check_counters(self):
+        """Raise AssertionError if the index has drifted from a full recompute (see verify_counters)"""
+        stale = self._index.mismatches(self.state, self._hands)
+        assert not stale, f"room {self.state.room_id}: stale counters {stale} after event {self.events.seq}"
+
+    def _next_cw_seated(self, seat: int) -> Tuple[Optional[int], Optional[str]]:
+        """First occupied seat clockwise after `seat`"""
+        at_seat = self._index.at_seat
+        for offset in range(1, SEAT_COUNT + 1):
+            s = (seat + offset) % SEAT_COUNT
+            if at_seat[s] is not None:
+                return s, at_seat[s]
+        return None, None
 
     # ---------------- Seating & Teams ----------------
+    @recorded()
     def assign_seat(self, player_id: str, team: str) -> Optional[int]:
         # First, remove player from their current seat if they have one
         self.remove_from_seat(player_id)
         
         preferred = [0, 2, 4] if team == "A" else [1, 3, 5]
         for s in preferred:
-            if self.state.seats[s] is None:
-                self.state.seats[s] = player_id
-                p = self.state.players[player_id]
-                p.team = team
-                p.seat = s
+            if self.player_at(s) is None:
+                self._seat(player_id, s, team)
                 return s
         
         # If no preferred seats available, try any available seat
-        for s in range(6):
-            if self.state.seats[s] is None:
-                self.state.seats[s] = player_id
-                p = self.state.players[player_id]
-                p.team = team
-                p.seat = s
+        for s in range(SEAT_COUNT):
+            if self.player_at(s) is None:
+                self._seat(player_id, s, team)
                 logger.info(f"Assigned player {player_id} to non-preferred seat {s} for team {team}")
                 return s
         
         return None
 
+    @recorded()
     def select_seat(self, player_id: str, seat: int, team: str) -> bool:
         """
         Assign a player to a specific seat and team.
@@ -115,22 +570,20 @@ class Game:
             logger.warning(f"Invalid seat number {seat}")
             return False
             
-        if self.state.seats[seat] is not None:
-            logger.warning(f"Seat {seat} is already occupied by player {self.state.seats[seat]}")
+        if self.player_at(seat) is not None:
+            logger.warning(f"Seat {seat} is already occupied by player {self.player_at(seat)}")
             return False
             
         # Remove player from current seat if they have one
         self.remove_from_seat(player_id)
         
         # Assign to new seat
-        self.state.seats[seat] = player_id
-        player = self.state.players[player_id]
-        player.seat = seat
-        player.team = team
+        self._seat(player_id, seat, team)
         
         logger.info(f"Player {player_id} assigned to seat {seat} on team {team}")
         return True
 
+    @recorded()
     def remove_from_seat(self, player_id: str) -> bool:
         """
         Remove a player from their current seat.
@@ -145,18 +598,13 @@ class Game:
             logger.warning(f"Player {player_id} not found in room {self.state.room_id}")
             return False
             
-        player = self.state.players[player_id]
-        if player.seat is not None:
-            seat_number = player.seat
-            # Clear the seat
-            self.state.seats[seat_number] = None
-            # Clear player's seat and team
-            player.seat = None
-            player.team = None
+        seat_number = self._unseat(player_id)
+        if seat_number is not None:
             logger.info(f"Removed player {player_id} from seat {seat_number} in room {self.state.room_id}")
             return True
         return False
 
+    @recorded()
     def unassign_player(self, admin_player_id: str, target_player_id: str) -> dict:
         """
         Admin function to unassign a player from their team and seat.
@@ -210,6 +658,7 @@ class Game:
                 "message": "Failed to unassign player"
             }
 
+    @recorded()
     def cleanup_disconnected_seats(self) -> int:
         """
         Clean up seats for all disconnected players in lobby phase.
@@ -222,12 +671,7 @@ class Game:
         cleaned_count = 0
         for player_id, player in self.state.players.items():
             if not player.connected and player.seat is not None:
-                seat_number = player.seat
-                # Clear the seat
-                self.state.seats[seat_number] = None
-                # Clear player's seat and team
-                player.seat = None
-                player.team = None
+                seat_number = self._unseat(player_id)
                 logger.info(f"Cleaned up seat {seat_number} for disconnected player {player_id}")
                 cleaned_count += 1
                 
@@ -236,6 +680,7 @@ class Game:
             
         return cleaned_count
 
+    @recorded()
     def remove_disconnected_players(self) -> int:
         """
         Remove disconnected players from the room entirely (lobby phase only).
@@ -253,12 +698,8 @@ class Game:
                 disconnected_players.append(player_id)
                 
         for player_id in disconnected_players:
-            # Remove from players dict
-            del self.state.players[player_id]
-            # Remove from any seat they might have
-            for seat_num, seat_player_id in self.state.seats.items():
-                if seat_player_id == player_id:
-                    self.state.seats[seat_num] = None
+            # Remove from players dict and from any seat they might have
+            self._remove_player(player_id)
             logger.info(f"Removed disconnected player {player_id} from room {self.state.room_id}")
             removed_count += 1
                 
@@ -267,6 +708,7 @@ class Game:
             
         return removed_count
 
+    @recorded()
     def start(self):
         self.state.phase = "ready"
         # Start with seat 0 as the first dealer (displays as "Seat 1")
@@ -281,6 +723,7 @@ class Game:
         
         logger.info(f"Game started in room {self.state.room_id}, dealer: {dealer}, lobby locked")
 
+    @recorded()
     def request_back_to_lobby(self, requester_id: str) -> dict:
         """
         Request to return to lobby from game. Requires majority vote.
@@ -293,38 +736,33 @@ class Game:
         
         # Initialize voting if not already started
         if not self.state.back_to_lobby_votes:
-            self.state.back_to_lobby_votes = {}
             logger.info(f"Back to lobby voting started by {requester_id} in room {self.state.room_id}")
         
         # Add/update vote
-        self.state.back_to_lobby_votes[requester_id] = True
+        self._cast_vote(VOTE_LOBBY, requester_id, True)
         
         # Count votes by team
         total_players = len(self.state.players)
-        yes_votes = sum(1 for vote in self.state.back_to_lobby_votes.values() if vote)
-        team_a_yes = sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                        if vote and self.state.players[pid].team == "A")
-        team_b_yes = sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                        if vote and self.state.players[pid].team == "B")
+        tally = self.vote_tally(VOTE_LOBBY)
+        yes_votes, team_a_yes, team_b_yes = tally.yes, tally.team_a_yes, tally.team_b_yes
         
         # Check if we have one vote from each team
         if team_a_yes >= 1 and team_b_yes >= 1:
             # Return to lobby
             self.state.phase = "lobby"
             self.state.lobby_locked = False
-            self.state.back_to_lobby_votes = {}
-            self.state.abort_votes = {}
+            self._clear_votes(VOTE_LOBBY)
+            self._clear_votes(VOTE_ABORT)
             
             # Reset game state
             self.state.turn_player = None
             self.state.ask_chain_from = None
             self.state.deck_count = 0
             self.state.current_dealer = None
-            self.state.table_sets = []
+            self._clear_table()
             
             # Clear all players' hands
-            for player in self.state.players.values():
-                player.hand = []
+            self._clear_hands()
             
             logger.info(f"Returned to lobby by team vote in room {self.state.room_id}")
             return {
@@ -341,6 +779,7 @@ class Game:
             "votes": {"yes": yes_votes, "total": total_players, "team_a_yes": team_a_yes, "team_b_yes": team_b_yes}
         }
 
+    @recorded()
     def vote_back_to_lobby(self, voter_id: str, vote: bool) -> dict:
         """
         Cast a vote for returning to lobby.
@@ -354,11 +793,11 @@ class Game:
             return {"success": False, "reason": "no_voting", "message": "No back to lobby voting in progress"}
         
         # Cast vote
-        self.state.back_to_lobby_votes[voter_id] = vote
+        self._cast_vote(VOTE_LOBBY, voter_id, vote)
         
         # If anyone votes NO, immediately fail the voting
         if vote is False:
-            self.state.back_to_lobby_votes = {}
+            self._clear_votes(VOTE_LOBBY)
             logger.info(f"Back to lobby voting failed - {voter_id} voted NO in room {self.state.room_id}")
             return {
                 "success": False, 
@@ -371,32 +810,28 @@ class Game:
         
         # Count votes
         total_players = len(self.state.players)
-        yes_votes = sum(1 for v in self.state.back_to_lobby_votes.values() if v)
-        no_votes = sum(1 for v in self.state.back_to_lobby_votes.values() if not v)
+        tally = self.vote_tally(VOTE_LOBBY)
+        yes_votes, no_votes = tally.yes, tally.no
         
         # Check if we have one vote from each team
-        team_a_yes = sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                        if vote and self.state.players[pid].team == "A")
-        team_b_yes = sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                        if vote and self.state.players[pid].team == "B")
+        team_a_yes, team_b_yes = tally.team_a_yes, tally.team_b_yes
         
         if team_a_yes >= 1 and team_b_yes >= 1:
             # Return to lobby
             self.state.phase = "lobby"
             self.state.lobby_locked = False
-            self.state.back_to_lobby_votes = {}
-            self.state.abort_votes = {}
+            self._clear_votes(VOTE_LOBBY)
+            self._clear_votes(VOTE_ABORT)
             
             # Reset game state
             self.state.turn_player = None
             self.state.ask_chain_from = None
             self.state.deck_count = 0
             self.state.current_dealer = None
-            self.state.table_sets = []
+            self._clear_table()
             
             # Clear all players' hands
-            for player in self.state.players.values():
-                player.hand = []
+            self._clear_hands()
             
             logger.info(f"Returned to lobby by team vote in room {self.state.room_id}")
             return {
@@ -407,18 +842,11 @@ class Game:
             }
         
         # Check if voting failed (impossible to get one from each team)
-        # Count total players per team
-        team_a_players = sum(1 for p in self.state.players.values() if p.team == "A")
-        team_b_players = sum(1 for p in self.state.players.values() if p.team == "B")
-        
-        # Check if it's impossible to get one vote from each team
-        team_a_remaining = team_a_players - sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                                               if self.state.players[pid].team == "A")
-        team_b_remaining = team_b_players - sum(1 for pid, vote in self.state.back_to_lobby_votes.items() 
-                                               if self.state.players[pid].team == "B")
+        team_a_remaining = self.team_size("A") - tally.team_a_voted
+        team_b_remaining = self.team_size("B") - tally.team_b_voted
         
         if (team_a_yes == 0 and team_a_remaining == 0) or (team_b_yes == 0 and team_b_remaining == 0):
-            self.state.back_to_lobby_votes = {}
+            self._clear_votes(VOTE_LOBBY)
             logger.info(f"Back to lobby voting failed in room {self.state.room_id}")
             return {
                 "success": False, 
@@ -448,30 +876,56 @@ class Game:
         ranks = Game.ranks_for(set_type)
         return [Card(suit=suit, rank=r) for r in ranks]
 
+    def hand_mask(self, pid: str) -> int:
+        """Bitmask of the player's hand (see cards.py)"""
+        return self._hands.get(pid, 0)
+
+    def _set_hand(self, pid: str, mask: int):
+        if pid not in self._hands_before:
+            self._hands_before[pid] = self._hands.get(pid, 0)
+        if mask:
+            self._hands[pid] = mask
+        else:
+            self._hands.pop(pid, None)
+        self.state.players[pid].hand = mask
+        self._index.set_cards(pid, mask.bit_count())
+
+    def _clear_hands(self):
+        for pid, mask in self._hands.items():
+            self._hands_before.setdefault(pid, mask)
+        self._hands = {}
+        for player in self.state.players.values():
+            player.hand = 0
+        self._index.clear_cards()
+
     def has_at_least_one_in_set(self, player: Player, suit: str, set_type: str) -> bool:
-        ranks = self.ranks_for(set_type)
-        return any(c.suit == suit and c.rank in ranks for c in player.hand)
+        return bool(self.hand_mask(player.id) & set_mask(suit, set_type))
 
     def _has_cards(self, pid: Optional[str]) -> bool:
         if not pid:
             return False
-        p = self.state.players.get(pid)
-        return bool(p and p.hand)
-
-    def _ccw_from(self, seat_idx: int) -> Optional[str]:
-        return self.state.seats.get((seat_idx - 1) % 6)
+        return bool(self._hands.get(pid))
 
     def _table_has_set(self, suit: str, set_type: str) -> bool:
-        return any(ts.suit == suit and ts.set_type == set_type for ts in self.state.table_sets)
+        return bool(self._index.claimed >> SET_INDEX[(suit, set_type)] & 1)
 
-    def _next_ccw_matching(self, start_seat: int, predicate) -> Optional[str]:
+    def _next_ccw_holder(self, start_seat: int, team: Optional[str]) -> Optional[str]:
         """
-        Walk CCW starting after start_seat, return first player_id that matches predicate.
+        Nearest seated player CCW after start_seat (start_seat itself last) who
+        still has cards, preferring `team`; None when nobody has cards.
         """
-        for step in range(1, 7):
-            pid = self.state.seats.get((start_seat - step) % 6)
-            if pid and predicate(pid):
-                return pid
+        seat_of = self._index.seat_of
+        for holders in (self._index.holding.get(team, ()), self._index.card_count):
+            best, best_dist = None, SEAT_COUNT + 1
+            for pid in holders:
+                seat = seat_of.get(pid)
+                if seat is None:
+                    continue
+                dist = (start_seat - seat) % SEAT_COUNT or SEAT_COUNT
+                if dist < best_dist:
+                    best, best_dist = pid, dist
+            if best is not None:
+                return best
         return None
 
     # ---------------- ASK (prepare -> confirm) ----------------
@@ -487,7 +941,7 @@ class Game:
             raise ValueError("Must ask an opponent")
 
         # NEW: cannot ask an empty-handed player
-        if not target.hand:
+        if not self.hand_mask(target_id):
             return {
                 "success": False,
                 "reason": "target_empty",
@@ -502,16 +956,10 @@ class Game:
         if not self.has_at_least_one_in_set(asker, suit, set_type):
             raise ValueError("You must hold at least one card from that set")
 
-        wanted = set(ranks or [])
-        owned = {(c.suit, c.rank) for c in asker.hand}
-        wanted = {r for r in wanted if (suit, r) not in owned}
+        wanted = ranks_mask(suit, ranks or []) & ~self.hand_mask(asker_id)
+        pending = self.hand_mask(target_id) & wanted
 
-        pending_cards: List[Card] = []
-        for c in target.hand:
-            if c.suit == suit and c.rank in wanted:
-                pending_cards.append(c)
-
-        if not pending_cards:
+        if not pending:
             # explicit NO confirmation flow (UI shows target confirm NO)
             return {
                 "success": False,
@@ -520,77 +968,81 @@ class Game:
                 "target_id": target_id,
                 "suit": suit,
                 "set_type": set_type,
-                "ranks": list(wanted),
+                "ranks": rank_list(wanted),
                 "needs_no_confirm": True,
             }
 
         return {
             "success": True,
-            "pending_cards": [c.model_dump() for c in pending_cards],
+            "pending_cards": to_dicts(pending),
             "asker_id": asker_id,
             "target_id": target_id,
             "suit": suit,
             "set_type": set_type,
-            "ranks": list(wanted),
+            "ranks": rank_list(wanted),
             "needs_no_confirm": False,
         }
 
+    @recorded("cards")
     def confirm_pass(self, asker_id: str, target_id: str, cards: List[Card]):
         target = self.state.players[target_id]
-        asker = self.state.players[asker_id]
+        if asker_id not in self.state.players:
+            raise KeyError(asker_id)  # before any hand changes
 
         if not cards:
             # explicit NO; pass turn to target UNLESS target is empty,
             # in which case skip to next CCW teammate with cards
-            if target.hand:
+            if self._has_cards(target_id):
                 self.state.turn_player = target_id
                 return {"success": False, "reason": "no_card", "next_turn": target_id}
             # skip empty-handed
             start_seat = target.seat or 0
-            next_pid = self._next_ccw_matching(
-                start_seat, lambda pid: self.state.players[pid].team == target.team and self._has_cards(pid)
-            ) or self._next_ccw_matching(start_seat, lambda pid: self._has_cards(pid))
+            next_pid = self._next_ccw_holder(start_seat, target.team)
             self.state.turn_player = next_pid
             return {"success": False, "reason": "no_card", "next_turn": next_pid}
 
-        to_pass: List[Card] = []
-        for card in cards:
-            found = None
-            for c in target.hand:
-                if c.suit == card.suit and c.rank == card.rank:
-                    found = c
-                    break
-            if found:
-                to_pass.append(found)
+        to_pass = self.hand_mask(target_id) & mask_of(cards)
 
         if to_pass:
-            tset = {(c.suit, c.rank) for c in to_pass}
-            target.hand = [c for c in target.hand if (c.suit, c.rank) not in tset]
-            aexist = {(c.suit, c.rank) for c in asker.hand}
-            for c in to_pass:
-                if (c.suit, c.rank) not in aexist:
-                    asker.hand.append(c)
+            self._set_hand(target_id, self.hand_mask(target_id) & ~to_pass)
+            self._set_hand(asker_id, self.hand_mask(asker_id) | to_pass)
 
             self.state.turn_player = asker_id
             return {
                 "success": True,
-                "transferred": [c.model_dump() for c in to_pass],
+                "transferred": to_dicts(to_pass),
                 "next_turn": asker_id,
             }
 
         # nothing passed -> same logic as NO
-        if target.hand:
+        if self._has_cards(target_id):
             self.state.turn_player = target_id
             return {"success": False, "reason": "no_card", "next_turn": target_id}
 
         start_seat = target.seat or 0
-        next_pid = self._next_ccw_matching(
-            start_seat, lambda pid: self.state.players[pid].team == target.team and self._has_cards(pid)
-        ) or self._next_ccw_matching(start_seat, lambda pid: self._has_cards(pid))
+        next_pid = self._next_ccw_holder(start_seat, target.team)
         self.state.turn_player = next_pid
         return {"success": False, "reason": "no_card", "next_turn": next_pid}
 
+    @recorded()
+    def expire_turn(self, player_id: str) -> Optional[dict]:
+        """
+        `player_id` ran out of time for their turn (TURN_TIMEOUT_S): the turn goes
+        to the nearest opponent CCW who holds cards. None if it is no longer their turn.
+        """
+        player = self.state.players.get(player_id)
+        if self.state.phase != "playing" or self.state.turn_player != player_id or player is None or player.seat is None:
+            return None
+        opponents = "B" if player.team == "A" else "A"
+        next_pid = self._next_ccw_holder(player.seat, opponents)
+        if next_pid is None or next_pid == player_id:
+            return None
+        self.state.turn_player = next_pid
+        logger.info(f"Turn of {player_id} timed out in room {self.state.room_id}, passing to {next_pid}")
+        return {"player_id": player_id, "player_name": player.name, "next_turn": next_pid}
+
     # ---------------- Laydown ----------------
+    @recorded()
     def laydown(
         self,
         who_id: str,
@@ -600,30 +1052,13 @@ class Game:
     ):
 
         my = self.state.players[who_id]
-        needed_ranks = set(self.ranks_for(set_type))
+        needed = set_mask(suit, set_type)
 
-        # normalize collaborators
-        coll_map: Dict[str, List[str]] = {}
-        
-        if isinstance(collaborators, dict):
-            coll_map = {k: list(v) for k, v in collaborators.items()}
-        elif isinstance(collaborators, list):
-            for item in collaborators:
-                if not item:
-                    continue
-                if isinstance(item, dict) and "player_id" in item:
-                    # Frontend sends: {'player_id': '...', 'ranks': [...]}
-                    coll_map[item["player_id"]] = list(item.get("ranks", []))
-                elif isinstance(item, dict) and "pid" in item:
-                    # Legacy format: {'pid': '...', 'ranks': [...]}
-                    coll_map[item["pid"]] = list(item.get("ranks", []))
-                else:
-                    # Fallback: treat as key-value pairs
-                    for k, v in item.items():
-                        if isinstance(v, list):
-                            coll_map[k] = list(v)
-
-        declared = {c.rank for c in my.hand if c.suit == suit and c.rank in needed_ranks}
+        # Messages arrive with the {player_id: ranks} mapping (models/websocket.py);
+        # list forms only come from event logs written before that
+        coll_map = collaborators if isinstance(collaborators, dict) else collaborator_ranks(collaborators)
+
+        declared = self.hand_mask(who_id) & needed
         contributors: List[Dict] = []
 
         for pid, ranks in coll_map.items():
@@ -633,57 +1068,32 @@ class Game:
             if p.team != my.team:
                 raise ValueError("Collaborators must be teammates")
             # Cannot contribute from empty-handed teammates
-            if not p.hand:
+            if not self._has_cards(pid):
                 raise ValueError(f"Cannot contribute from {p.name} - they have no cards")
             
-            # Check if teammate actually has the assigned cards
-            teammate_hand_ranks = {c.rank for c in p.hand if c.suit == suit and c.rank in needed_ranks}
-            
-            for r in ranks:
-                if r in needed_ranks:
-                    # Only add to declared if teammate actually has this card
-                    if r in teammate_hand_ranks:
-                        declared.add(r)
-                    else:
-                        # Teammate doesn't have this card - this will cause the laydown to fail
-                        pass
+            # Only cards the teammate actually holds count as declared;
+            # anything else makes the laydown fail
+            declared |= self.hand_mask(pid) & ranks_mask(suit, ranks) & needed
 
         # --- Failure: opponent wins, capture full set to table; choose next turn smartly
-        if declared != needed_ranks:
+        if declared != needed:
             loser_team = my.team
             winner_team = "A" if loser_team == "B" else "B"
 
-            def pull_from(pid: str) -> List[Card]:
-                p = self.state.players[pid]
-                keep, take = [], []
-                for c in p.hand:
-                    if c.suit == suit and c.rank in needed_ranks:
-                        take.append(c)
-                    else:
-                        keep.append(c)
-                p.hand = keep
-                return take
-
-            collected: List[Card] = []
+            collected = 0
             for pid in list(self.state.players.keys()):
-                got = pull_from(pid)
+                got = self.hand_mask(pid) & needed
                 if got:
-                    contributors.append({"player_id": pid, "cards": [g.model_dump() for g in got]})
-                    collected.extend(got)
-
-            if not self._table_has_set(suit, set_type):
-                self.state.table_sets.append(
-                    TableSet(suit=suit, set_type=set_type, cards=collected, owner_team=winner_team)
-                )
+                    self._set_hand(pid, self.hand_mask(pid) & ~got)
+                    contributors.append({"player_id": pid, "cards": to_dicts(got)})
+                    collected |= got
 
-            self.state.team_scores[winner_team] += POINTS[set_type]
+            self._claim_set(suit, set_type, collected, winner_team)
 
             # NEW: turn goes CCW to the NEXT player who (a) has cards and (b) is on the WINNER team.
             # If none found on winner team, fall back to first CCW player with cards (any team).
             start_seat = my.seat or 0
-            next_pid = self._next_ccw_matching(
-                start_seat, lambda pid: self.state.players[pid].team == winner_team and self._has_cards(pid)
-            ) or self._next_ccw_matching(start_seat, lambda pid: self._has_cards(pid))
+            next_pid = self._next_ccw_holder(start_seat, winner_team)
             self.state.turn_player = next_pid
 
             # Check if game has ended
@@ -701,38 +1111,28 @@ class Game:
             }
 
         # --- Success: remove only declarers' cards and score for my team
-        def remove_from(pid: str, ranks_set: set[str]) -> List[Card]:
-            p = self.state.players[pid]
-            keep, give = [], []
-            for c in p.hand:
-                if c.suit == suit and c.rank in ranks_set:
-                    give.append(c)
-                else:
-                    keep.append(c)
-            p.hand = keep
+        def remove_from(pid: str, mask: int) -> int:
+            give = self.hand_mask(pid) & mask
+            if give:
+                self._set_hand(pid, self.hand_mask(pid) & ~give)
             return give
 
-        all_cards: List[Card] = []
-        mine_set = {c.rank for c in self.state.players[who_id].hand if c.suit == suit and c.rank in needed_ranks}
-        got_mine = remove_from(who_id, mine_set)
+        all_cards = 0
+        got_mine = remove_from(who_id, needed)
         if got_mine:
-            contributors.append({"player_id": who_id, "cards": [c.model_dump() for c in got_mine]})
-            all_cards.extend(got_mine)
+            contributors.append({"player_id": who_id, "cards": to_dicts(got_mine)})
+            all_cards |= got_mine
         for pid, ranks in coll_map.items():
-            rs = set(r for r in ranks if r in needed_ranks)
+            rs = ranks_mask(suit, ranks) & needed
             if not rs:
                 continue
             got = remove_from(pid, rs)
             if got:
-                contributors.append({"player_id": pid, "cards": [c.model_dump() for c in got]})
-                all_cards.extend(got)
+                contributors.append({"player_id": pid, "cards": to_dicts(got)})
+                all_cards |= got
 
         owner_team = my.team
-        if not self._table_has_set(suit, set_type):
-            self.state.table_sets.append(
-                TableSet(suit=suit, set_type=set_type, cards=all_cards, owner_team=owner_team)
-            )
-        self.state.team_scores[owner_team] += POINTS[set_type]
+        self._claim_set(suit, set_type, all_cards, owner_team)
 
         handoff_eligible = [
             c["player_id"]
@@ -743,9 +1143,6 @@ class Game:
         # Check if game has ended
         game_end_result = self.check_game_end()
 
-        # Log all player hands after laydown
-        self.log_all_player_hands(f"AFTER LAYDOWN - {my.name} ({suit} {set_type})")
-
         return {
             "success": True,
             "who_id": who_id,
@@ -759,6 +1156,7 @@ class Game:
         }
 
     # ---------------- Pass Cards ----------------
+    @recorded("cards")
     def pass_cards(self, from_player_id: str, to_player_id: str, cards: List[Card]):
         """Pass cards from one player to another (opponent only)"""
         if from_player_id not in self.state.players or to_player_id not in self.state.players:
@@ -772,20 +1170,13 @@ class Game:
             raise ValueError("Can only pass cards to opponent team")
         
         # Check if from_player has all the cards
-        from_hand = {(c.suit, c.rank) for c in from_player.hand}
-        cards_to_pass = {(c.suit, c.rank) for c in cards}
-        
-        if not cards_to_pass.issubset(from_hand):
+        moving = mask_of(cards)
+        if moving & ~self.hand_mask(from_player_id):
             raise ValueError("Player doesn't have all the specified cards")
         
-        # Remove cards from from_player's hand
-        from_player.hand = [c for c in from_player.hand if (c.suit, c.rank) not in cards_to_pass]
-        
-        # Add cards to to_player's hand
-        to_player.hand.extend(cards)
-        
-        # Log all player hands after card passing
-        self.log_all_player_hands(f"AFTER PASS - {from_player.name} -> {to_player.name}")
+        # Move the cards between hands
+        self._set_hand(from_player_id, self.hand_mask(from_player_id) & ~moving)
+        self._set_hand(to_player_id, self.hand_mask(to_player_id) | moving)
         
         # Check if game should end after card transfer
         game_end_result = self.check_game_end()
@@ -795,13 +1186,14 @@ class Game:
             "from_player": from_player_id,
             "to_player": to_player_id,
             "cards": [c.model_dump() for c in cards],
-            "from_hand_count": len(from_player.hand),
-            "to_hand_count": len(to_player.hand),
+            "from_hand_count": self.cards_held(from_player_id),
+            "to_hand_count": self.cards_held(to_player_id),
             "game_end": game_end_result
         }
 
 
     # ---------------- Handoff after successful laydown ----------------
+    @recorded()
     def handoff_after_laydown(self, who_id: str, to_id: str):
         if who_id not in self.state.players or to_id not in self.state.players:
             return {"ok": False, "reason": "unknown_player", "turn_player": self.state.turn_player}
@@ -812,7 +1204,7 @@ class Game:
             return {"ok": False, "reason": "not_teammate", "turn_player": self.state.turn_player}
 
         # NEW: cannot hand off to an empty-handed teammate
-        if not b.hand:
+        if not self._has_cards(to_id):
             return {"ok": False, "reason": "empty_hand", "turn_player": self.state.turn_player}
 
         self.state.turn_player = to_id
@@ -822,8 +1214,8 @@ class Game:
     def check_game_end(self):
         """Check if game should end and return game result if so"""
         # Game ends when all 8 sets are collected OR all players have empty hands
-        all_hands_empty = all(not player.hand for player in self.state.players.values())
-        sets_collected = len(self.state.table_sets) >= 8
+        all_hands_empty = not self._index.card_count
+        sets_collected = self._index.claimed == ALL_SETS_CLAIMED
         
         if sets_collected or all_hands_empty:
             self.state.phase = "ended"
@@ -844,32 +1236,31 @@ class Game:
                 "winner": winner,
                 "team_a_score": team_a_score,
                 "team_b_score": team_b_score,
-                "team_a_sets": len([s for s in self.state.table_sets if s.owner_team == "A"]),
-                "team_b_sets": len([s for s in self.state.table_sets if s.owner_team == "B"])
+                "team_a_sets": self.sets_won("A"),
+                "team_b_sets": self.sets_won("B")
             }
             
             logger.info(f"Game ended in room {self.state.room_id}: Winner={winner}, A={team_a_score}, B={team_b_score}, Sets={len(self.state.table_sets)}")
             return result
         return {"game_ended": False}
 
+    @recorded()
     def request_abort(self, requester_id: str):
         """Request to abort the current game - requires one player from each team to accept"""
         if self.state.phase != "playing":
             return {"success": False, "reason": "not_playing"}
         
         # Clear any previous abort votes
-        self.state.abort_votes = {}
+        self._clear_votes(VOTE_ABORT)
         
         # Add the requester's vote
-        self.state.abort_votes[requester_id] = True
+        self._cast_vote(VOTE_ABORT, requester_id, True)
         
         # Count votes by team
         total_players = len(self.state.players)
         votes_for_abort = len(self.state.abort_votes)
-        team_a_yes = sum(1 for pid, vote in self.state.abort_votes.items() 
-                        if vote and self.state.players[pid].team == "A")
-        team_b_yes = sum(1 for pid, vote in self.state.abort_votes.items() 
-                        if vote and self.state.players[pid].team == "B")
+        tally = self.vote_tally(VOTE_ABORT)
+        team_a_yes, team_b_yes = tally.team_a_yes, tally.team_b_yes
         
         return {
             "success": True, 
@@ -881,22 +1272,22 @@ class Game:
             "abort_votes": self.state.abort_votes
         }
 
-    def check_voting_timeout(self):
-        """Check if voting has timed out and handle it"""
-        if not hasattr(self.state, 'abort_votes') or not self.state.abort_votes:
+    @recorded()
+    def expire_vote(self, kind: str) -> Optional[dict]:
+        """Close an open vote whose deadline passed (see services/room_timers.py); None if none is open"""
+        if not getattr(self.state, VOTE_FIELDS[kind]):
             return None
-        
-        # For now, we'll implement a simple timeout check
-        # In a real implementation, you'd want to track when voting started
-        # and check against a timeout duration (e.g., 60 seconds)
-        
-        # This is a placeholder - in practice you'd want to:
-        # 1. Store the voting start time when request_abort is called
-        # 2. Check if current time - start time > timeout duration
-        # 3. If so, call _handle_voting_failure("timeout")
-        
-        return None
+        logger.info(f"{kind} vote timed out in room {self.state.room_id}")
+        if kind == VOTE_ABORT:
+            return self._handle_voting_failure("timeout")
+        self._clear_votes(VOTE_LOBBY)
+        return {
+            "success": False,
+            "reason": "voting_failed",
+            "message": "Back to lobby vote timed out - no decision reached",
+        }
 
+    @recorded()
     def vote_abort(self, voter_id: str, vote: bool):
         """Vote on abort request"""
         if self.state.phase != "playing":
@@ -906,11 +1297,11 @@ class Game:
             return {"success": False, "reason": "no_abort_request"}
         
         # Add/update vote
-        self.state.abort_votes[voter_id] = vote
+        self._cast_vote(VOTE_ABORT, voter_id, vote)
         
         # If anyone votes NO, immediately fail the voting
         if vote is False:
-            self.state.abort_votes = {}
+            self._clear_votes(VOTE_ABORT)
             logger.info(f"Abort voting failed - {voter_id} voted NO in room {self.state.room_id}")
             return {
                 "success": False, 
@@ -924,26 +1315,18 @@ class Game:
         
         # Count votes
         total_players = len(self.state.players)
-        votes_for_abort = sum(1 for v in self.state.abort_votes.values() if v)
-        votes_against = sum(1 for v in self.state.abort_votes.values() if v is False)
+        tally = self.vote_tally(VOTE_ABORT)
+        votes_for_abort = tally.yes
         
         # Check if we have one vote from each team
-        team_a_yes = sum(1 for pid, vote in self.state.abort_votes.items() 
-                        if vote and self.state.players[pid].team == "A")
-        team_b_yes = sum(1 for pid, vote in self.state.abort_votes.items() 
-                        if vote and self.state.players[pid].team == "B")
+        team_a_yes, team_b_yes = tally.team_a_yes, tally.team_b_yes
         
         if team_a_yes >= 1 and team_b_yes >= 1:
             return self._execute_abort()
         
         # Check if voting has failed (impossible to get one from each team)
-        team_a_players = sum(1 for p in self.state.players.values() if p.team == "A")
-        team_b_players = sum(1 for p in self.state.players.values() if p.team == "B")
-        
-        team_a_remaining = team_a_players - sum(1 for pid, vote in self.state.abort_votes.items() 
-                                               if self.state.players[pid].team == "A")
-        team_b_remaining = team_b_players - sum(1 for pid, vote in self.state.abort_votes.items() 
-                                               if self.state.players[pid].team == "B")
+        team_a_remaining = self.team_size("A") - tally.team_a_voted
+        team_b_remaining = self.team_size("B") - tally.team_b_voted
         
         if (team_a_yes == 0 and team_a_remaining == 0) or (team_b_yes == 0 and team_b_remaining == 0):
             return self._handle_voting_failure("insufficient_support")
@@ -963,8 +1346,7 @@ class Game:
     def _handle_voting_failure(self, reason: str):
         """Handle voting failure scenarios"""
         # Clear abort votes
-        if hasattr(self.state, 'abort_votes'):
-            delattr(self.state, 'abort_votes')
+        self._clear_votes(VOTE_ABORT)
         
         if reason == "insufficient_support":
             return {
@@ -999,32 +1381,20 @@ class Game:
         self.state.ask_chain_from = None
         self.state.deck_count = 0
         self.state.team_scores = {"A": 0, "B": 0}
-        self.state.table_sets = []
+        self._clear_table()
         
         # Rotate dealer clockwise for new game
-        if self.state.current_dealer:
-            current_dealer_seat = None
-            for seat, pid in self.state.seats.items():
-                if pid == self.state.current_dealer:
-                    current_dealer_seat = seat
-                    break
-            
-            if current_dealer_seat is not None:
-                # Find next occupied seat clockwise
-                for offset in range(1, 7):
-                    next_seat = (current_dealer_seat + offset) % 6
-                    next_player_id = self.state.seats.get(next_seat)
-                    if next_player_id:
-                        self.state.current_dealer = next_player_id
-                        break
+        current_dealer_seat = self.seat_of(self.state.current_dealer)
+        if current_dealer_seat is not None:
+            _, next_player_id = self._next_cw_seated(current_dealer_seat)
+            if next_player_id:
+                self.state.current_dealer = next_player_id
         
         # Clear abort votes
-        if hasattr(self.state, 'abort_votes'):
-            delattr(self.state, 'abort_votes')
+        self._clear_votes(VOTE_ABORT)
         
         # Clear all player hands
-        for player in self.state.players.values():
-            player.hand = []
+        self._clear_hands()
         
         return {
             "success": True,
@@ -1032,18 +1402,14 @@ class Game:
             "message": "Game aborted. Ready for new game."
         }
 
+    @recorded()
     def shuffle_deal_new_game(self, dealer_id: str):
         """Start a new game with shuffle and deal, rotating dealer and turn"""
         if self.state.phase not in ["ended", "lobby", "ready"]:
             return {"success": False, "reason": "game_in_progress"}
         
         # Find current dealer seat (the one who clicked the button)
-        current_dealer_seat = None
-        if self.state.current_dealer:
-            for seat, pid in self.state.seats.items():
-                if pid == self.state.current_dealer:
-                    current_dealer_seat = seat
-                    break
+        current_dealer_seat = self.seat_of(self.state.current_dealer)
         
         # If no current dealer found, start with seat 0
         if current_dealer_seat is None:
@@ -1052,15 +1418,6 @@ class Game:
         # Store the original dealer (who clicked) for animation purposes
         original_dealer_id = self.state.current_dealer
         original_dealer_seat = current_dealer_seat
-        
-        # Determine the next dealer clockwise from the player who clicked
-        def find_next_occupied_seat(start_seat):
-            for offset in range(1, 7):
-                seat = (start_seat + offset) % 6
-                player_id = self.state.seats.get(seat)
-                if player_id:
-                    return seat, player_id
-            return None, None
 
         # Never rotate dealer in shuffle_deal_new_game - keep current dealer
         # Dealer rotation only happens in start_new_round() or new game button
@@ -1071,7 +1428,7 @@ class Game:
             return {"success": False, "reason": "no_dealer"}
 
         # Turn starts from the player clockwise from the new dealer
-        next_turn_seat, next_turn_id = find_next_occupied_seat(next_dealer_seat)
+        next_turn_seat, next_turn_id = self._next_cw_seated(next_dealer_seat)
 
         if next_turn_seat is None or not next_turn_id:
             return {"success": False, "reason": "no_turn_player"}
@@ -1080,7 +1437,7 @@ class Game:
         # Reset game state
         self.state.phase = "playing"
         self.state.team_scores = {"A": 0, "B": 0}
-        self.state.table_sets = []
+        self._clear_table()
         self.state.current_dealer = next_dealer_id
         self.state.turn_player = next_turn_id
         
@@ -1089,35 +1446,8 @@ class Game:
 
         deal_start_seat = next_turn_seat  # Start dealing from the turn player (clockwise from dealer)
 
-        # Create dealing sequence for animation to mirror real dealing order
-        dealing_sequence = []
-        temp_deck = self._deck.copy()  # Copy for animation purposes
-        order = [(deal_start_seat + i) % 6 for i in range(6)]
-
-        round_num = 0
-        while temp_deck:
-            dealt_this_round = False
-            for seat in order:
-                if not temp_deck:
-                    break
-                player_id = self.state.seats.get(seat)
-                if not player_id:
-                    continue
-                card = temp_deck.pop(0)
-                dealt_this_round = True
-                dealing_sequence.append({
-                    "seat": seat,
-                    "player_id": player_id,
-                    "round": round_num,
-                    "card": {"suit": card.suit, "rank": card.rank},
-                    "from_seat": None  # Animation origin handled on frontend
-                })
-            if not dealt_this_round:
-                break
-            round_num += 1
-
-        # Now actually deal the cards using the same start seat
-        self.deal_all(start_from_seat=deal_start_seat)
+        # Deal and build the animation sequence in the same pass
+        dealing_sequence = self.deal_all(start_from_seat=deal_start_seat)
         
         return {
             "success": True,
@@ -1130,47 +1460,27 @@ class Game:
             "dealing_sequence": dealing_sequence
         }
 
+    @recorded()
     def start_new_round(self, requester_id: str):
         """Start a new round after game over, rotating dealer clockwise"""
         if self.state.phase != "ended":
             return {"success": False, "reason": "game_not_ended"}
         
         # Find current dealer seat
-        current_dealer_seat = None
-        if self.state.current_dealer:
-            for seat, pid in self.state.seats.items():
-                if pid == self.state.current_dealer:
-                    current_dealer_seat = seat
-                    break
+        current_dealer_seat = self.seat_of(self.state.current_dealer)
         
         # If no current dealer found, start with seat 0
         if current_dealer_seat is None:
             current_dealer_seat = 0
         
         # Find next occupied seat clockwise
-        next_dealer_seat = None
-        next_dealer_id = None
-        for offset in range(1, 7):
-            seat = (current_dealer_seat + offset) % 6
-            player_id = self.state.seats.get(seat)
-            if player_id:
-                next_dealer_seat = seat
-                next_dealer_id = player_id
-                break
+        next_dealer_seat, next_dealer_id = self._next_cw_seated(current_dealer_seat)
         
         if not next_dealer_id:
             return {"success": False, "reason": "no_dealer"}
         
         # Turn starts from the next player after dealer
-        next_turn_seat = None
-        next_turn_id = None
-        for offset in range(1, 7):
-            seat = (next_dealer_seat + offset) % 6
-            player_id = self.state.seats.get(seat)
-            if player_id:
-                next_turn_seat = seat
-                next_turn_id = player_id
-                break
+        next_turn_seat, next_turn_id = self._next_cw_seated(next_dealer_seat)
         
         if not next_turn_id:
             return {"success": False, "reason": "no_turn_player"}
@@ -1178,7 +1488,7 @@ class Game:
         # Reset game state for new round
         self.state.phase = "ready"  # Ready for shuffle & deal
         self.state.team_scores = {"A": 0, "B": 0}
-        self.state.table_sets = []
+        self._clear_table()
         self.state.current_dealer = next_dealer_id
         self.state.turn_player = None  # Will be set after shuffle & deal
         self.state.ask_chain_from = None
@@ -3,9 +3,14 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from loguru import logger
 
-from routes import rooms_router, websocket_router, discord_exchange_router
+from routes import rooms_router, websocket_router, discord_exchange_router, metrics_router
+from routes.websocket import handle_message, reap_connection
+from services.bot_service import BotService
+from services.game_service import GameService
+from services.room_timers import RoomTimers
 from services.websocket_service import WebSocketService
-from config import setup_logging
+from sharding import RoomShardGuard
+from config import flush_logging, setup_logging
 from dotenv import load_dotenv
 
 # Load .env file into environment
@@ -17,6 +22,9 @@ logger.info("Starting Set Game Backend")
 
 app = FastAPI()
 
+# Reject requests for rooms owned by another worker (no-op unless WORKER_COUNT > 1)
+app.add_middleware(RoomShardGuard)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -31,7 +39,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+async def restore_rooms():
+    GameService.init_store()
+    BotService.start(handle_message)
+    RoomTimers.start()
+    WebSocketService.start_heartbeat(reap_connection)
+
+@app.on_event("shutdown")
+async def persist_rooms():
+    await BotService.stop()
+    RoomTimers.stop()
+    WebSocketService.stop_heartbeat()
+    GameService.close_store()
+    flush_logging()
+
 # Include routers
 app.include_router(rooms_router)
 app.include_router(websocket_router)
-app.include_router(discord_exchange_router)
\ No newline at end of file
+app.include_router(discord_exchange_router)
+app.include_router(metrics_router)
\ No newline at end of file
@@ -0,0 +1,163 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Recording is a dict lookup and a couple of integer increments, so hot paths can
+record unconditionally. Values that already live elsewhere (open connections,
+queue depths) are not tracked at all: they are read by callbacks registered
+with `gauge`, only when the endpoint is scraped.
+"""
+from __future__ import annotations
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Seconds; spans a cheap handler (~50µs) up to a stalled event loop
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# Bytes per flushed room broadcast
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+# Label values come from clients (message types), so cap how many series one metric may grow
+MAX_SERIES = 64
+OVERFLOW_LABEL = "other"
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Labels, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_
+        self.label_names = labels
+        REGISTRY.append(self)
+
+    def _key(self, values: Labels, series: dict) -> Labels:
+        if values in series or len(series) < MAX_SERIES:
+            return values
+        return (OVERFLOW_LABEL,) * len(values)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_, labels)
+        self.values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        key = self._key(labels, self.values)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, v in self.values.items():
+            lines.append(f"{self.name}{_labels(self.label_names, values)} {_number(v)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help_, labels)
+        self.buckets = buckets
+        self.series: Dict[Labels, list] = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, *labels: str):
+        key = self._key(labels, self.series)
+        s = self.series.get(key)
+        if s is None:
+            s = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        s[0][bisect_left(self.buckets, value)] += 1
+        s[1] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, (counts, total) in self.series.items():
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, values, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, values)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, values)} {running}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value read from `read()` at scrape time: {label values: value}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_: str, read: Callable[[], Dict[Labels, float]], labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_, labels)
+        self.read = read
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for values, v in self.read().items():
+            lines.append(f"{self.name}{_labels(self.label_names, values)} {_number(v)}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+
+def gauge(name: str, help_: str, labels: Tuple[str, ...] = ()):
+    """Decorator registering a scrape-time callback as a gauge"""
+    def register(read: Callable[[], Dict[Labels, float]]):
+        Gauge(name, help_, read, labels)
+        return read
+    return register
+
+
+def render() -> str:
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---------------- Hot-path metrics ----------------
+ws_messages = Counter("ws_messages_received_total", "Client messages received, by type", ("type",))
+room_actions = Histogram("room_action_seconds", "Time a room actor spends applying one action (message handler), by action", ("action",))
+room_action_wait = Histogram("room_action_queue_seconds", "Time an action waits in its room's queue before it runs")
+broadcast_flush = Histogram("ws_broadcast_flush_seconds", "Time to render and enqueue one room flush for all its connections")
+broadcast_bytes = Histogram("ws_broadcast_bytes", "Bytes (characters for text frames) enqueued by one room flush", buckets=SIZE_BUCKETS)
+frames_sent = Counter("ws_frames_enqueued_total", "Frames queued for sending")
+bytes_sent = Counter("ws_bytes_enqueued_total", "Bytes (characters for text frames) queued for sending")
+state_serialize = Histogram("state_serialize_seconds", "Time to render the room state as a dict when committing a version")
+connections_dropped = Counter("ws_connections_dropped_total", "Connections dropped by the server, by reason", ("reason",))
+resumes = Counter("ws_resumes_total", "Reconnects asking to resume: missed messages replayed, or a full snapshot because the gap was too old", ("outcome",))
+heartbeat_rtt = Histogram("ws_heartbeat_rtt_seconds", "Ping to pong round trip, including time queued behind other frames")
+timers_fired = Counter("room_timers_fired_total", "Room timers that came due, by kind (vote, turn, grace, idle)", ("kind",))
+ws_rejected = Counter("ws_messages_rejected_total", "Client frames rejected before reaching a room: bad JSON, missing type or invalid payload")
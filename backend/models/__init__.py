@@ -1,11 +1,11 @@
-from .card import Card, Suit, SetType
+from .card import Card, Rank, Suit, SetType
 from .player import Player
 from .room import RoomState, TableSet
-from .websocket import WSMessage
+from .websocket import PAYLOADS, collaborator_ranks, parse_client_message, parse_payload
 
 __all__ = [
-    "Card", "Suit", "SetType",
+    "Card", "Rank", "Suit", "SetType",
     "Player", 
     "RoomState", "TableSet",
-    "WSMessage"
+    "PAYLOADS", "collaborator_ranks", "parse_client_message", "parse_payload"
 ]
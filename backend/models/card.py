@@ -4,7 +4,8 @@ from typing import Literal
 
 Suit = Literal["hearts", "diamonds", "clubs", "spades"]
 SetType = Literal["lower", "upper"]
+Rank = Literal["2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K", "A"]
 
 class Card(BaseModel):
     suit: Suit
-    rank: str  # "2"–"10", "J", "Q", "K", "A"
+    rank: Rank
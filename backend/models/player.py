@@ -13,3 +13,5 @@ class Player(BaseModel):
     connected: bool = True  # Track connection status
     is_spectator: bool = False  # True if player is a spectator
     spectator_request_pending: bool = False  # True if spectator request is pending admin approval
+    is_ai: bool = False  # Seat played by the server (see bots.py)
+    stand_in: bool = False  # is_ai only until the (disconnected) player reconnects
@@ -10,6 +10,7 @@ class TableSet(BaseModel):
     cards: List[Card]
     owner_team: str
 
+# Schema of the state at the API edge; Game itself works on room_state.RoomState
 class RoomState(BaseModel):
     room_id: str
     players: Dict[str, Player]
@@ -1,6 +1,216 @@
+"""
+Messages clients send over the room socket. Every type has a payload model;
+`parse_client_message` decodes and validates a frame in one pass into the
+model for its type (a union discriminated on "type"), so handlers get typed,
+complete payloads and malformed frames fail before reaching a room.
+"""
 from __future__ import annotations
-from pydantic import BaseModel
+from typing import Annotated, Any, Dict, List, Literal, Optional, Type, Union
+from pydantic import BaseModel, BeforeValidator, ConfigDict, Field, TypeAdapter, create_model
 
-class WSMessage(BaseModel):
-    type: str
-    payload: dict
+from .card import Card, Rank, SetType, Suit
+
+Team = Literal["A", "B"]
+
+
+def _cards_in(value: Any) -> Any:
+    """Cards arrive as {"suit", "rank"} objects, card ids or a bitmask (see services/wire.py)"""
+    from cards import card_dict, to_dicts  # cards imports models
+
+    if value is None:
+        return []
+    if isinstance(value, int):
+        return to_dicts(value)
+    if isinstance(value, list):
+        return [card_dict(c) if isinstance(c, int) else c for c in value]
+    return value
+
+
+def collaborator_ranks(value: Any) -> Dict[str, List[str]]:
+    """
+    Laydown collaborators as {player_id: ranks}. Clients send a list of
+    {"player_id", "ranks"} (older ones {"pid", "ranks"} or {player_id: ranks}
+    items) or the mapping itself.
+    """
+    if not value:
+        return {}
+    if isinstance(value, dict):
+        return {k: list(v) for k, v in value.items()}
+    ranks: Dict[str, List[str]] = {}
+    for item in value:
+        if not item:
+            continue
+        if "player_id" in item:
+            ranks[item["player_id"]] = list(item.get("ranks", []))
+        elif "pid" in item:
+            ranks[item["pid"]] = list(item.get("ranks", []))
+        else:
+            ranks.update({k: list(v) for k, v in item.items() if isinstance(v, list)})
+    return ranks
+
+
+Cards = Annotated[List[Card], BeforeValidator(_cards_in)]
+Ranks = Annotated[List[Rank], BeforeValidator(lambda v: v or [])]
+
+
+# ---------------- Lobby ----------------
+class SelectTeam(BaseModel):
+    player_id: str
+    team: Team
+
+class SelectSeat(BaseModel):
+    player_id: str
+    seat: int = Field(ge=0, le=5)
+    team: Team
+
+class LeaveSeat(BaseModel):
+    player_id: str
+
+class AddAiPlayer(BaseModel):
+    player_id: str
+    name: str
+    avatar: str
+    team: Team
+
+class UnassignPlayer(BaseModel):
+    admin_player_id: str
+    target_player_id: str
+
+class ApproveSpectator(BaseModel):
+    spectator_id: str
+    approved: bool
+
+class NoPayload(BaseModel):
+    pass
+
+class ShuffleDeal(BaseModel):
+    dealer_id: Optional[str] = None  # the sender when missing
+
+class DealerOnly(BaseModel):
+    dealer_id: str
+
+# ---------------- Play ----------------
+class Ask(BaseModel):
+    asker_id: str
+    target_id: str
+    suit: Suit
+    set_type: SetType
+    ranks: Ranks = []
+
+class ConfirmPass(BaseModel):
+    asker_id: str
+    target_id: str
+    cards: Cards = []
+    suit: Optional[Suit] = None  # echoed in ask_result
+    ranks: Optional[List[Rank]] = None
+
+class Laydown(BaseModel):
+    who_id: str
+    suit: Suit
+    set_type: SetType
+    collaborators: Annotated[Dict[str, List[Rank]], BeforeValidator(collaborator_ranks)] = {}
+
+class PassCards(BaseModel):
+    from_player_id: str
+    to_player_id: str
+    cards: Cards
+
+class Handoff(BaseModel):
+    who_id: str
+    to_id: str
+
+# ---------------- Votes & rounds ----------------
+class RequestVote(BaseModel):
+    requester_id: str
+
+class Vote(BaseModel):
+    voter_id: str
+    vote: bool
+
+class PlayerOnly(BaseModel):
+    player_id: str
+
+# ---------------- Chat & effects ----------------
+class BubbleMessage(BaseModel):
+    model_config = ConfigDict(extra="allow")  # variant-specific fields are forwarded as they are
+
+    player_id: str
+    variant: str
+
+class ChatMessage(BaseModel):
+    player_id: str
+    text: str
+
+class EmojiThrow(BaseModel):
+    from_player_id: str
+    to_player_id: str
+    emoji: str
+    emoji_name: str
+    category: str
+
+# ---------------- Connection ----------------
+class SetWire(BaseModel):
+    wire: str = "json"
+
+class Resync(BaseModel):
+    version: Optional[int] = None
+
+class Pong(BaseModel):
+    id: Optional[int] = None
+
+class UpdatePlayer(BaseModel):
+    # Sent by the Discord client after its profile loads; not applied server-side
+    model_config = ConfigDict(extra="allow")
+
+    player_id: str
+
+
+# Message type -> payload model
+PAYLOADS: Dict[str, Type[BaseModel]] = {
+    "select_team": SelectTeam,
+    "select_seat": SelectSeat,
+    "leave_seat": LeaveSeat,
+    "add_ai_player": AddAiPlayer,
+    "unassign_player": UnassignPlayer,
+    "approve_spectator": ApproveSpectator,
+    "start": NoPayload,
+    "shuffle_deal": ShuffleDeal,
+    "shuffle_deal_new_game": DealerOnly,
+    "ask": Ask,
+    "confirm_pass": ConfirmPass,
+    "laydown": Laydown,
+    "pass_cards": PassCards,
+    "spectator_pass_cards": PassCards,
+    "handoff_after_laydown": Handoff,
+    "request_abort": RequestVote,
+    "vote_abort": Vote,
+    "request_back_to_lobby": RequestVote,
+    "vote_back_to_lobby": Vote,
+    "start_new_round": PlayerOnly,
+    "bubble_message": BubbleMessage,
+    "chat_message": ChatMessage,
+    "emoji_throw": EmojiThrow,
+    "clear_bubble_messages": PlayerOnly,
+    "sync": NoPayload,
+    "set_wire": SetWire,
+    "resync": Resync,
+    "pong": Pong,
+    "update_player": UpdatePlayer,
+}
+
+_frames = [
+    create_model(f"{type_}_frame", type=(Literal[type_], ...), payload=(model, ...))
+    for type_, model in PAYLOADS.items()
+]
+ClientMessage = Annotated[Union[tuple(_frames)], Field(discriminator="type")]
+_client_message = TypeAdapter(ClientMessage)
+
+
+def parse_client_message(data: Union[str, bytes]) -> BaseModel:
+    """A frame as its typed model (`.type`, `.payload`); raises pydantic.ValidationError"""
+    return _client_message.validate_json(data)
+
+
+def parse_payload(type_: str, payload: dict) -> BaseModel:
+    """Validate a payload built server-side (bot moves). KeyError for unknown types."""
+    return PAYLOADS[type_].model_validate(payload)
@@ -0,0 +1,187 @@
+"""
+Lookups and counters derived from a RoomState, kept current by Game's mutators
+so that seat, team, card-holder, vote and table questions (is the game over,
+how many sets has each team) are answered without scanning players or sets.
+
+Only Game writes to the index (through `_seat`, `_unseat`, `_set_team`,
+`_set_hand`, `_cast_vote`, ...); everything else reads it through Game's
+read-only helpers. `rebuild` recomputes it from scratch after a restore, and
+`mismatches` compares it with such a recompute (Game.check_counters).
+"""
+from __future__ import annotations
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from cards import SEAT_COUNT, SET_INDEX
+
+if TYPE_CHECKING:
+    from room_state import RoomState
+
+TEAMS = ("A", "B")
+
+# Vote kinds, mapped to the RoomState field holding the ballots
+VOTE_ABORT = "abort"
+VOTE_LOBBY = "back_to_lobby"
+VOTE_FIELDS = {VOTE_ABORT: "abort_votes", VOTE_LOBBY: "back_to_lobby_votes"}
+
+
+class VoteTally(NamedTuple):
+    yes: int        # YES ballots
+    no: int         # NO ballots
+    team_a_yes: int
+    team_b_yes: int
+    team_a_voted: int  # ballots either way cast by team A players
+    team_b_voted: int
+
+
+class RoomIndex:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.seat_of: Dict[str, int] = {}  # seated pid -> seat
+        self.at_seat: List[Optional[str]] = [None] * SEAT_COUNT
+        self.team_of: Dict[str, str] = {}  # pid -> team (players without a team are absent)
+        self.members: Dict[str, Set[str]] = {t: set() for t in TEAMS}
+        self.holding: Dict[str, Set[str]] = {t: set() for t in TEAMS}  # team -> members with cards
+        self.card_count: Dict[str, int] = {}  # pid -> cards in hand (players with no cards are absent)
+        self.team_cards: Dict[str, int] = {t: 0 for t in TEAMS}
+        self.claimed = 0  # bit SET_INDEX[(suit, set_type)] set once that half-suit is on the table
+        self.sets_won: Dict[str, int] = {t: 0 for t in TEAMS}
+        # kind -> pid -> (team at the time of the ballot, vote)
+        self.ballots: Dict[str, Dict[str, Tuple[Optional[str], bool]]] = {k: {} for k in VOTE_FIELDS}
+        # kind -> team -> YES ballots / all ballots; kind -> NO ballots
+        self._yes: Dict[str, Dict[Optional[str], int]] = {k: {} for k in VOTE_FIELDS}
+        self._voted: Dict[str, Dict[Optional[str], int]] = {k: {} for k in VOTE_FIELDS}
+        self._no: Dict[str, int] = {k: 0 for k in VOTE_FIELDS}
+
+    def rebuild(self, state: "RoomState", hands: Dict[str, int]):
+        self.clear()
+        for pid, player in state.players.items():
+            if player.team:
+                self.set_team(pid, player.team)
+        for seat, pid in state.seats.items():
+            if pid is not None:
+                self.seat(pid, seat)
+        for pid, mask in hands.items():
+            self.set_cards(pid, mask.bit_count())
+        for ts in state.table_sets:
+            self.claim(ts.suit, ts.set_type, ts.owner_team)
+        for kind, field in VOTE_FIELDS.items():
+            for pid, vote in getattr(state, field).items():
+                self.cast(kind, pid, vote)
+
+    # ---------------- Seats & teams ----------------
+    def seat(self, pid: str, seat: int):
+        self.seat_of[pid] = seat
+        self.at_seat[seat] = pid
+
+    def unseat(self, pid: str):
+        seat = self.seat_of.pop(pid, None)
+        if seat is not None and self.at_seat[seat] == pid:
+            self.at_seat[seat] = None
+
+    def set_team(self, pid: str, team: Optional[str]):
+        old = self.team_of.get(pid)
+        if old == team:
+            return
+        if old is not None:
+            self.members[old].discard(pid)
+            self.holding[old].discard(pid)
+            self.team_cards[old] -= self.card_count.get(pid, 0)
+            del self.team_of[pid]
+        if team is not None:
+            self.team_of[pid] = team
+            self.members.setdefault(team, set()).add(pid)
+            if pid in self.card_count:
+                self.holding.setdefault(team, set()).add(pid)
+                self.team_cards[team] = self.team_cards.get(team, 0) + self.card_count[pid]
+        for kind, ballots in self.ballots.items():
+            if pid in ballots:
+                self._count(kind, *ballots[pid], -1)
+                ballots[pid] = (team, ballots[pid][1])
+                self._count(kind, team, ballots[pid][1], 1)
+
+    # ---------------- Hands & table ----------------
+    def set_cards(self, pid: str, count: int):
+        team = self.team_of.get(pid)
+        if team is not None:
+            self.team_cards[team] += count - self.card_count.get(pid, 0)
+        if count:
+            self.card_count[pid] = count
+            if team is not None:
+                self.holding[team].add(pid)
+        else:
+            self.card_count.pop(pid, None)
+            if team is not None:
+                self.holding[team].discard(pid)
+
+    def clear_cards(self):
+        self.card_count.clear()
+        for team in self.holding:
+            self.holding[team].clear()
+            self.team_cards[team] = 0
+
+    def claim(self, suit: str, set_type: str, team: str):
+        self.claimed |= 1 << SET_INDEX[(suit, set_type)]
+        self.sets_won[team] = self.sets_won.get(team, 0) + 1
+
+    def clear_table(self):
+        self.claimed = 0
+        self.sets_won = {t: 0 for t in TEAMS}
+
+    def remove(self, pid: str):
+        """Forget a player who left the room (their ballots stay, like in RoomState, but count for no team)"""
+        self.unseat(pid)
+        self.set_cards(pid, 0)
+        self.set_team(pid, None)
+
+    # ---------------- Votes ----------------
+    def _count(self, kind: str, team: Optional[str], vote: bool, step: int):
+        voted = self._voted[kind]
+        voted[team] = voted.get(team, 0) + step
+        if vote:
+            yes = self._yes[kind]
+            yes[team] = yes.get(team, 0) + step
+        else:
+            self._no[kind] += step
+
+    def cast(self, kind: str, pid: str, vote: bool):
+        ballots = self.ballots[kind]
+        if pid in ballots:
+            self._count(kind, *ballots[pid], -1)
+        team = self.team_of.get(pid)
+        ballots[pid] = (team, vote)
+        self._count(kind, team, vote, 1)
+
+    def clear_votes(self, kind: str):
+        self.ballots[kind] = {}
+        self._yes[kind] = {}
+        self._voted[kind] = {}
+        self._no[kind] = 0
+
+    def tally(self, kind: str) -> VoteTally:
+        yes, voted = self._yes[kind], self._voted[kind]
+        return VoteTally(
+            yes=sum(yes.values()),
+            no=self._no[kind],
+            team_a_yes=yes.get("A", 0),
+            team_b_yes=yes.get("B", 0),
+            team_a_voted=voted.get("A", 0),
+            team_b_voted=voted.get("B", 0),
+        )
+
+    # ---------------- Checking ----------------
+    def _comparable(self) -> dict:
+        fields = {k: v for k, v in vars(self).items() if k not in ("ballots", "_yes", "_voted", "_no")}
+        # Empty teams and zero counts are the same as missing ones
+        for name in ("members", "holding", "team_cards", "sets_won"):
+            fields[name] = {t: v for t, v in fields[name].items() if v}
+        fields["tallies"] = {kind: self.tally(kind) for kind in VOTE_FIELDS}
+        return fields
+
+    def mismatches(self, state: "RoomState", hands: Dict[str, int]) -> List[str]:
+        """Names of the counters that differ from a recompute over `state` and `hands`"""
+        fresh = RoomIndex()
+        fresh.rebuild(state, hands)
+        mine, expected = self._comparable(), fresh._comparable()
+        return [name for name in expected if mine[name] != expected[name]]
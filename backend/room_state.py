@@ -0,0 +1,165 @@
+"""
+The room state Game works on, as plain slotted classes.
+
+The pydantic models in models/ describe the same state at the API edge
+(REST responses), but each pydantic instance carries a __dict__ and field-set
+bookkeeping and dumping goes through its serializer, which adds up when every
+room holds a dozen of them and the state is dumped after every action. Game
+owns these objects and only ever stores well-formed values, so here they are
+bare attribute holders. Hands and table sets keep cards as bitmasks
+(cards.py); `to_dict` renders the JSON shape clients and snapshots use
+(what `RoomState.model_dump(mode="json")` gives) and `from_dict` reads it back.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from cards import mask_of_dicts, to_dicts
+
+
+def _fields(cls: type, data: dict) -> Dict[str, Any]:
+    # Keys the class knows; unknown ones (e.g. "hand_count" of a projected view) are dropped
+    return {k: data[k] for k in cls.__slots__ if k in data}
+
+
+class Player:
+    __slots__ = (
+        "id", "name", "avatar", "team", "seat", "hand", "connected",
+        "is_spectator", "spectator_request_pending", "is_ai", "stand_in",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        avatar: str,
+        team: Optional[str] = None,
+        seat: Optional[int] = None,
+        hand: int = 0,
+        connected: bool = True,
+        is_spectator: bool = False,
+        spectator_request_pending: bool = False,
+        is_ai: bool = False,
+        stand_in: bool = False,
+    ):
+        self.id = id
+        self.name = name
+        self.avatar = avatar
+        self.team = team  # "A" or "B"
+        self.seat = seat  # 0..5
+        self.hand = hand  # card bitmask, mirrors Game._hands
+        self.connected = connected
+        self.is_spectator = is_spectator
+        self.spectator_request_pending = spectator_request_pending  # awaiting admin approval
+        self.is_ai = is_ai  # seat played by the server (see bots.py)
+        self.stand_in = stand_in  # is_ai only until the (disconnected) player reconnects
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "avatar": self.avatar,
+            "team": self.team,
+            "seat": self.seat,
+            "hand": to_dicts(self.hand),
+            "connected": self.connected,
+            "is_spectator": self.is_spectator,
+            "spectator_request_pending": self.spectator_request_pending,
+            "is_ai": self.is_ai,
+            "stand_in": self.stand_in,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Player":
+        fields = _fields(cls, data)
+        fields["hand"] = mask_of_dicts(data.get("hand"))
+        return cls(**fields)
+
+
+class TableSet:
+    __slots__ = ("suit", "set_type", "cards", "owner_team")
+
+    def __init__(self, suit: str, set_type: str, cards: int, owner_team: str):
+        self.suit = suit
+        self.set_type = set_type
+        self.cards = cards  # card bitmask
+        self.owner_team = owner_team
+
+    def to_dict(self) -> dict:
+        return {"suit": self.suit, "set_type": self.set_type, "cards": to_dicts(self.cards), "owner_team": self.owner_team}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "TableSet":
+        fields = _fields(cls, data)
+        fields["cards"] = mask_of_dicts(data.get("cards"))
+        return cls(**fields)
+
+
+class RoomState:
+    __slots__ = (
+        "room_id", "players", "seats", "team_scores", "table_sets", "phase", "turn_player",
+        "ask_chain_from", "deck_count", "current_dealer", "abort_votes", "lobby_locked",
+        "back_to_lobby_votes", "admin_player_id", "spectator_requests",
+    )
+
+    def __init__(
+        self,
+        room_id: str,
+        players: Dict[str, Player],
+        seats: Dict[int, Optional[str]],
+        team_scores: Dict[str, int],
+        table_sets: List[TableSet],
+        phase: str,
+        turn_player: Optional[str] = None,
+        ask_chain_from: Optional[str] = None,
+        deck_count: int = 0,
+        current_dealer: Optional[str] = None,
+        abort_votes: Optional[Dict[str, bool]] = None,
+        lobby_locked: bool = False,
+        back_to_lobby_votes: Optional[Dict[str, bool]] = None,
+        admin_player_id: Optional[str] = None,
+        spectator_requests: Optional[Dict[str, str]] = None,
+    ):
+        self.room_id = room_id
+        self.players = players
+        self.seats = seats
+        self.team_scores = team_scores
+        self.table_sets = table_sets
+        self.phase = phase  # "lobby", "ready", "playing" or "ended"
+        self.turn_player = turn_player
+        self.ask_chain_from = ask_chain_from
+        self.deck_count = deck_count
+        self.current_dealer = current_dealer
+        self.abort_votes = abort_votes if abort_votes is not None else {}
+        self.lobby_locked = lobby_locked  # True when game is active, prevents new players from joining
+        self.back_to_lobby_votes = back_to_lobby_votes if back_to_lobby_votes is not None else {}
+        self.admin_player_id = admin_player_id  # first player to join
+        self.spectator_requests = spectator_requests if spectator_requests is not None else {}  # player_id -> name
+
+    def to_dict(self) -> dict:
+        """JSON-ready copy of the state (shares nothing mutable with it)"""
+        return {
+            "room_id": self.room_id,
+            "players": {pid: p.to_dict() for pid, p in self.players.items()},
+            "seats": {str(seat): pid for seat, pid in self.seats.items()},
+            "team_scores": dict(self.team_scores),
+            "table_sets": [ts.to_dict() for ts in self.table_sets],
+            "phase": self.phase,
+            "turn_player": self.turn_player,
+            "ask_chain_from": self.ask_chain_from,
+            "deck_count": self.deck_count,
+            "current_dealer": self.current_dealer,
+            "abort_votes": dict(self.abort_votes),
+            "lobby_locked": self.lobby_locked,
+            "back_to_lobby_votes": dict(self.back_to_lobby_votes),
+            "admin_player_id": self.admin_player_id,
+            "spectator_requests": dict(self.spectator_requests),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RoomState":
+        fields = _fields(cls, data)
+        fields["players"] = {pid: Player.from_dict(p) for pid, p in data["players"].items()}
+        fields["seats"] = {int(seat): pid for seat, pid in data["seats"].items()}
+        fields["team_scores"] = dict(data["team_scores"])
+        fields["table_sets"] = [TableSet.from_dict(ts) for ts in data["table_sets"]]
+        return cls(**fields)
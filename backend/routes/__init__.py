@@ -1,5 +1,6 @@
 from .rooms import router as rooms_router
 from .websocket import router as websocket_router
 from .discord_exchange import router as discord_exchange_router
+from .metrics import router as metrics_router
 
-__all__ = ["rooms_router", "websocket_router", "discord_exchange_router"]
+__all__ = ["rooms_router", "websocket_router", "discord_exchange_router", "metrics_router"]
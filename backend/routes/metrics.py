@@ -0,0 +1,16 @@
+from __future__ import annotations
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+import metrics
+
+router = APIRouter(tags=["metrics"])
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """This worker's metrics, for Prometheus to scrape. Runs on the event loop, so gauges read room state between actions."""
+    return PlainTextResponse(metrics.render(), media_type=CONTENT_TYPE)
@@ -1,11 +1,18 @@
 from __future__ import annotations
 import uuid
+from functools import partial
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from loguru import logger
 
-from models import Player
+from config import settings
+from game import VIEW_PUBLIC
 from services.game_service import GameService
+from services.room_actor import RoomActorService
+from services.room_timers import RoomTimers
+from services.bot_service import BotService
+from services.websocket_service import WebSocketService
+from sharding import is_local
 
 router = APIRouter(prefix="/api/v1/rooms", tags=["rooms"])
 
@@ -32,7 +39,7 @@ def health_check():
     }
 
 @router.post("/cleanup")
-def cleanup_rooms():
+async def cleanup_rooms():
     """Manually trigger room cleanup and return statistics."""
     from services.game_service import GameService
     cleaned_count = GameService.cleanup_empty_rooms()
@@ -47,18 +54,29 @@ def cleanup_rooms():
 @router.post("/", response_model=CreateRoomResp)
 def create_room():
     rid = uuid.uuid4().hex[:6]
+    # When sharded, pick an id this worker owns so the room stays where it was created
+    while not is_local(rid):
+        rid = uuid.uuid4().hex[:6]
     logger.info(f"Creating new room: {rid}")
     GameService.get_or_create_room(rid)
+    # Nobody is connected yet: start the idle clock in case nobody ever joins
+    RoomTimers.watch(rid)
     return CreateRoomResp(room_id=rid)
 
 @router.get("/{room_id}/state")
-def get_state(room_id: str):
+async def get_state(room_id: str):
+    """The room as anyone outside it may see it: hand counts, no cards"""
     if room_id not in GameService.rooms:
         raise HTTPException(status_code=404, detail="Room not found")
-    return GameService.rooms[room_id].state.model_dump()
+    game = GameService.rooms[room_id]
+    return await RoomActorService.call(room_id, partial(_public_state, game), "http_state")
+
+def _public_state(game):
+    game.commit_state()
+    return game.state_view(VIEW_PUBLIC)
 
 @router.post("/{room_id}/players")
-def http_join_room(room_id: str, body: JoinReq):
+async def http_join_room(room_id: str, body: JoinReq):
     logger.info(f"Player {body.id} ({body.name}) joining room {room_id}")
     
     # Check if this looks like a Discord channel ID (long numeric string)
@@ -67,81 +85,56 @@ def http_join_room(room_id: str, body: JoinReq):
         logger.info(f"Auto-creating room from Discord channel ID: {room_id}")
     
     game = GameService.get_or_create_room(room_id)
-    
-    # Check if this is a reconnection (player already exists in game state)
-    is_reconnection = body.id in game.state.players
-    logger.info(f"Join request for player {body.id} in room {room_id}: is_reconnection={is_reconnection}, lobby_locked={game.state.lobby_locked}, phase={game.state.phase}, player_count={len(game.state.players)}")
-    
-    # Check if room is full (only for new players, not reconnections, and only if lobby is not locked)
-    if not is_reconnection and not game.state.lobby_locked and len(game.state.players) >= 6:
+    return await RoomActorService.call(room_id, partial(_join_room, game, room_id, body), "http_join")
+
+def _join_room(game, room_id: str, body: JoinReq):
+    res = game.join(body.id, body.name, body.avatar)
+    if not res["success"]:
         raise HTTPException(status_code=403, detail="Room is full (6/6 players)")
     
-    if is_reconnection:
-        # Update existing player info (reconnection)
-        existing_player = game.state.players[body.id]
-        existing_player.name = body.name
-        existing_player.avatar = body.avatar
-        existing_player.connected = True  # Mark as connected
-        logger.info(f"Player {body.id} reconnected to room {room_id} (existing player)")
-    else:
-        # Add new player (even if lobby is locked, so they can see the UI)
-        if game.state.lobby_locked:
-            # Add as spectator with pending request when lobby is locked
-            spectator_player = Player(
-                id=body.id,
-                name=body.name,
-                avatar=body.avatar,
-                team=None,  # No team for spectators
-                seat=None,  # No seat for spectators
-                hand=[],    # No hand for spectators
-                connected=True,
-                is_spectator=True,
-                spectator_request_pending=True
-            )
-            game.state.players[body.id] = spectator_player
-            game.state.spectator_requests[body.id] = body.name
-            logger.info(f"Player {body.id} joined locked room {room_id} as spectator with pending request")
-        else:
-            # Add as normal player when lobby is not locked
-            game.state.players[body.id] = Player(**body.model_dump())
-            
-            # Set first player as admin
-            if game.state.admin_player_id is None:
-                game.state.admin_player_id = body.id
-                logger.info(f"Player {body.id} ({body.name}) is now the admin of room {room_id}")
-            
-            logger.info(f"Player {body.id} successfully joined room {room_id}. Total players: {len(game.state.players)}")
-    
     logger.info(f"Returning game state for room {room_id} to player {body.id}")
-    return game.state.model_dump()
+    game.commit_state()
+    return game.state_view(game.view_role(body.id))
 
 @router.post("/{room_id}/spectator/approve")
-def approve_spectator(room_id: str, body: SpectatorApprovalReq):
+async def approve_spectator(room_id: str, body: SpectatorApprovalReq):
     """Admin endpoint to approve or reject spectator requests"""
     if room_id not in GameService.rooms:
         raise HTTPException(status_code=404, detail="Room not found")
     
     game = GameService.rooms[room_id]
-    
-    # Check if spectator exists and has pending request
-    if body.spectator_id not in game.state.players:
-        raise HTTPException(status_code=404, detail="Spectator not found")
-    
-    spectator = game.state.players[body.spectator_id]
-    if not spectator.is_spectator or not spectator.spectator_request_pending:
-        raise HTTPException(status_code=400, detail="No pending spectator request")
-    
-    if body.approved:
-        # Approve spectator request
-        spectator.spectator_request_pending = False
-        if body.spectator_id in game.state.spectator_requests:
-            del game.state.spectator_requests[body.spectator_id]
-        logger.info(f"Spectator {body.spectator_id} ({spectator.name}) approved in room {room_id}")
-    else:
-        # Reject spectator request - remove player from room
-        del game.state.players[body.spectator_id]
-        if body.spectator_id in game.state.spectator_requests:
-            del game.state.spectator_requests[body.spectator_id]
-        logger.info(f"Spectator {body.spectator_id} ({spectator.name}) rejected and removed from room {room_id}")
+    return await RoomActorService.call(room_id, partial(_approve_spectator, game, room_id, body), "http_approve_spectator")
+
+def _approve_spectator(game, room_id: str, body: SpectatorApprovalReq):
+    res = game.resolve_spectator_request(body.spectator_id, body.approved)
+    if not res["success"]:
+        status = 404 if res["reason"] == "not_found" else 400
+        raise HTTPException(status_code=status, detail=res["error"])
     
     return {"status": "success", "message": f"Spectator request {'approved' if body.approved else 'rejected'}"}
+
+@router.post("/{room_id}/ai-players")
+async def fill_with_ai_players(room_id: str):
+    """Fill every empty seat with a server-side bot (lobby only)"""
+    if room_id not in GameService.rooms:
+        raise HTTPException(status_code=404, detail="Room not found")
+    
+    game = GameService.rooms[room_id]
+    added = await RoomActorService.call(room_id, partial(_fill_with_ai_players, game, room_id), "http_fill_ai_players")
+    return {"status": "success", "added": added}
+
+def _fill_with_ai_players(game, room_id: str):
+    if game.state.phase != "lobby":
+        raise HTTPException(status_code=400, detail="Seats can only be filled in the lobby")
+    added = BotService.fill_empty_seats(game)
+    WebSocketService.broadcast_state(room_id, game)
+    return added
+
+@router.get("/{room_id}/debug/hands")
+async def debug_hands(room_id: str):
+    """Every player's current hand, for debugging (only with DEBUG_ENDPOINTS)"""
+    if not settings.DEBUG_ENDPOINTS or room_id not in GameService.rooms:
+        raise HTTPException(status_code=404, detail="Room not found")
+    game = GameService.rooms[room_id]
+    hands = await RoomActorService.call(room_id, game.hands_dump, "http_debug_hands")
+    return {"room_id": room_id, "phase": game.state.phase, "event_seq": game.events.seq, "hands": hands}
@@ -1,22 +1,38 @@
 from __future__ import annotations
-import json
+from functools import partial
+from typing import Callable, Dict, Optional, Union
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from loguru import logger
-
-from models import WSMessage, Card
+from pydantic import BaseModel, ValidationError
+
+import metrics
+from config import CHANNEL_WEBSOCKET
+from models import parse_client_message, parse_payload
+from models.websocket import (
+    AddAiPlayer, ApproveSpectator, Ask, BubbleMessage, ChatMessage, ConfirmPass, DealerOnly, EmojiThrow, Handoff,
+    Laydown, LeaveSeat, NoPayload, PassCards, PlayerOnly, RequestVote, Resync, SelectSeat, SelectTeam, SetWire,
+    ShuffleDeal, UnassignPlayer, Vote,
+)
 from services.game_service import GameService
-from services.websocket_service import WebSocketService
+from services.websocket_service import WebSocketService, Connection, SYNC_FULL
+from services.room_actor import RoomActorService
+from services.bot_service import BotService
+from services.wire import WIRE_JSON
+
+logger = logger.bind(channel=CHANNEL_WEBSOCKET)
 
 router = APIRouter(prefix="/api/v1")
 
+# Close code uvicorn uses for open sockets when the server shuts down
+SERVER_RESTART_CLOSE_CODE = 1012
+
 async def cleanup_room_immediately(room_id: str):
     """Immediately clean up a room when the last WebSocket connection is removed."""
     try:
         logger.info(f"Starting immediate cleanup of room {room_id}")
         
-        # Remove from GameService
-        if room_id in GameService.rooms:
-            del GameService.rooms[room_id]
+        # Remove from GameService (also stops the room's actor and drops its snapshot)
+        if GameService.remove_room(room_id):
             logger.info(f"Removed room {room_id} from GameService")
         else:
             logger.debug(f"Room {room_id} not found in GameService")
@@ -58,7 +74,7 @@ async def check_and_cleanup_empty_room(room_id: str):
                     logger.info(f"Cleaning up empty room {room_id} - no connected players")
                     
                     # Remove from GameService
-                    del GameService.rooms[room_id]
+                    GameService.remove_room(room_id)
                     
                     # Remove from WebSocketService connections (should already be empty)
                     if room_id in WebSocketService.connections:
@@ -75,461 +91,516 @@ async def check_and_cleanup_empty_room(room_id: str):
     except Exception as e:
         logger.error(f"Error during room cleanup for {room_id}: {e}")
 
-@router.websocket("/ws/{room_id}/{player_id}")
-async def ws_endpoint(ws: WebSocket, room_id: str, player_id: str):
-    logger.info(f"WebSocket connection attempt: room={room_id}, player={player_id}")
-    
-    await ws.accept()
-    game = GameService.get_or_create_room(room_id)
+def _on_connect(game, ws: WebSocket, room_id: str, player_id: str, sync: str, wire: str, batch: bool,
+                      resume: Optional[int] = None, version: Optional[int] = None) -> Connection:
+    """
+    Register the socket, update the player's connection status and bring the
+    client up to date: only the messages it missed when it resumes from a
+    sequence number the room still has, the full state otherwise.
+    """
+    res = game.player_connected(player_id)
     
-    # Check if this is a reconnection
-    was_disconnected = player_id in game.state.players and not game.state.players[player_id].connected
-    # Also check if player has a seat (indicates they were in an active game)
-    has_seat = player_id in game.state.players and game.state.players[player_id].seat is not None
-    is_reconnection = was_disconnected or (has_seat and game.state.phase in ["ready", "playing"])
-    
-    connected_status = game.state.players[player_id].connected if player_id in game.state.players else 'N/A'
-    logger.info(f"WebSocket connection for {player_id}: was_disconnected={was_disconnected}, has_seat={has_seat}, is_reconnection={is_reconnection}, player_exists={player_id in game.state.players}, connected={connected_status}")
-    
-    # Clean up any disconnected players' seats in lobby phase
-    if game.state.phase == "lobby":
-        cleaned_count = game.cleanup_disconnected_seats()
-        if cleaned_count > 0:
-            logger.info(f"Cleaned up {cleaned_count} disconnected seats when {player_id} connected")
-        
-        # Remove disconnected players entirely from lobby
-        removed_count = game.remove_disconnected_players()
-        if removed_count > 0:
-            logger.info(f"Removed {removed_count} disconnected players when {player_id} connected")
-    
-    # Update connection status
-    if player_id in game.state.players:
-        game.state.players[player_id].connected = True
-        logger.info(f"Player {player_id} connected to room {room_id} (reconnection: {was_disconnected})")
-        
-        # If this was a reconnection, notify other players
-        if is_reconnection:
-            player_name = game.state.players[player_id].name
-            logger.info(f"Sending player_reconnected message for {player_id} ({player_name})")
-            await WebSocketService.broadcast(room_id, "player_reconnected", {
-                "player_id": player_id,
-                "player_name": player_name,
-                "state": game.state.model_dump()
-            })
-            logger.info(f"Successfully notified other players that {player_id} ({player_name}) reconnected")
-        else:
-            logger.info(f"Not sending reconnection notification for {player_id} - is_reconnection={is_reconnection}")
+    if res["known"]:
+        logger.info(f"Player {player_id} connected to room {room_id} (reconnection: {res['was_disconnected']})")
     else:
         logger.warning(f"Unknown player {player_id} connected to room {room_id}")
     
-    # Ensure room_id exists in connections dictionary
-    if room_id not in WebSocketService.connections:
-        WebSocketService.connections[room_id] = {}
-        logger.debug(f"Created new connection dictionary for room {room_id}")
-    
-    WebSocketService.connections[room_id][player_id] = ws
+    conn = WebSocketService.register(room_id, player_id, ws, sync, wire, batch)
 
-    await ws.send_text(json.dumps({"type": "state", "payload": game.state.model_dump()}))
+    if resume is None or not WebSocketService.resume(conn, game, resume, version):
+        WebSocketService.send_to_player(room_id, player_id, "state", None, game)
     
-    # Notify other players about reconnection
-    if was_disconnected:
-        await WebSocketService.broadcast(room_id, "player_reconnected", {
+    # Notify other players about reconnection (once; it carries the state too)
+    if res["is_reconnection"]:
+        logger.info(f"Sending player_reconnected message for {player_id} ({res['player_name']})")
+        WebSocketService.broadcast(room_id, "player_reconnected", {
             "player_id": player_id,
-            "player_name": game.state.players[player_id].name,
-            "state": game.state.model_dump()
+            "player_name": res["player_name"]
+        }, game)
+    else:
+        WebSocketService.broadcast_state(room_id, game)
+
+    return conn
+
+Handler = Callable[..., None]  # (game, room_id, player_id, conn, payload model)
+
+# Message type -> handler; payload models are in models/websocket.py
+HANDLERS: Dict[str, Handler] = {}
+
+
+def handles(type_: str) -> Callable[[Handler], Handler]:
+    def register(handler: Handler) -> Handler:
+        HANDLERS[type_] = handler
+        return handler
+    return register
+
+
+def handle_message(game, room_id: str, player_id: str, conn: Optional[Connection], t: str, p: Union[BaseModel, dict]):
+    """Apply one client message to the room. Runs inside the room's actor."""
+    handler = HANDLERS.get(t)
+    if handler is None:
+        return
+    if isinstance(p, dict):
+        # Built server-side (bot moves): validate like a client frame
+        p = parse_payload(t, p)
+    try:
+        handler(game, room_id, player_id, conn, p)
+    except ValueError as e:
+        # A move the rules reject (e.g. "Not your turn"): tell the sender
+        logger.info(f"Rejected {t} from {player_id} in room {room_id}: {e}")
+        if conn is not None:
+            WebSocketService.send_to_player(room_id, player_id, "error", {"message": str(e)})
+
+
+# ---------------- Lobby ----------------
+@handles("select_team")
+def _select_team(game, room_id: str, player_id: str, conn: Connection, p: SelectTeam):
+    logger.info(f"Player {p.player_id} selecting team {p.team} in room {room_id}")
+    game.assign_seat(p.player_id, p.team)
+    WebSocketService.broadcast_state(room_id, game)
+
+
+@handles("select_seat")
+def _select_seat(game, room_id: str, player_id: str, conn: Connection, p: SelectSeat):
+    logger.info(f"Player {p.player_id} selecting seat {p.seat} for team {p.team} in room {room_id}")
+    success = game.select_seat(p.player_id, p.seat, p.team)
+    if success:
+        WebSocketService.broadcast_state(room_id, game)
+    else:
+        # Send error message back to the player
+        WebSocketService.send_to_player(room_id, player_id, "error", {
+            "message": "Failed to select seat. Seat may be occupied or invalid."
         })
+
+
+@handles("leave_seat")
+def _leave_seat(game, room_id: str, player_id: str, conn: Connection, p: LeaveSeat):
+    logger.info(f"Player {p.player_id} leaving their seat in room {room_id}")
+    success = game.remove_from_seat(p.player_id)
+    if success:
+        WebSocketService.broadcast_state(room_id, game)
     else:
-        await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
+        # Send error message back to the player
+        WebSocketService.send_to_player(room_id, player_id, "error", {
+            "message": "Failed to leave seat. You may not be able to leave during an active game."
+        })
+
+
+@handles("add_ai_player")
+def _add_ai_player(game, room_id: str, player_id: str, conn: Connection, p: AddAiPlayer):
+    logger.info(f"Adding AI player {p.player_id} ({p.name}) to team {p.team} in room {room_id}")
+    game.add_ai_player(p.player_id, p.name, p.avatar, p.team)
+    WebSocketService.broadcast_state(room_id, game)
+    logger.info(f"AI player {p.player_id} added successfully. Total players: {len(game.state.players)}")
+
 
+@handles("unassign_player")
+def _unassign_player(game, room_id: str, player_id: str, conn: Connection, p: UnassignPlayer):
+    res = game.unassign_player(p.admin_player_id, p.target_player_id)
+    if res.get("success"):
+        WebSocketService.broadcast(room_id, "player_unassigned", res, game)
+    else:
+        WebSocketService.broadcast(room_id, "unassign_failed", res, game)
+
+
+@handles("approve_spectator")
+def _approve_spectator(game, room_id: str, player_id: str, conn: Connection, p: ApproveSpectator):
+    # Admin approves or rejects spectator request
+    res = game.resolve_spectator_request(p.spectator_id, p.approved)
+    if not res["success"]:
+        WebSocketService.send_to_player(room_id, player_id, "spectator_approval_error", {"error": res["error"]})
+        return
+
+    WebSocketService.broadcast(room_id, "spectator_approved" if res["approved"] else "spectator_rejected", {
+        "spectator_id": res["spectator_id"],
+        "spectator_name": res["spectator_name"]
+    }, game)
+
+
+@handles("start")
+def _start(game, room_id: str, player_id: str, conn: Connection, p: NoPayload):
+    logger.info(f"Game starting in room {room_id}")
+    game.start()
+    WebSocketService.broadcast_state(room_id, game)
+    WebSocketService.broadcast(room_id, "game_started", {
+        "message": "Game has started!"
+    }, game)
+
+
+@handles("shuffle_deal")
+def _shuffle_deal(game, room_id: str, player_id: str, conn: Connection, p: ShuffleDeal):
+    # Only allow shuffle_deal when game is ready, ended, or in lobby
+    if game.state.phase in ["ready", "ended", "lobby"]:
+        res = game.shuffle_deal_new_game(p.dealer_id or player_id)
+        WebSocketService.broadcast(room_id, "new_game_started", res, game)
+    else:
+        # Game in progress - send error
+        WebSocketService.broadcast(room_id, "shuffle_deal_error", {
+            "reason": "game_in_progress",
+            "message": "Cannot shuffle and deal during active game. Use abort game first."
+        })
+
+
+@handles("shuffle_deal_new_game")
+def _shuffle_deal_new_game(game, room_id: str, player_id: str, conn: Connection, p: DealerOnly):
+    res = game.shuffle_deal_new_game(p.dealer_id)
+    WebSocketService.broadcast(room_id, "new_game_started", res, game)
+
+
+# ---------------- Play ----------------
+@handles("ask")
+def _ask(game, room_id: str, player_id: str, conn: Connection, p: Ask):
+    # announce start (for bubbles)
+    WebSocketService.broadcast(room_id, "ask_started", {
+        "asker_id": p.asker_id, "target_id": p.target_id,
+        "suit": p.suit, "set_type": p.set_type, "ranks": p.ranks
+    }, game)
+    res = game.prepare_ask(p.asker_id, p.target_id, p.suit, p.set_type, p.ranks)
+    # If target is empty-handed, respond immediately as a result (no pending modal)
+    if res.get("reason") == "target_empty":
+        WebSocketService.broadcast(room_id, "ask_result", {
+            "asker_id": p.asker_id,
+            "target_id": p.target_id,
+            "success": False,
+            "reason": "target_empty",
+            "suit": p.suit,
+            "ranks": p.ranks,
+            "transferred": []
+        }, game)
+    # If needs explicit "NO" confirmation, send ask_pending
+    elif res.get("needs_no_confirm", False):
+        WebSocketService.broadcast(room_id, "ask_pending", res, game)
+    # Otherwise, target has cards; send ask_pending with those cards
+    else:
+        WebSocketService.broadcast(room_id, "ask_pending", res, game)
+
+    if res.get("reason") != "target_empty" and BotService.answers_ask(game, p.asker_id, p.target_id):
+        _confirm_pass(game, room_id, player_id, conn, ConfirmPass(
+            asker_id=p.asker_id,
+            target_id=p.target_id,
+            cards=res.get("pending_cards") or [],
+            suit=p.suit,
+            ranks=p.ranks,
+        ))
+
+
+@handles("confirm_pass")
+def _confirm_pass(game, room_id: str, player_id: str, conn: Connection, p: ConfirmPass):
+    res = game.confirm_pass(p.asker_id, p.target_id, p.cards)
+    WebSocketService.broadcast(room_id, "ask_result", {
+        "asker_id": p.asker_id,
+        "target_id": p.target_id,
+        "cards": [c.model_dump() for c in p.cards],
+        "success": res.get("success", False),
+        "reason": res.get("reason"),
+        "suit": p.suit,
+        "ranks": p.ranks,
+        "transferred": res.get("transferred", [])
+    }, game)
+
+
+@handles("laydown")
+def _laydown(game, room_id: str, player_id: str, conn: Connection, p: Laydown):
+    logger.info(f"Laydown attempt by {p.who_id}: {p.suit} {p.set_type} in room {room_id}")
+    WebSocketService.broadcast(room_id, "laydown_started", {
+        "who_id": p.who_id, "suit": p.suit, "set_type": p.set_type,
+        "collaborators": [{"player_id": pid, "ranks": ranks} for pid, ranks in p.collaborators.items()]
+    }, game)
     try:
-        while True:
-            text = await ws.receive_text()
-            data = WSMessage.model_validate_json(text)
-            t = data.type
-            p = data.payload or {}
-            
-            logger.debug(f"Received message from {player_id} in room {room_id}: type={t}")
-
-            if t == "select_team":
-                logger.info(f"Player {p['player_id']} selecting team {p['team']} in room {room_id}")
-                game.assign_seat(p["player_id"], p["team"])
-                await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-
-            elif t == "select_seat":
-                logger.info(f"Player {p['player_id']} selecting seat {p['seat']} for team {p['team']} in room {room_id}")
-                success = game.select_seat(p["player_id"], p["seat"], p["team"])
-                if success:
-                    await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                else:
-                    # Send error message back to the player
-                    await WebSocketService.send_to_player(room_id, player_id, "error", {
-                        "message": "Failed to select seat. Seat may be occupied or invalid."
-                    })
-
-            elif t == "leave_seat":
-                logger.info(f"Player {p['player_id']} leaving their seat in room {room_id}")
-                success = game.remove_from_seat(p["player_id"])
-                if success:
-                    await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                else:
-                    # Send error message back to the player
-                    await WebSocketService.send_to_player(room_id, player_id, "error", {
-                        "message": "Failed to leave seat. You may not be able to leave during an active game."
-                    })
-
-            elif t == "add_ai_player":
-                logger.info(f"Adding AI player {p['player_id']} ({p['name']}) to team {p['team']} in room {room_id}")
-                from models import Player
-                ai_player = Player(
-                    id=p["player_id"],
-                    name=p["name"],
-                    avatar=p["avatar"],
-                    team=p["team"],
-                    connected=True
-                )
-                game.state.players[p["player_id"]] = ai_player
-                game.assign_seat(p["player_id"], p["team"])
-                await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                logger.info(f"AI player {p['player_id']} added successfully. Total players: {len(game.state.players)}")
-
-            elif t == "start":
-                logger.info(f"Game starting in room {room_id}")
-                game.start()
-                await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                await WebSocketService.broadcast(room_id, "game_started", {
-                    "message": "Game has started!",
-                    "state": game.state.model_dump()
-                })
-
-            elif t == "shuffle_deal":
-                # Only allow shuffle_deal when game is ready, ended, or in lobby
-                if game.state.phase in ["ready", "ended", "lobby"]:
-                    res = game.shuffle_deal_new_game(p.get("dealer_id", player_id))
-                    await WebSocketService.broadcast(room_id, "new_game_started", {**res, "state": game.state.model_dump()})
-                else:
-                    # Game in progress - send error
-                    await WebSocketService.broadcast(room_id, "shuffle_deal_error", {
-                        "reason": "game_in_progress",
-                        "message": "Cannot shuffle and deal during active game. Use abort game first."
-                    })
-
-            elif t == "ask":
-                # announce start (for bubbles)
-                await WebSocketService.broadcast(room_id, "ask_started", {
-                    "asker_id": p["asker_id"], "target_id": p["target_id"],
-                    "suit": p["suit"], "set_type": p["set_type"], "ranks": p.get("ranks") or [],
-                    "state": game.state.model_dump(),
-                })
-                res = game.prepare_ask(p["asker_id"], p["target_id"], p["suit"], p["set_type"], p.get("ranks") or [])
-                # If target is empty-handed, respond immediately as a result (no pending modal)
-                if res.get("reason") == "target_empty":
-                    await WebSocketService.broadcast(room_id, "ask_result", {
-                        "asker_id": p["asker_id"],
-                        "target_id": p["target_id"],
-                        "success": False,
-                        "reason": "target_empty",
-                        "suit": p["suit"],
-                        "ranks": p.get("ranks") or [],
-                        "transferred": [],
-                        "state": game.state.model_dump(),
-                    })
-                # If needs explicit "NO" confirmation, send ask_pending
-                elif res.get("needs_no_confirm", False):
-                    await WebSocketService.broadcast(room_id, "ask_pending", {**res, "state": game.state.model_dump()})
-                # Otherwise, target has cards; send ask_pending with those cards
-                else:
-                    await WebSocketService.broadcast(room_id, "ask_pending", {**res, "state": game.state.model_dump()})
-
-            elif t == "confirm_pass":
-                cards = [Card(**c) for c in (p.get("cards") or [])]
-                res = game.confirm_pass(p["asker_id"], p["target_id"], cards)
-                await WebSocketService.broadcast(room_id, "ask_result", {
-                    "asker_id": p["asker_id"],
-                    "target_id": p["target_id"],
-                    "cards": [c.model_dump() for c in cards],
-                    "success": res.get("success", False),
-                    "reason": res.get("reason"),
-                    "suit": p.get("suit"),
-                    "ranks": p.get("ranks"),
-                    "transferred": res.get("transferred", []),
-                    "state": game.state.model_dump(),
-                })
-
-            elif t == "laydown":
-                logger.info(f"Laydown attempt by {p['who_id']}: {p['suit']} {p['set_type']} in room {room_id}")
-                await WebSocketService.broadcast(room_id, "laydown_started", {
-                    "who_id": p["who_id"], "suit": p["suit"], "set_type": p["set_type"],
-                    "collaborators": p.get("collaborators") or [],
-                    "state": game.state.model_dump(),
-                })
-                try:
-                    res = game.laydown(p["who_id"], p["suit"], p["set_type"], p.get("collaborators"))
-                    success = res.get("success", False)
-                    logger.info(f"Laydown result: {'SUCCESS' if success else 'FAILED'} - {p['suit']} {p['set_type']} by {p['who_id']}")
-                    if res.get("game_end", {}).get("game_ended"):
-                        logger.info(f"Game ended in room {room_id}: {res['game_end']}")
-                    await WebSocketService.broadcast(room_id, "laydown_result", {**res, "state": game.state.model_dump()})
-                except ValueError as e:
-                    logger.error(f"Laydown error for {p['who_id']}: {e}")
-                    await WebSocketService.broadcast(room_id, "laydown_error", {
-                        "error": str(e),
-                        "who_id": p["who_id"],
-                        "suit": p["suit"],
-                        "set_type": p["set_type"],
-                        "state": game.state.model_dump()
-                    })
-
-            elif t == "pass_cards":
-                try:
-                    # Convert card dicts to Card objects
-                    cards = [Card(**card) for card in p["cards"]]
-                    res = game.pass_cards(p["from_player_id"], p["to_player_id"], cards)
-                    await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                    await WebSocketService.broadcast(room_id, "cards_passed", {**res, "state": game.state.model_dump()})
-                except ValueError as e:
-                    await WebSocketService.broadcast(room_id, "pass_cards_error", {
-                        "error": str(e),
-                        "from_player_id": p["from_player_id"],
-                        "to_player_id": p["to_player_id"],
-                        "state": game.state.model_dump()
-                    })
-
-            elif t == "handoff_after_laydown":
-                res = game.handoff_after_laydown(p["who_id"], p["to_id"])
-                await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-                await WebSocketService.broadcast(room_id, "handoff_result", {**res, "state": game.state.model_dump(), "from_id": p["who_id"]})
-
-            elif t == "request_abort":
-                res = game.request_abort(p["requester_id"])
-                await WebSocketService.broadcast(room_id, "abort_requested", {**res, "state": game.state.model_dump()})
-
-            elif t == "vote_abort":
-                res = game.vote_abort(p["voter_id"], p["vote"])
-                if res.get("abort_executed"):
-                    await WebSocketService.broadcast(room_id, "game_aborted", {**res, "state": game.state.model_dump()})
-                elif res.get("voting_failed"):
-                    await WebSocketService.broadcast(room_id, "voting_failed", {**res, "state": game.state.model_dump()})
-                else:
-                    await WebSocketService.broadcast(room_id, "abort_vote_cast", {**res, "state": game.state.model_dump()})
-
-            elif t == "shuffle_deal_new_game":
-                res = game.shuffle_deal_new_game(p["dealer_id"])
-                await WebSocketService.broadcast(room_id, "new_game_started", {**res, "state": game.state.model_dump()})
-
-            elif t == "bubble_message":
-                # Forward bubble message to all players
-                await WebSocketService.broadcast(room_id, "bubble_message", {
-                    "player_id": p["player_id"],
-                    "variant": p["variant"],
-                    **{k: v for k, v in p.items() if k not in ["type", "player_id", "variant"]}
-                })
-
-            elif t == "chat_message":
-                # Forward chat message to all players
-                await WebSocketService.broadcast(room_id, "bubble_message", {
-                    "player_id": p["player_id"],
-                    "variant": "chat",
-                    "text": p["text"]
-                })
-
-            elif t == "emoji_throw":
-                # Forward emoji throw animation to all players
-                await WebSocketService.broadcast(room_id, "emoji_animation", {
-                    "from_player_id": p["from_player_id"],
-                    "to_player_id": p["to_player_id"],
-                    "emoji": p["emoji"],
-                    "emoji_name": p["emoji_name"],
-                    "category": p["category"]
-                })
-
-            elif t == "clear_bubble_messages":
-                # Clear bubble messages for a player
-                await WebSocketService.broadcast(room_id, "clear_bubble_messages", {
-                    "player_id": p["player_id"]
-                })
-
-            elif t == "start_new_round":
-                # Start a new round with dealer rotation
-                res = game.start_new_round(p["player_id"])
-                await WebSocketService.broadcast(room_id, "new_round_started", {**res, "state": game.state.model_dump()})
-
-            elif t == "request_back_to_lobby":
-                res = game.request_back_to_lobby(p["requester_id"])
-                if res.get("success"):
-                    await WebSocketService.broadcast(room_id, "back_to_lobby_success", {**res, "state": game.state.model_dump()})
-                else:
-                    await WebSocketService.broadcast(room_id, "back_to_lobby_requested", {**res, "state": game.state.model_dump()})
-
-            elif t == "vote_back_to_lobby":
-                res = game.vote_back_to_lobby(p["voter_id"], p["vote"])
-                if res.get("success"):
-                    await WebSocketService.broadcast(room_id, "back_to_lobby_success", {**res, "state": game.state.model_dump()})
-                elif res.get("reason") == "voting_failed":
-                    await WebSocketService.broadcast(room_id, "back_to_lobby_failed", {**res, "state": game.state.model_dump()})
-                else:
-                    await WebSocketService.broadcast(room_id, "back_to_lobby_vote_cast", {**res, "state": game.state.model_dump()})
+        res = game.laydown(p.who_id, p.suit, p.set_type, p.collaborators)
+        success = res.get("success", False)
+        logger.info(f"Laydown result: {'SUCCESS' if success else 'FAILED'} - {p.suit} {p.set_type} by {p.who_id}")
+        if res.get("game_end", {}).get("game_ended"):
+            logger.info(f"Game ended in room {room_id}: {res['game_end']}")
+        WebSocketService.broadcast(room_id, "laydown_result", res, game)
+    except ValueError as e:
+        logger.error(f"Laydown error for {p.who_id}: {e}")
+        WebSocketService.broadcast(room_id, "laydown_error", {
+            "error": str(e),
+            "who_id": p.who_id,
+            "suit": p.suit,
+            "set_type": p.set_type
+        }, game)
+
+
+@handles("pass_cards")
+def _pass_cards(game, room_id: str, player_id: str, conn: Connection, p: PassCards):
+    try:
+        res = game.pass_cards(p.from_player_id, p.to_player_id, p.cards)
+        WebSocketService.broadcast_state(room_id, game)
+        WebSocketService.broadcast(room_id, "cards_passed", res, game)
+    except ValueError as e:
+        WebSocketService.broadcast(room_id, "pass_cards_error", {
+            "error": str(e),
+            "from_player_id": p.from_player_id,
+            "to_player_id": p.to_player_id
+        }, game)
+
+
+@handles("spectator_pass_cards")
+def _spectator_pass_cards(game, room_id: str, player_id: str, conn: Connection, p: PassCards):
+    # Spectator passes cards from one player to another (test mode only)
+    from_player_id = p.from_player_id
+    to_player_id = p.to_player_id
+    cards = p.cards
+
+    # Validate source player
+    from_player = game.state.players.get(from_player_id)
+    if not from_player:
+        WebSocketService.send_to_player(room_id, player_id, "spectator_pass_cards_result", {"success": False, "error": "Source player not found"})
+        return
+
+    # Validate target player
+    target_player = game.state.players.get(to_player_id)
+    if not target_player:
+        WebSocketService.send_to_player(room_id, player_id, "spectator_pass_cards_result", {"success": False, "error": "Target player not found"})
+        return
+
+    # Validate that target is an opponent
+    if target_player.team == from_player.team:
+        WebSocketService.send_to_player(room_id, player_id, "spectator_pass_cards_result", {"success": False, "error": "Cannot pass cards to teammate"})
+        return
 
-            elif t == "unassign_player":
-                res = game.unassign_player(p["admin_player_id"], p["target_player_id"])
-                if res.get("success"):
-                    await WebSocketService.broadcast(room_id, "player_unassigned", {**res, "state": game.state.model_dump()})
-                else:
-                    await WebSocketService.broadcast(room_id, "unassign_failed", {**res, "state": game.state.model_dump()})
+    try:
+        # Use the existing pass_cards logic
+        res = game.pass_cards(from_player_id, target_player.id, cards)
+
+        # Broadcast the result
+        WebSocketService.broadcast(room_id, "spectator_pass_cards_result", {
+            "success": True,
+            "from_player_id": from_player_id,
+            "from_name": from_player.name,
+            "to_player_id": target_player.id,
+            "to_name": target_player.name,
+            "cards": [c.model_dump() for c in cards]
+        }, game)
+
+        # Also broadcast the normal cards_passed event for consistency
+        WebSocketService.broadcast(room_id, "cards_passed", res, game)
+
+    except ValueError as e:
+        WebSocketService.broadcast(room_id, "spectator_pass_cards_result", {
+            "success": False,
+            "error": str(e),
+            "from_player_id": from_player_id,
+            "to_player_id": target_player.id
+        }, game)
+
+
+@handles("handoff_after_laydown")
+def _handoff_after_laydown(game, room_id: str, player_id: str, conn: Connection, p: Handoff):
+    res = game.handoff_after_laydown(p.who_id, p.to_id)
+    WebSocketService.broadcast_state(room_id, game)
+    WebSocketService.broadcast(room_id, "handoff_result", {**res, "from_id": p.who_id}, game)
+
+
+# ---------------- Votes & rounds ----------------
+@handles("request_abort")
+def _request_abort(game, room_id: str, player_id: str, conn: Connection, p: RequestVote):
+    res = game.request_abort(p.requester_id)
+    WebSocketService.broadcast(room_id, "abort_requested", res, game)
+
+
+@handles("vote_abort")
+def _vote_abort(game, room_id: str, player_id: str, conn: Connection, p: Vote):
+    res = game.vote_abort(p.voter_id, p.vote)
+    if res.get("abort_executed"):
+        WebSocketService.broadcast(room_id, "game_aborted", res, game)
+    elif res.get("voting_failed"):
+        WebSocketService.broadcast(room_id, "voting_failed", res, game)
+    else:
+        WebSocketService.broadcast(room_id, "abort_vote_cast", res, game)
 
-            elif t == "approve_spectator":
-                # Admin approves or rejects spectator request
-                spectator_id = p["spectator_id"]
-                approved = p["approved"]
-                
-                if spectator_id not in game.state.players:
-                    await ws.send_text(json.dumps({
-                        "type": "spectator_approval_error",
-                        "payload": {"error": "Spectator not found"}
-                    }))
-                    continue
-                
-                spectator = game.state.players[spectator_id]
-                if not spectator.is_spectator or not spectator.spectator_request_pending:
-                    await ws.send_text(json.dumps({
-                        "type": "spectator_approval_error", 
-                        "payload": {"error": "No pending spectator request"}
-                    }))
-                    continue
-                
-                if approved:
-                    # Approve spectator request
-                    spectator.spectator_request_pending = False
-                    if spectator_id in game.state.spectator_requests:
-                        del game.state.spectator_requests[spectator_id]
-                    logger.info(f"Spectator {spectator_id} ({spectator.name}) approved in room {room_id}")
-                    
-                    await WebSocketService.broadcast(room_id, "spectator_approved", {
-                        "spectator_id": spectator_id,
-                        "spectator_name": spectator.name,
-                        "state": game.state.model_dump()
-                    })
-                else:
-                    # Reject spectator request - remove player from room
-                    spectator_name = spectator.name
-                    del game.state.players[spectator_id]
-                    if spectator_id in game.state.spectator_requests:
-                        del game.state.spectator_requests[spectator_id]
-                    logger.info(f"Spectator {spectator_id} ({spectator_name}) rejected and removed from room {room_id}")
-                    
-                    await WebSocketService.broadcast(room_id, "spectator_rejected", {
-                        "spectator_id": spectator_id,
-                        "spectator_name": spectator_name,
-                        "state": game.state.model_dump()
-                    })
-
-            elif t == "spectator_pass_cards":
-                # Spectator passes cards from one player to another (test mode only)
-                from_player_id = p["from_player_id"]
-                to_player_id = p["to_player_id"]
-                cards = [Card(**card) for card in p["cards"]]
-                
-                # Validate source player
-                from_player = game.state.players.get(from_player_id)
-                if not from_player:
-                    await ws.send_text(json.dumps({
-                        "type": "spectator_pass_cards_result",
-                        "payload": {"success": False, "error": "Source player not found"}
-                    }))
-                    continue
-                
-                # Validate target player
-                target_player = game.state.players.get(to_player_id)
-                if not target_player:
-                    await ws.send_text(json.dumps({
-                        "type": "spectator_pass_cards_result",
-                        "payload": {"success": False, "error": "Target player not found"}
-                    }))
-                    continue
-                
-                # Validate that target is an opponent
-                if target_player.team == from_player.team:
-                    await ws.send_text(json.dumps({
-                        "type": "spectator_pass_cards_result",
-                        "payload": {"success": False, "error": "Cannot pass cards to teammate"}
-                    }))
-                    continue
-                
-                try:
-                    # Use the existing pass_cards logic
-                    res = game.pass_cards(from_player_id, target_player.id, cards)
-                    
-                    # Broadcast the result
-                    await WebSocketService.broadcast(room_id, "spectator_pass_cards_result", {
-                        "success": True,
-                        "from_player_id": from_player_id,
-                        "from_name": from_player.name,
-                        "to_player_id": target_player.id,
-                        "to_name": target_player.name,
-                        "cards": [c.model_dump() for c in cards],
-                        "state": game.state.model_dump()
-                    })
-                    
-                    # Also broadcast the normal cards_passed event for consistency
-                    await WebSocketService.broadcast(room_id, "cards_passed", {**res, "state": game.state.model_dump()})
-                    
-                except ValueError as e:
-                    await WebSocketService.broadcast(room_id, "spectator_pass_cards_result", {
-                        "success": False,
-                        "error": str(e),
-                        "from_player_id": from_player_id,
-                        "to_player_id": target_player.id,
-                        "state": game.state.model_dump()
-                    })
-
-            elif t == "sync":
-                await WebSocketService.broadcast(room_id, "state", game.state.model_dump())
-
-    except WebSocketDisconnect:
-        logger.info(f"WebSocket disconnected: room={room_id}, player={player_id}")
-        try:
-            # Handle player disconnection based on game phase
-            player_name = "Unknown"
-            if player_id in game.state.players:
-                player_name = game.state.players[player_id].name
-                
-                if game.state.phase == "lobby":
-                    # In lobby phase, remove player entirely from the room
-                    # Remove from any seat they might have first
-                    for seat_num, seat_player_id in game.state.seats.items():
-                        if seat_player_id == player_id:
-                            game.state.seats[seat_num] = None
-                            logger.info(f"Freed seat {seat_num} for disconnected player {player_id}")
-                    
-                    # Remove player from players dict
-                    del game.state.players[player_id]
-                    logger.info(f"Removed disconnected player {player_id} from lobby")
-                else:
-                    # In game phase, just mark as disconnected
-                    game.state.players[player_id].connected = False
-                    logger.info(f"Marked player {player_id} as disconnected in room {room_id}")
-            
-            # Remove from connections
-            if room_id in WebSocketService.connections and player_id in WebSocketService.connections[room_id]:
-                del WebSocketService.connections[room_id][player_id]
-                logger.debug(f"Removed player {player_id} from connections in room {room_id}")
-                
-                # Check if this was the last WebSocket connection
-                remaining_connections = len(WebSocketService.connections.get(room_id, {}))
-                logger.info(f"Room {room_id} now has {remaining_connections} WebSocket connections")
-                
-                if remaining_connections == 0:
-                    # Last player disconnected, clean up the room immediately
-                    logger.info(f"Last player disconnected from room {room_id}, cleaning up room")
-                    await cleanup_room_immediately(room_id)
-                    return  # Exit early since room is being cleaned up
+
+@handles("start_new_round")
+def _start_new_round(game, room_id: str, player_id: str, conn: Connection, p: PlayerOnly):
+    # Start a new round with dealer rotation
+    res = game.start_new_round(p.player_id)
+    WebSocketService.broadcast(room_id, "new_round_started", res, game)
+
+
+@handles("request_back_to_lobby")
+def _request_back_to_lobby(game, room_id: str, player_id: str, conn: Connection, p: RequestVote):
+    res = game.request_back_to_lobby(p.requester_id)
+    if res.get("success"):
+        WebSocketService.broadcast(room_id, "back_to_lobby_success", res, game)
+    else:
+        WebSocketService.broadcast(room_id, "back_to_lobby_requested", res, game)
+
+
+@handles("vote_back_to_lobby")
+def _vote_back_to_lobby(game, room_id: str, player_id: str, conn: Connection, p: Vote):
+    res = game.vote_back_to_lobby(p.voter_id, p.vote)
+    if res.get("success"):
+        WebSocketService.broadcast(room_id, "back_to_lobby_success", res, game)
+    elif res.get("reason") == "voting_failed":
+        WebSocketService.broadcast(room_id, "back_to_lobby_failed", res, game)
+    else:
+        WebSocketService.broadcast(room_id, "back_to_lobby_vote_cast", res, game)
+
+
+# ---------------- Chat & effects ----------------
+@handles("bubble_message")
+def _bubble_message(game, room_id: str, player_id: str, conn: Connection, p: BubbleMessage):
+    # Forward bubble message to all players
+    WebSocketService.broadcast(room_id, "bubble_message", {
+        "player_id": p.player_id,
+        "variant": p.variant,
+        **{k: v for k, v in p.model_extra.items() if k != "type"}
+    })
+
+
+@handles("chat_message")
+def _chat_message(game, room_id: str, player_id: str, conn: Connection, p: ChatMessage):
+    # Forward chat message to all players
+    WebSocketService.broadcast(room_id, "bubble_message", {
+        "player_id": p.player_id,
+        "variant": "chat",
+        "text": p.text
+    })
+
+
+@handles("emoji_throw")
+def _emoji_throw(game, room_id: str, player_id: str, conn: Connection, p: EmojiThrow):
+    # Forward emoji throw animation to all players
+    WebSocketService.broadcast(room_id, "emoji_animation", {
+        "from_player_id": p.from_player_id,
+        "to_player_id": p.to_player_id,
+        "emoji": p.emoji,
+        "emoji_name": p.emoji_name,
+        "category": p.category
+    })
+
+
+@handles("clear_bubble_messages")
+def _clear_bubble_messages(game, room_id: str, player_id: str, conn: Connection, p: PlayerOnly):
+    # Clear bubble messages for a player
+    WebSocketService.broadcast(room_id, "clear_bubble_messages", {
+        "player_id": p.player_id
+    })
+
+
+# ---------------- Connection ----------------
+@handles("sync")
+def _sync(game, room_id: str, player_id: str, conn: Connection, p: NoPayload):
+    WebSocketService.broadcast_state(room_id, game)
+
+
+@handles("set_wire")
+def _set_wire(game, room_id: str, player_id: str, conn: Connection, p: SetWire):
+    # Switch outbound encoding after connect (alternative to the ?wire= query param)
+    negotiated = conn.set_wire(p.wire)
+    logger.info(f"Player {player_id} in room {room_id} switched wire format to {negotiated}")
+    WebSocketService.send_to_player(room_id, player_id, "state", None, game)
+
+
+@handles("resync")
+def _resync(game, room_id: str, player_id: str, conn: Connection, p: Resync):
+    # Delta client detected a version gap - send it a full snapshot
+    logger.info(f"Player {player_id} requested resync in room {room_id} (client version {p.version})")
+    conn.request_resync()
+    WebSocketService.send_to_player(room_id, player_id, "state", None, game)
+
+
+async def _on_disconnect(game, room_id: str, player_id: str, conn: Connection):
+    """Update the room after a socket closed. Runs inside the room's actor."""
+    if not WebSocketService.is_current(room_id, player_id, conn):
+        # A newer socket for this player already took over; nothing to clean up
+        logger.info(f"Connection for {player_id} in room {room_id} was replaced, skipping disconnect handling")
+        await conn.close()
+        return
+    try:
+        # Handle player disconnection based on game phase
+        player_name = game.player_disconnected(player_id) or "Unknown"
+        
+        # Remove from connections
+        if WebSocketService.unregister(room_id, player_id, conn):
+            logger.debug(f"Removed player {player_id} from connections in room {room_id}")
             
-            # Notify other players about disconnection
-            await WebSocketService.broadcast(room_id, "player_disconnected", {
-                "player_id": player_id,
-                "player_name": player_name,
-                "state": game.state.model_dump()
-            })
+            # Check if this was the last WebSocket connection
+            remaining_connections = len(WebSocketService.connections.get(room_id, {}))
+            logger.info(f"Room {room_id} now has {remaining_connections} WebSocket connections")
             
-        except Exception as e:
-            logger.error(f"Error handling WebSocket disconnect for player {player_id}: {e}")
+            if remaining_connections == 0:
+                # Last player disconnected, clean up the room immediately
+                logger.info(f"Last player disconnected from room {room_id}, cleaning up room")
+                await cleanup_room_immediately(room_id)
+                return  # Exit early since room is being cleaned up
+        
+        # Notify other players about disconnection
+        WebSocketService.broadcast(room_id, "player_disconnected", {
+            "player_id": player_id,
+            "player_name": player_name
+        }, game)
+        
+    except Exception as e:
+        logger.error(f"Error handling WebSocket disconnect for player {player_id}: {e}")
 
+def reap_connection(conn: Connection):
+    """Heartbeat hook: a connection stopped answering, handle it like a closed socket"""
+    game = GameService.rooms.get(conn.room_id)
+    if game is None:
+        WebSocketService.unregister(conn.room_id, conn.player_id, conn)
+        return
+    RoomActorService.submit(conn.room_id, partial(_on_disconnect, game, conn.room_id, conn.player_id, conn), "reap")
+
+@router.websocket("/ws/{room_id}/{player_id}")
+async def ws_endpoint(ws: WebSocket, room_id: str, player_id: str, sync: str = SYNC_FULL, wire: str = WIRE_JSON, batch: bool = False,
+                      resume: Optional[int] = None, version: Optional[int] = None):
+    logger.info(f"WebSocket connection attempt: room={room_id}, player={player_id}, sync={sync}, wire={wire}, batch={batch}, resume={resume}")
+    
+    await ws.accept()
+    game = GameService.get_or_create_room(room_id)
+    conn = await RoomActorService.call(
+        room_id, partial(_on_connect, game, ws, room_id, player_id, sync, wire, batch, resume, version), "connect"
+    )
+
+    try:
+        while True:
+            text = await ws.receive_text()
+            conn.seen()
+            try:
+                data = parse_client_message(text)
+            except ValidationError as e:
+                if e.errors()[0]["type"] == "union_tag_invalid":
+                    # Unknown message types are ignored, as they always were (newer clients may send more)
+                    logger.debug("Ignoring unknown message type from {} in room {}", player_id, room_id)
+                    continue
+                # Bad JSON, missing type or invalid payload: tell the sender and keep the socket
+                errors = [f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors(include_url=False)[:5]]
+                logger.warning(f"Rejected message from {player_id} in room {room_id}: {errors}")
+                metrics.ws_rejected.inc()
+                WebSocketService.send_to_player(room_id, player_id, "error", {"message": "Invalid message", "errors": errors})
+                continue
+            t = data.type
+            p = data.payload
+
+            logger.debug("Received message from {} in room {}: type={}", player_id, room_id, t)
+            metrics.ws_messages.inc(t)
+
+            if t == "pong":
+                conn.pong(p.id)
+                continue
+
+            if GameService.rooms.get(room_id) is not game:
+                # The room was removed under this socket (and maybe recreated): nothing to apply the message to
+                logger.info(f"Room {room_id} is gone, closing the socket of {player_id}")
+                WebSocketService.unregister(room_id, player_id, conn)
+                return
+
+            # Only enqueue; the room actor applies messages one at a time
+            RoomActorService.submit(room_id, partial(handle_message, game, room_id, player_id, conn, t, p), t)
+
+    except WebSocketDisconnect as e:
+        if e.code == SERVER_RESTART_CLOSE_CODE:
+            # Server is shutting down: keep the room exactly as it is so the stored
+            # snapshot can be restored and the client can reconnect
+            logger.info(f"WebSocket closed for server restart: room={room_id}, player={player_id}")
+            WebSocketService.unregister(room_id, player_id, conn)
+            return
+        logger.info(f"WebSocket disconnected: room={room_id}, player={player_id}")
+        if GameService.rooms.get(room_id) is not game:
+            # Already cleaned up with the room (e.g. the heartbeat reaper removed its last player)
+            WebSocketService.unregister(room_id, player_id, conn)
+            return
+        await RoomActorService.call(room_id, partial(_on_disconnect, game, room_id, player_id, conn), "disconnect")
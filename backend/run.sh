@@ -4,4 +4,22 @@ DIR="$( cd -P "$( dirname "$0" )" && pwd )"
 cd "$DIR"
 
 source .venv/bin/activate
-uvicorn main:app --host 0.0.0.0 --port 8001
+
+# WORKERS > 1 runs one backend process per worker, each owning a hash-partitioned
+# set of rooms, behind shard_router.py on the public port
+WORKERS="${WORKERS:-1}"
+PORT="${PORT:-8001}"
+WORKER_BASE_PORT="${WORKER_BASE_PORT:-8101}"
+
+if [ "$WORKERS" -le 1 ]; then
+    exec uvicorn main:app --host 0.0.0.0 --port "$PORT"
+fi
+
+export WORKER_COUNT="$WORKERS" WORKER_BASE_PORT
+trap 'kill 0' EXIT
+
+for ((i = 0; i < WORKERS; i++)); do
+    WORKER_INDEX=$i uvicorn main:app --host 127.0.0.1 --port $((WORKER_BASE_PORT + i)) &
+done
+
+uvicorn shard_router:app --host 0.0.0.0 --port "$PORT"
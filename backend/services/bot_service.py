@@ -0,0 +1,151 @@
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+from bots import BotView, Decision, Knowledge, decide, is_bot, next_to_act, view_for
+from config import CHANNEL_GAME, settings
+from game import Game
+from services.game_service import GameService
+from services.room_actor import RoomActorService
+from services.websocket_service import WebSocketService
+
+logger = logger.bind(channel=CHANNEL_GAME)
+
+BOT_NAMES = ["Bot Alpha", "Bot Beta", "Bot Gamma", "Bot Delta", "Bot Epsilon", "Bot Zeta"]
+BOT_AVATARS = ["🤖", "👾", "🎮", "🎯", "⚡", "🔥"]
+
+# (game, room_id, player_id, conn, type, payload) -> applies one client message; see routes/websocket.py
+Dispatch = Callable[[Game, str, str, Any, str, dict], None]
+
+
+class BotService:
+    """
+    Plays the AI seats. Bots learn only what the room broadcasts (bots.Knowledge),
+    decide in a worker pool so a slow decision never blocks the event loop, and
+    act by feeding the same messages a client would send through the room actor.
+    """
+    knowledge: Dict[str, Knowledge] = {}  # room_id -> public knowledge
+    dispatch: Optional[Dispatch] = None
+    _tasks: Dict[str, asyncio.Task] = {}  # room_id -> bot currently thinking
+    _idle: Dict[str, int] = {}  # room_id -> event seq at which no bot had anything to do
+    _executor: Optional[Executor] = None
+
+    @classmethod
+    def start(cls, dispatch: Dispatch):
+        """Hook into room actions and broadcasts. Call on startup."""
+        cls.dispatch = dispatch
+        if settings.BOT_EXECUTOR == "process":
+            # Spawned, not forked: workers must not inherit the server's sockets and event loop
+            cls._executor = ProcessPoolExecutor(max_workers=settings.BOT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            cls._executor = ThreadPoolExecutor(max_workers=settings.BOT_WORKERS, thread_name_prefix="bot")
+        RoomActorService.after_action.append(cls.after_action)
+        WebSocketService.observers.append(cls.observe)
+        logger.info(f"Bots enabled ({settings.BOT_EXECUTOR} pool of {settings.BOT_WORKERS})")
+
+    @classmethod
+    async def stop(cls):
+        for task in cls._tasks.values():
+            task.cancel()
+        cls._tasks.clear()
+        if cls._executor is not None:
+            executor, cls._executor = cls._executor, None
+            # A worker may still be deciding: wait for it off the event loop
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    @classmethod
+    def answers_ask(cls, game: Game, asker_id: str, target_id: str) -> bool:
+        """
+        Whether an ask is answered by the server right away: when a bot is asked,
+        and when a bot asks a human (the reply is forced by the hands either way).
+        """
+        return is_bot(game, target_id) or is_bot(game, asker_id)
+
+    @classmethod
+    def fill_empty_seats(cls, game: Game) -> List[str]:
+        """Seat a bot in every empty seat, on the team the seat belongs to. Run inside the room's actor."""
+        added = []
+        for seat in sorted(s for s, pid in game.state.seats.items() if pid is None):
+            n = sum(1 for p in game.state.players.values() if p.is_ai)
+            bot_id = f"ai_{uuid.uuid4().hex[:8]}"
+            team = "A" if seat % 2 == 0 else "B"
+            game.add_ai_player(bot_id, BOT_NAMES[n % len(BOT_NAMES)], BOT_AVATARS[n % len(BOT_AVATARS)], team)
+            added.append(bot_id)
+        logger.info(f"Filled {len(added)} empty seats with bots in room {game.state.room_id}")
+        return added
+
+    @classmethod
+    def observe(cls, room_id: str, type_: str, payload: Optional[dict]):
+        game = GameService.rooms.get(room_id)
+        if game is not None and any(p.is_ai for p in game.state.players.values()):
+            cls.knowledge.setdefault(room_id, Knowledge()).observe(type_, payload)
+
+    @classmethod
+    def forget(cls, room_id: str):
+        cls.knowledge.pop(room_id, None)
+        cls._idle.pop(room_id, None)
+        task = cls._tasks.pop(room_id, None)
+        if task is not None:
+            task.cancel()
+
+    @classmethod
+    def after_action(cls, room_id: str):
+        """Start a bot turn if one of the room's bots has something to do"""
+        game = GameService.rooms.get(room_id)
+        if game is None:
+            cls.forget(room_id)
+            return
+        task = cls._tasks.get(room_id)
+        if task is not None and not task.done():
+            return
+        if cls._idle.get(room_id) == game.events.seq or next_to_act(game) is None:
+            return
+        cls._tasks[room_id] = asyncio.create_task(cls._act(room_id, game), name=f"bot-{room_id}")
+
+    @classmethod
+    def _view(cls, room_id: str, game: Game) -> Optional[Tuple[BotView, int]]:
+        """Snapshot what the acting bot may see, with the event seq it was taken at. Runs inside the actor."""
+        if GameService.rooms.get(room_id) is not game:
+            return None
+        seq = game.events.seq
+        bot_id = next_to_act(game)
+        if bot_id is None:
+            cls._idle[room_id] = seq
+            return None
+        return view_for(game, bot_id, cls.knowledge.setdefault(room_id, Knowledge())), seq
+
+    @classmethod
+    async def _act(cls, room_id: str, game: Game):
+        await asyncio.sleep(settings.BOT_THINK_MS / 1000)
+        taken = await RoomActorService.call(room_id, partial(cls._view, room_id, game), "bot_view")
+        if taken is None:
+            return
+        view, seq = taken
+        try:
+            decision = await asyncio.get_running_loop().run_in_executor(cls._executor, decide, view)
+        except Exception as e:
+            logger.exception(f"Bot {view.me} in room {room_id} failed to decide: {e}")
+            decision = None
+        if decision is None:
+            cls._idle[room_id] = seq
+            return
+        RoomActorService.submit(room_id, partial(cls._apply, room_id, game, seq, view.me, decision), f"bot:{decision[0]}")
+
+    @classmethod
+    def _apply(cls, room_id: str, game: Game, seq: int, bot_id: str, decision: Decision):
+        if GameService.rooms.get(room_id) is not game or game.events.seq != seq:
+            return  # the room moved on while the bot was thinking; after_action starts over
+        t, p = decision
+        logger.info(f"Bot {bot_id} in room {room_id}: {t} {p}")
+        try:
+            cls.dispatch(game, room_id, bot_id, None, t, p)
+        finally:
+            if game.events.seq == seq:
+                # Nothing changed, so deciding again would repeat the same move
+                logger.warning(f"Bot {bot_id} in room {room_id} made no progress with {t}")
+                cls._idle[room_id] = seq
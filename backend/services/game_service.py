@@ -1,15 +1,83 @@
 from __future__ import annotations
 from typing import Dict
 from loguru import logger
+import metrics
+from config import CHANNEL_GAME, settings
 from game import Game
+from services.room_actor import RoomActorService
+from services.room_store import MemoryRoomStore, RoomStore, create_store
+from services.timer_service import TimerService
+from services.websocket_service import WebSocketService
+
+logger = logger.bind(channel=CHANNEL_GAME)
 
 class GameService:
     rooms: Dict[str, Game] = {}
+    store: RoomStore = MemoryRoomStore()
+    _saved_seqs: Dict[str, int] = {}  # room_id -> last event seq handed to the store
+    _snapshot_seqs: Dict[str, int] = {}  # room_id -> event seq of the last stored snapshot
+    
+    @classmethod
+    def init_store(cls):
+        """Open the configured room store and restore the rooms it holds. Call on startup."""
+        cls.store = create_store()
+        for room_id, (snapshot, events) in cls.store.load_all().items():
+            try:
+                game = Game.replay(room_id, events, snapshot)
+            except Exception as e:
+                logger.error(f"Could not restore room {room_id}: {e}")
+                continue
+            cls.rooms[room_id] = game
+            RoomActorService.start(room_id)
+            cls._saved_seqs[room_id] = game.events.seq
+            cls._snapshot_seqs[room_id] = game.events.base_seq
+            logger.info(f"Restored room {room_id} (phase={game.state.phase}, players={len(game.state.players)}, replayed {len(events)} events)")
+        if cls.store.persistent:
+            cls.store.start()
+            RoomActorService.after_action.append(cls.persist)
+    
+    @classmethod
+    def close_store(cls):
+        cls.store.close()
+    
+    @classmethod
+    def persist(cls, room_id: str):
+        """
+        Hand the room's new events to the store; every ROOM_STORE_SNAPSHOT_EVERY
+        events (and for a room's first save) store a full snapshot instead.
+        """
+        game = cls.rooms.get(room_id)
+        if game is None:
+            return
+        seq = game.events.seq
+        saved = cls._saved_seqs.get(room_id)
+        if saved == seq:
+            return
+        if saved is None or seq - cls._snapshot_seqs.get(room_id, 0) >= settings.ROOM_STORE_SNAPSHOT_EVERY:
+            cls.store.save(room_id, game.to_snapshot())
+            cls._snapshot_seqs[room_id] = seq
+            # The snapshot covers every event so far: the room no longer needs to keep them
+            game.events.compact(seq)
+        else:
+            cls.store.append_events(room_id, game.events.since(saved))
+        cls._saved_seqs[room_id] = seq
+    
+    @classmethod
+    def remove_room(cls, room_id: str) -> bool:
+        """Drop a room from memory and from the store, and stop its actor and timers"""
+        RoomActorService.stop(room_id)
+        TimerService.cancel_room(room_id)
+        WebSocketService.forget_room(room_id)
+        cls._saved_seqs.pop(room_id, None)
+        cls._snapshot_seqs.pop(room_id, None)
+        cls.store.delete(room_id)
+        return cls.rooms.pop(room_id, None) is not None
     
     @classmethod
     def get_or_create_room(cls, room_id: str) -> Game:
         if room_id not in cls.rooms:
             cls.rooms[room_id] = Game(room_id)
+            RoomActorService.start(room_id)
             logger.info(f"Created new game room: {room_id}")
         return cls.rooms[room_id]
     
@@ -32,7 +100,7 @@ class GameService:
         
         # Remove empty rooms
         for room_id in rooms_to_remove:
-            del cls.rooms[room_id]
+            cls.remove_room(room_id)
             cleaned_count += 1
             logger.info(f"Cleaned up empty room: {room_id}")
         
@@ -58,4 +126,20 @@ class GameService:
             "rooms_with_players": rooms_with_players,
             "empty_rooms": total_rooms - rooms_with_players,
             "total_players": total_players
-        }
\ No newline at end of file
+        }
+
+@metrics.gauge("rooms", "Rooms held by this worker, by kind", ("kind",))
+def _room_counts():
+    stats = GameService.get_room_stats()
+    return {("total",): stats["total_rooms"], ("empty",): stats["empty_rooms"]}
+
+
+@metrics.gauge("players", "Players across this worker's rooms")
+def _player_count():
+    return {(): GameService.get_room_stats()["total_players"]}
+
+
+@metrics.gauge("room_actor_queue_actions", "Actions waiting in room actor queues: total, and the longest single queue", ("stat",))
+def _actor_queue_depths():
+    depths = [actor.queue_depth for actor in RoomActorService.actors.values()]
+    return {("total",): sum(depths), ("max",): max(depths, default=0)}
@@ -0,0 +1,118 @@
+from __future__ import annotations
+import asyncio
+import inspect
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+
+import metrics
+
+Action = Callable[[], Any]  # sync function or coroutine function, run with no arguments
+
+
+class RoomActor:
+    """
+    Serializes everything that touches one room's Game. Socket loops and HTTP
+    handlers only enqueue actions; a single task applies them one at a time,
+    so a handler never observes state changed mid-way by another player.
+    """
+
+    def __init__(self, room_id: str):
+        self.room_id = room_id
+        self._queue: asyncio.Queue[Optional[Tuple[Action, Optional[asyncio.Future], str, float]]] = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name=f"room-actor-{self.room_id}")
+
+    def submit(self, action: Action, label: str = "") -> None:
+        """Queue an action without waiting for it"""
+        self._ensure_running()
+        self._queue.put_nowait((action, None, label, time.perf_counter()))
+
+    async def call(self, action: Action, label: str = "") -> Any:
+        """Queue an action and wait for its result (exceptions are re-raised to the caller)"""
+        self._ensure_running()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((action, future, label, time.perf_counter()))
+        return await future
+
+    def stop(self):
+        """Finish the queued actions, then let the task exit"""
+        self._queue.put_nowait(None)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def is_current_task(self) -> bool:
+        return self._task is asyncio.current_task()
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            action, future, label, queued_at = item
+            started = time.perf_counter()
+            metrics.room_action_wait.observe(started - queued_at)
+            try:
+                result = action()
+                if inspect.isawaitable(result):
+                    result = await result
+                if future is not None and not future.done():
+                    future.set_result(result)
+            except Exception as e:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+                else:
+                    logger.exception(f"Room {self.room_id} action {label or action} failed: {e}")
+            metrics.room_actions.observe(time.perf_counter() - started, label or "other")
+            for hook in RoomActorService.after_action:
+                try:
+                    hook(self.room_id)
+                except Exception as e:
+                    logger.exception(f"Room {self.room_id} after-action hook failed: {e}")
+
+
+class RoomActorService:
+    actors: Dict[str, RoomActor] = {}  # room_id -> actor
+    after_action: List[Callable[[str], None]] = []  # called with the room id after every action
+
+    @classmethod
+    def start(cls, room_id: str) -> RoomActor:
+        """Give a new room its actor. Only room creation does this: submit/call never bring back a stopped one."""
+        if room_id not in cls.actors:
+            cls.actors[room_id] = RoomActor(room_id)
+        return cls.actors[room_id]
+
+    @classmethod
+    def submit(cls, room_id: str, action: Action, label: str = "") -> None:
+        """Queue an action for the room; dropped if the room is gone (its actor was stopped)"""
+        actor = cls.actors.get(room_id)
+        if actor is None:
+            logger.debug("Dropping {} for room {}: no actor (room removed)", label or action, room_id)
+            return
+        actor.submit(action, label)
+
+    @classmethod
+    async def call(cls, room_id: str, action: Action, label: str = "") -> Any:
+        """Run an action on the room's actor and return its result; None, without running it, if the room is gone"""
+        actor = cls.actors.get(room_id)
+        if actor is None:
+            logger.debug("Skipping {} for room {}: no actor (room removed)", label or action, room_id)
+            return None
+        if actor.is_current_task:
+            # Already inside this room's actor; run inline instead of deadlocking
+            result = action()
+            return await result if inspect.isawaitable(result) else result
+        return await actor.call(action, label)
+
+    @classmethod
+    def stop(cls, room_id: str):
+        actor = cls.actors.pop(room_id, None)
+        if actor is not None:
+            actor.stop()
+            logger.debug(f"Stopped actor for room {room_id}")
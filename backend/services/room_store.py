@@ -0,0 +1,186 @@
+from __future__ import annotations
+import asyncio
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+from loguru import logger
+
+from config import settings
+from encoding import dumps
+from event_log import SEQ
+
+# room_id -> (latest snapshot or None, events after that snapshot)
+StoredRooms = Dict[str, Tuple[Optional[dict], List[dict]]]
+
+
+class RoomStore(ABC):
+    """
+    Where rooms are kept between restarts: a snapshot (Game.to_snapshot) plus
+    the events logged after it (event_log.py). `save`, `append_events` and
+    `delete` must be cheap: they are called from the room actors.
+    """
+
+    persistent = False  # whether rooms outlive the process
+
+    @abstractmethod
+    def save(self, room_id: str, snapshot: dict) -> None:
+        """Store a snapshot; events up to its "seq" are no longer needed"""
+
+    @abstractmethod
+    def append_events(self, room_id: str, events: List[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, room_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def load_all(self) -> StoredRooms:
+        ...
+
+    def start(self) -> None:
+        """Start background work (called once the event loop is running)"""
+
+    def close(self) -> None:
+        """Persist anything pending and release resources"""
+
+
+class MemoryRoomStore(RoomStore):
+    """Keeps rooms in process memory only (they do not survive a restart)"""
+
+    def __init__(self):
+        self.snapshots: Dict[str, dict] = {}
+        self.events: Dict[str, List[dict]] = {}
+
+    def save(self, room_id: str, snapshot: dict) -> None:
+        self.snapshots[room_id] = snapshot
+        self.events[room_id] = [e for e in self.events.get(room_id, []) if e[SEQ] > snapshot["seq"]]
+
+    def append_events(self, room_id: str, events: List[dict]) -> None:
+        self.events.setdefault(room_id, []).extend(events)
+
+    def delete(self, room_id: str) -> None:
+        self.snapshots.pop(room_id, None)
+        self.events.pop(room_id, None)
+
+    def load_all(self) -> StoredRooms:
+        room_ids = set(self.snapshots) | set(self.events)
+        return {r: (self.snapshots.get(r), list(self.events.get(r, []))) for r in room_ids}
+
+
+class SqliteRoomStore(RoomStore):
+    """
+    Write-behind SQLite store. Calls only update in-memory pending state; a
+    background task writes everything pending in one transaction every
+    `flush_interval` seconds, off the event loop.
+    """
+
+    persistent = True
+
+    def __init__(self, path: str, flush_interval: float = 0.5):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.flush_interval = flush_interval
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS rooms ("
+            "room_id TEXT PRIMARY KEY, snapshot TEXT NOT NULL, updated_at REAL NOT NULL DEFAULT (julianday('now')))"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            "room_id TEXT NOT NULL, seq INTEGER NOT NULL, event TEXT NOT NULL, PRIMARY KEY (room_id, seq))"
+        )
+        self._db.commit()
+        self._deleted: Set[str] = set()
+        self._snapshots: Dict[str, dict] = {}  # room_id -> latest pending snapshot
+        self._events: Dict[str, List[dict]] = {}  # room_id -> pending events
+        self._task: Optional[asyncio.Task] = None
+        self._lock = threading.Lock()  # the writer thread and close() share the connection
+
+    def save(self, room_id: str, snapshot: dict) -> None:
+        self._snapshots[room_id] = snapshot
+
+    def append_events(self, room_id: str, events: List[dict]) -> None:
+        self._events.setdefault(room_id, []).extend(events)
+
+    def delete(self, room_id: str) -> None:
+        self._deleted.add(room_id)
+        self._snapshots.pop(room_id, None)
+        self._events.pop(room_id, None)
+
+    def load_all(self) -> StoredRooms:
+        rooms: StoredRooms = {}
+        for room_id, snapshot in self._db.execute("SELECT room_id, snapshot FROM rooms"):
+            rooms[room_id] = (json.loads(snapshot), [])
+        for room_id, event in self._db.execute("SELECT room_id, event FROM events ORDER BY room_id, seq"):
+            rooms.setdefault(room_id, (None, []))[1].append(json.loads(event))
+        return rooms
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    def _take_pending(self):
+        pending = (self._deleted, self._snapshots, self._events)
+        self._deleted, self._snapshots, self._events = set(), {}, {}
+        return pending
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if not (self._deleted or self._snapshots or self._events):
+                continue
+            deleted, snapshots, events = self._take_pending()
+            try:
+                await asyncio.to_thread(self._write, deleted, snapshots, events)
+            except Exception as e:
+                logger.error(f"Failed to persist {len(snapshots) + len(events)} rooms: {e}")
+                # Put the batch back in front of anything queued meanwhile
+                self._deleted = deleted | self._deleted
+                self._snapshots = {**snapshots, **self._snapshots}
+                for room_id, evs in events.items():
+                    self._events[room_id] = evs + self._events.get(room_id, [])
+
+    def _write(self, deleted: Set[str], snapshots: Dict[str, dict], events: Dict[str, List[dict]]):
+        with self._lock, self._db:
+            for room_id in deleted:
+                self._db.execute("DELETE FROM rooms WHERE room_id = ?", (room_id,))
+                self._db.execute("DELETE FROM events WHERE room_id = ?", (room_id,))
+            self._db.executemany(
+                "INSERT OR REPLACE INTO events (room_id, seq, event) VALUES (?, ?, ?)",
+                [(room_id, e[SEQ], dumps(e)) for room_id, evs in events.items() for e in evs],
+            )
+            for room_id, snapshot in snapshots.items():
+                self._db.execute(
+                    "INSERT INTO rooms (room_id, snapshot) VALUES (?, ?) "
+                    "ON CONFLICT(room_id) DO UPDATE SET snapshot = excluded.snapshot, updated_at = julianday('now')",
+                    (room_id, dumps(snapshot)),
+                )
+                self._db.execute("DELETE FROM events WHERE room_id = ? AND seq <= ?", (room_id, snapshot["seq"]))
+        logger.debug(f"Persisted {len(snapshots)} snapshots, {sum(map(len, events.values()))} events, deleted {len(deleted)} rooms")
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._write(*self._take_pending())
+        with self._lock:
+            self._db.close()
+
+
+def create_store() -> RoomStore:
+    """Build the store selected by settings.ROOM_STORE"""
+    if settings.ROOM_STORE == "sqlite":
+        path = settings.ROOM_STORE_PATH
+        if settings.WORKER_COUNT > 1:
+            # One file per worker; each only ever holds the rooms it owns
+            p = Path(path)
+            path = str(p.with_name(f"{p.stem}-{settings.WORKER_INDEX}{p.suffix}"))
+        logger.info(f"Using SQLite room store at {path}")
+        return SqliteRoomStore(path, settings.ROOM_STORE_FLUSH_MS / 1000)
+    return MemoryRoomStore()
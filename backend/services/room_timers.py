@@ -0,0 +1,119 @@
+from __future__ import annotations
+from functools import partial
+from typing import Any, Callable, Dict, Hashable, Tuple
+from loguru import logger
+
+from config import CHANNEL_GAME, settings
+from game import Game
+from room_index import VOTE_ABORT, VOTE_FIELDS
+from services.game_service import GameService
+from services.room_actor import RoomActorService
+from services.timer_service import TimerService
+from services.websocket_service import WebSocketService
+
+logger = logger.bind(channel=CHANNEL_GAME)
+
+# Timer names (per room); "grace:<player id>" has one per disconnected player
+VOTE = "vote:"
+TURN = "turn"
+GRACE = "grace:"
+IDLE = "idle"
+
+
+class RoomTimers:
+    """
+    The deadlines of a room: open votes (VOTE_TIMEOUT_S), the turn of a human
+    player (TURN_TIMEOUT_S), seated players who dropped out mid-game
+    (DISCONNECT_GRACE_S, then a bot plays for them) and rooms nobody is
+    connected to (ROOM_IDLE_TTL_S). After every room action the timers are
+    matched to the room's state; when one fires, its effect is applied as an
+    action on the room's actor like any client message, so it is serialized
+    with them and recorded in the room's event log.
+    """
+    @classmethod
+    def start(cls):
+        """Hook into room actions and start the timer wheel. Call on startup."""
+        RoomActorService.after_action.append(cls.watch)
+        TimerService.start()
+        for room_id in list(GameService.rooms):
+            cls.watch(room_id)
+
+    @classmethod
+    def stop(cls):
+        TimerService.stop()
+
+    @classmethod
+    def _wanted(cls, room_id: str, game: Game) -> Dict[str, Tuple[Hashable, float, Callable[[], Any]]]:
+        """Timers the room should have now: name -> (token, delay, action to run when it fires)"""
+        s = game.state
+        wanted = {}
+        for kind in VOTE_FIELDS:
+            round_ = game.open_vote(kind)
+            if round_ is not None and settings.VOTE_TIMEOUT_S > 0:
+                wanted[VOTE + kind] = (round_, settings.VOTE_TIMEOUT_S, partial(cls._expire_vote, room_id, game, kind, round_))
+        turn = s.players.get(s.turn_player) if s.turn_player else None
+        if (settings.TURN_TIMEOUT_S > 0 and s.phase == "playing" and turn is not None and not turn.is_ai
+                and game.open_vote(VOTE_ABORT) is None and game.team_has_cards(turn.team)):
+            # Restarts with every recorded action, so only a turn nothing happens in runs out
+            token = (turn.id, game.events.seq)
+            wanted[TURN] = (token, settings.TURN_TIMEOUT_S, partial(cls._expire_turn, room_id, game, *token))
+        if settings.DISCONNECT_GRACE_S > 0 and s.phase != "lobby":
+            for pid in s.seats.values():
+                player = s.players.get(pid) if pid else None
+                if player is not None and not player.connected and not player.is_ai:
+                    wanted[GRACE + pid] = (True, settings.DISCONNECT_GRACE_S, partial(cls._stand_in, room_id, game, pid))
+        if settings.ROOM_IDLE_TTL_S > 0 and not WebSocketService.connections.get(room_id):
+            wanted[IDLE] = (True, settings.ROOM_IDLE_TTL_S, partial(cls._expire_room, room_id, game))
+        return wanted
+
+    @classmethod
+    def watch(cls, room_id: str):
+        """Arm, move or cancel the room's timers to match its state. Runs after every room action."""
+        game = GameService.rooms.get(room_id)
+        if game is None:
+            TimerService.cancel_room(room_id)
+            return
+        armed = TimerService.pending(room_id)
+        wanted = cls._wanted(room_id, game)
+        for name in armed:
+            if name not in wanted:
+                TimerService.cancel(room_id, name)
+        for name, (token, delay, action) in wanted.items():
+            # Same token: the deadline set for it still stands
+            if name not in armed or armed[name] != token:
+                label = f"timer:{name.split(':')[0]}"
+                TimerService.schedule(room_id, name, delay, partial(RoomActorService.submit, room_id, action, label), token)
+
+    @classmethod
+    def _current(cls, room_id: str, game: Game) -> bool:
+        return GameService.rooms.get(room_id) is game
+
+    @classmethod
+    def _expire_vote(cls, room_id: str, game: Game, kind: str, round_: int):
+        if not cls._current(room_id, game) or game.open_vote(kind) != round_:
+            return
+        res = game.expire_vote(kind)
+        WebSocketService.broadcast(room_id, "voting_failed" if kind == VOTE_ABORT else "back_to_lobby_failed", res, game)
+
+    @classmethod
+    def _expire_turn(cls, room_id: str, game: Game, player_id: str, seq: int):
+        if not cls._current(room_id, game) or game.events.seq != seq:
+            return
+        res = game.expire_turn(player_id)
+        if res is not None:
+            WebSocketService.broadcast(room_id, "turn_timeout", res, game)
+
+    @classmethod
+    def _stand_in(cls, room_id: str, game: Game, player_id: str):
+        if not cls._current(room_id, game):
+            return
+        res = game.bot_stand_in(player_id)
+        if res is not None:
+            WebSocketService.broadcast(room_id, "bot_stand_in", res, game)
+
+    @classmethod
+    def _expire_room(cls, room_id: str, game: Game):
+        if not cls._current(room_id, game) or WebSocketService.connections.get(room_id):
+            return
+        logger.info(f"Removing room {room_id}: nobody connected for {settings.ROOM_IDLE_TTL_S:.0f}s")
+        GameService.remove_room(room_id)
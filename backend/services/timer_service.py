@@ -0,0 +1,197 @@
+"""
+One scheduler for every room's deadlines: a hierarchical timing wheel advanced
+by a single task, instead of a sleeping task per timer.
+
+Level 0 of the wheel has one slot per tick (TIMER_TICK_MS); each level above
+has slots as wide as the whole level below. A timer sits in the lowest level
+whose span still contains its deadline and moves down a level each time the
+level above turns over to its slot, so scheduling and cancelling are O(1) and
+a tick only touches the slots it passes. Cancelled timers are dropped lazily,
+when their slot comes up.
+"""
+from __future__ import annotations
+import asyncio
+import math
+import time
+from typing import Callable, Dict, Hashable, List, Optional
+from loguru import logger
+
+import metrics
+from config import settings
+
+SLOT_BITS = 6  # 64 slots per level
+LEVELS = 4  # 64**4 ticks: ~19 days at 100ms, later deadlines wait in an overflow list
+
+Callback = Callable[[], None]
+
+
+class _Timer:
+    __slots__ = ("key", "due", "callback", "cancelled")
+
+    def __init__(self, key: Hashable, due: int, callback: Callback):
+        self.key = key
+        self.due = due  # tick
+        self.callback = callback
+        self.cancelled = False
+
+
+class TimerWheel:
+    """Keyed timers on a hierarchical wheel. Time is in ticks and only moves through `advance`."""
+
+    def __init__(self):
+        self.now = 0  # current tick
+        self._slots: List[List[List[_Timer]]] = [[[] for _ in range(1 << SLOT_BITS)] for _ in range(LEVELS)]
+        self._overflow: List[_Timer] = []
+        self._timers: Dict[Hashable, _Timer] = {}  # key -> pending timer
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def schedule(self, key: Hashable, ticks: int, callback: Callback):
+        """Run `callback` `ticks` ticks from now (at least one), replacing the timer under `key`"""
+        self.cancel(key)
+        timer = self._timers[key] = _Timer(key, self.now + max(1, ticks), callback)
+        self._place(timer)
+
+    def cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        timer.cancelled = True
+        return True
+
+    def _place(self, timer: _Timer):
+        # Lowest level at which the deadline lies in the block the wheel is in now
+        for level in range(LEVELS):
+            shift = SLOT_BITS * level
+            if timer.due >> (shift + SLOT_BITS) == self.now >> (shift + SLOT_BITS):
+                self._slots[level][(timer.due >> shift) & ((1 << SLOT_BITS) - 1)].append(timer)
+                return
+        self._overflow.append(timer)
+
+    def _cascade(self, timers: List[_Timer]):
+        for timer in timers:
+            if not timer.cancelled:
+                self._place(timer)
+
+    def advance(self, to_tick: int) -> List[Callback]:
+        """Move time forward to `to_tick`; returns the callbacks of the timers that came due, in order"""
+        due: List[Callback] = []
+        mask = (1 << SLOT_BITS) - 1
+        if not self._timers and self.now < to_tick:
+            # Nothing pending (what the slots still hold was cancelled): skip ahead
+            for level in self._slots:
+                for slot in level:
+                    slot.clear()
+            self._overflow.clear()
+            self.now = to_tick
+        while self.now < to_tick:
+            self.now += 1
+            now = self.now
+            # Pull timers down from every level that turned over, highest first
+            if now & ((1 << (SLOT_BITS * LEVELS)) - 1) == 0:
+                overflow, self._overflow = self._overflow, []
+                self._cascade(overflow)
+            for level in range(LEVELS - 1, 0, -1):
+                shift = SLOT_BITS * level
+                if now & ((1 << shift) - 1) == 0:
+                    slot = self._slots[level][(now >> shift) & mask]
+                    timers = slot[:]
+                    slot.clear()
+                    self._cascade(timers)
+            slot = self._slots[0][now & mask]
+            for timer in slot:
+                if not timer.cancelled:
+                    del self._timers[timer.key]
+                    due.append(timer.callback)
+            slot.clear()
+        return due
+
+
+class TimerService:
+    """
+    Room deadlines on one shared TimerWheel. Timers are keyed by room and name,
+    so scheduling a name again moves its deadline and a room's timers can be
+    dropped together; each carries a token saying what it was set for. Callbacks run on the event loop and must be quick: to
+    touch a room they submit an action to its actor (see room_timers.py).
+    """
+    wheel = TimerWheel()
+    _rooms: Dict[str, Dict[str, Hashable]] = {}  # room_id -> name -> token of its pending timers
+    _task: Optional[asyncio.Task] = None
+    _origin = 0.0  # monotonic time of tick 0
+
+    @classmethod
+    def _ticks(cls, delay_s: float) -> int:
+        return math.ceil(delay_s * 1000 / settings.TIMER_TICK_MS)
+
+    @classmethod
+    def schedule(cls, room_id: str, name: str, delay_s: float, callback: Callback, token: Hashable = None):
+        names = cls._rooms.setdefault(room_id, {})
+        names[name] = token
+
+        def fire():
+            names.pop(name, None)
+            if not names and cls._rooms.get(room_id) is names:
+                del cls._rooms[room_id]
+            metrics.timers_fired.inc(name.split(":")[0])
+            callback()
+
+        cls.wheel.schedule((room_id, name), cls._ticks(delay_s), fire)
+
+    @classmethod
+    def cancel(cls, room_id: str, name: str) -> bool:
+        names = cls._rooms.get(room_id)
+        if names is not None:
+            names.pop(name, None)
+            if not names:
+                del cls._rooms[room_id]
+        return cls.wheel.cancel((room_id, name))
+
+    @classmethod
+    def cancel_room(cls, room_id: str):
+        for name in cls._rooms.pop(room_id, ()):
+            cls.wheel.cancel((room_id, name))
+
+    @classmethod
+    def pending(cls, room_id: str) -> Dict[str, Hashable]:
+        """The room's pending timers: name -> token"""
+        return dict(cls._rooms.get(room_id, {}))
+
+    @classmethod
+    def start(cls):
+        """Start the task that advances the wheel. Call on startup."""
+        if cls._task is None:
+            cls._origin = time.monotonic() - cls.wheel.now * settings.TIMER_TICK_MS / 1000
+            cls._task = asyncio.create_task(cls._run(), name="room-timers")
+
+    @classmethod
+    def stop(cls):
+        if cls._task is not None:
+            cls._task.cancel()
+            cls._task = None
+
+    @classmethod
+    def tick(cls) -> int:
+        """Fire everything due by now. Returns how many timers fired."""
+        target = int((time.monotonic() - cls._origin) * 1000 / settings.TIMER_TICK_MS)
+        fired = cls.wheel.advance(target)
+        for callback in fired:
+            try:
+                callback()
+            except Exception as e:
+                logger.exception(f"Timer callback failed: {e}")
+        return len(fired)
+
+    @classmethod
+    async def _run(cls):
+        while True:
+            await asyncio.sleep(settings.TIMER_TICK_MS / 1000)
+            cls.tick()
+
+
+@metrics.gauge("room_timers_pending", "Timers waiting on the shared timer wheel")
+def _pending_timers():
+    return {(): len(TimerService.wheel)}
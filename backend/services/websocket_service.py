@@ -1,60 +1,571 @@
 from __future__ import annotations
-import json
-from typing import Dict
+import asyncio
+import secrets
+import time
+from collections import deque
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, NamedTuple, Optional, Tuple, Union
 from fastapi import WebSocket
 from loguru import logger
 
+import metrics
+from config import CHANNEL_WEBSOCKET, settings
+from encoding import dumps
+from services import wire
+
+if TYPE_CHECKING:
+    from game import Game
+
+logger = logger.bind(channel=CHANNEL_WEBSOCKET)
+
+SYNC_FULL = "full"    # every state-bearing message carries the whole RoomState (in a batch, only the last one)
+SYNC_DELTA = "delta"  # state travels as versioned patches, full snapshot only when needed
+SYNC_MODES = (SYNC_FULL, SYNC_DELTA)
+
+# Close code used when kicking a connection that cannot keep up (1013 = try again later)
+SLOW_CONSUMER_CLOSE_CODE = 1013
+# Close code for connections that stopped answering heartbeats (application range; the client reconnects)
+HEARTBEAT_CLOSE_CODE = 4008
+
+# Weight of a new RTT sample in a connection's smoothed RTT
+RTT_SMOOTHING = 0.2
+
+# Messages whose payload depends on who looks: type -> (game, view role, payload) -> payload for that role
+VIEW_PAYLOADS: Dict[str, Callable[["Game", str, dict], dict]] = {
+    "new_game_started": lambda game, role, p: {**p, "dealing_sequence": game.dealing_view(p.get("dealing_sequence") or [], role)},
+}
+
+
+class PendingMessage(NamedTuple):
+    type_: str
+    payload: Optional[dict]
+    game: Optional["Game"]
+    player_id: Optional[str]  # None = whole room
+
+
+class RoomHistory:
+    """
+    The room's most recent flushed messages, numbered with a per-room sequence
+    so a reconnecting client can ask for just what it missed. Numbering starts
+    at a random offset, so a seq remembered from an earlier incarnation of the
+    room (emptied and recreated, restarted, another worker) is not mistaken
+    for one of this one.
+    """
+
+    def __init__(self, size: int):
+        self.next_seq = secrets.randbits(31)
+        self.messages: Deque[Tuple[int, PendingMessage]] = deque(maxlen=size)
+
+    def append(self, message: PendingMessage) -> int:
+        seq = self.next_seq
+        self.next_seq += 1
+        self.messages.append((seq, message))
+        return seq
+
+    def since(self, seq: int) -> Optional[List[Tuple[int, PendingMessage]]]:
+        """Messages after `seq`, or None if some of them are no longer kept (or `seq` is not ours)"""
+        if not self.next_seq - 1 - len(self.messages) <= seq < self.next_seq:
+            return None
+        return [(n, m) for n, m in self.messages if n > seq]
+
+class Connection:
+    """
+    A player's socket plus the state-sync bookkeeping for it. Outgoing frames go
+    through a bounded queue drained by a dedicated writer task, so a slow client
+    never holds up sends to the rest of the room.
+    """
+
+    def __init__(self, ws: WebSocket, player_id: str, sync_mode: str = SYNC_FULL, room_id: str = "", wire_format: str = wire.WIRE_JSON, batch: bool = False):
+        self.ws = ws
+        self.player_id = player_id
+        self.room_id = room_id
+        self.sync_mode = sync_mode if sync_mode in SYNC_MODES else SYNC_FULL
+        self.wire = wire.negotiate(wire_format)
+        self.batch = batch  # client understands {"type": "batch"} frames
+        self.state_version: Optional[int] = None  # last state version this client holds
+        self.view_role: Optional[str] = None  # state projection the client's version refers to
+        self.role_since: Optional[int] = None  # first state version sent under the current view_role
+        self.closed = False
+        self.reaped = False  # the heartbeat gave up on it; the cleanup already ran
+        self.last_seen = time.monotonic()  # when the client last sent anything
+        self.rtt: Optional[float] = None  # smoothed ping round trip, seconds (includes the send queue)
+        self._ping: Optional[Tuple[int, float]] = None  # (id, sent at) of the ping awaiting its pong
+        self._queue: asyncio.Queue[Union[str, bytes]] = asyncio.Queue(maxsize=settings.WS_SEND_QUEUE_SIZE)
+        self._writer: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._write_loop())
+
+    def request_resync(self):
+        """Forget the client's version so the next state-bearing message is a full snapshot"""
+        self.state_version = None
+        self.view_role = None
+
+    def set_wire(self, wire_format: str) -> str:
+        """Switch outbound encoding; the client gets a fresh snapshot in the new format"""
+        self.wire = wire.negotiate(wire_format)
+        self.request_resync()
+        return self.wire
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def seen(self):
+        """Record that the client sent something (any frame proves it is alive)"""
+        self.last_seen = time.monotonic()
+
+    def ping(self, ping_id: int):
+        self._ping = (ping_id, time.monotonic())
+        self.enqueue(wire.encode(self.wire, {"type": "ping", "payload": {"id": ping_id}}))
+
+    def pong(self, ping_id: Any):
+        if self._ping is None or self._ping[0] != ping_id:
+            return  # answer to an older ping
+        sample = time.monotonic() - self._ping[1]
+        self._ping = None
+        self.rtt = sample if self.rtt is None else self.rtt + RTT_SMOOTHING * (sample - self.rtt)
+        metrics.heartbeat_rtt.observe(sample)
+
+    def enqueue(self, data: Union[str, bytes]) -> bool:
+        """Queue a frame for sending. Kicks the connection if its queue is full."""
+        if self.closed:
+            return False
+        try:
+            self._queue.put_nowait(data)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"Send queue full for player {self.player_id} in room {self.room_id}, kicking slow connection")
+            metrics.connections_dropped.inc("slow_consumer")
+            self.closed = True  # drop everything else until the kick completes
+            asyncio.create_task(self.close(SLOW_CONSUMER_CLOSE_CODE))
+            return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                data = await self._queue.get()
+                if isinstance(data, bytes):
+                    await self.ws.send_bytes(data)
+                else:
+                    await self.ws.send_text(data)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"Failed to send message to player {self.player_id} in room {self.room_id}: {e}")
+            metrics.connections_dropped.inc("send_error")
+            self.closed = True
+
+    async def close(self, code: int = 1000):
+        """Stop the writer and close the socket; the receive loop handles the cleanup"""
+        if self.closed and self._writer is None:
+            return
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._writer = None
+        try:
+            await self.ws.close(code=code)
+        except Exception:
+            pass  # already closed
+
+
 class WebSocketService:
-    connections: Dict[str, Dict[str, WebSocket]] = {}  # room_id -> {player_id: ws}
-    
+    connections: Dict[str, Dict[str, Connection]] = {}  # room_id -> {player_id: Connection}
+    _pending: Dict[str, List[PendingMessage]] = {}  # room_id -> messages waiting for the next flush
+    _flush_handles: Dict[str, asyncio.TimerHandle] = {}
+    _history: Dict[str, RoomHistory] = {}
+    # room_id -> player_id -> (view_role, role_since) of the player's last connection, for resuming
+    _sessions: Dict[str, Dict[str, Tuple[Optional[str], Optional[int]]]] = {}
+    observers: List[Callable[[str, str, Optional[dict]], None]] = []  # see every broadcast (room_id, type, payload)
+    on_dead: Optional[Callable[[Connection], None]] = None  # cleans up after a reaped connection, see start_heartbeat
+    _heartbeat: Optional[asyncio.Task] = None
+    _ping_id = 0
+
     @classmethod
-    async def broadcast(cls, room_id: str, type_: str, payload: dict):
+    def register(cls, room_id: str, player_id: str, ws: WebSocket, sync_mode: str = SYNC_FULL, wire_format: str = wire.WIRE_JSON, batch: bool = False) -> Connection:
         if room_id not in cls.connections:
-            logger.warning(f"Room {room_id} not found in connections for broadcast")
+            cls.connections[room_id] = {}
+            logger.debug(f"Created new connection dictionary for room {room_id}")
+        previous = cls.connections[room_id].get(player_id)
+        if previous is not None:
+            logger.info(f"Replacing existing connection for player {player_id} in room {room_id}")
+            cls._remember_session(previous)
+            asyncio.create_task(previous.close())
+        conn = Connection(ws, player_id, sync_mode, room_id, wire_format, batch)
+        conn.start()
+        cls.connections[room_id][player_id] = conn
+        return conn
+
+    @classmethod
+    def unregister(cls, room_id: str, player_id: str, conn: Optional[Connection] = None) -> bool:
+        """
+        Remove a player's connection. When `conn` is given, only remove it if it is
+        still the registered one (a newer socket may have replaced it).
+        """
+        current = cls.connections.get(room_id, {}).get(player_id)
+        if current is None or (conn is not None and current is not conn):
+            return False
+        del cls.connections[room_id][player_id]
+        cls._remember_session(current)
+        asyncio.create_task(current.close())
+        return True
+
+    @classmethod
+    def _remember_session(cls, conn: Connection):
+        cls._sessions.setdefault(conn.room_id, {})[conn.player_id] = (conn.view_role, conn.role_since)
+
+    @classmethod
+    def forget_room(cls, room_id: str):
+        """Drop the resume buffer and sessions of a room that was removed"""
+        cls._history.pop(room_id, None)
+        cls._sessions.pop(room_id, None)
+
+    @classmethod
+    def is_current(cls, room_id: str, player_id: str, conn: Connection) -> bool:
+        return cls.connections.get(room_id, {}).get(player_id) is conn
+
+    @staticmethod
+    def _frame(type_: str, payload: Optional[dict], frames: Dict, state_json: Optional[str] = None, **extra: Any) -> str:
+        """
+        Build a frame around an already-encoded state, so a state view is encoded
+        once per version no matter how many messages or connections carry it.
+        """
+        if type_ == "state":
+            body = state_json if state_json is not None else "null"
+        else:
+            if "payload" not in frames:
+                frames["payload"] = dumps({k: v for k, v in (payload or {}).items() if k != "state"})
+            body = frames["payload"]
+            if state_json is not None:
+                body = body[:-1] + ("," if len(body) > 2 else "") + '"state":' + state_json + "}"
+        frame = '{"type":' + dumps(type_) + ',"payload":' + body
+        if extra:
+            frame += "," + dumps(extra)[1:-1]
+        return frame + "}"
+
+    @staticmethod
+    def _compact_frame(conn: Connection, type_: str, payload: Optional[dict], frames: Dict, game: Optional["Game"] = None, role: Optional[str] = None, **extra: Any) -> Union[str, bytes]:
+        """Build a frame for compact/binary clients: cards as ids, hands as bitmasks"""
+        if "compact_payload" not in frames:
+            frames["compact_payload"] = wire.compact({k: v for k, v in (payload or {}).items() if k != "state"})
+        state = game.state_view_encoded(role, wire.WIRE_COMPACT, wire.compact) if game is not None else None
+        if type_ == "state":
+            body = state
+        else:
+            body = frames["compact_payload"]
+            if state is not None:
+                body = {**body, "state": state}
+        if "state_patch" in extra:
+            extra["state_patch"] = {**extra["state_patch"], "ops": wire.compact_ops(extra["state_patch"]["ops"])}
+        return wire.encode(conn.wire, {"type": type_, "payload": body, **extra})
+
+    @classmethod
+    def _encode(cls, conn: Connection, type_: str, payload: Optional[dict], frames: Dict, game: Optional["Game"] = None, role: Optional[str] = None, **extra: Any) -> Union[str, bytes]:
+        if conn.wire == wire.WIRE_JSON:
+            state_json = game.state_view_json(role) if game is not None else None
+            return cls._frame(type_, payload, frames, state_json, **extra)
+        return cls._compact_frame(conn, type_, payload, frames, game, role, **extra)
+
+    @classmethod
+    def _render(cls, conn: Connection, type_: str, payload: Optional[dict], game: Optional["Game"], frames: Dict, seq: int, with_state: bool = True) -> Optional[Union[str, bytes]]:
+        """
+        Encode the message as this connection should see it. Frames are cached in
+        `frames` so connections needing the same bytes share one encode.
+        `with_state=False` leaves the state out of a full-sync frame.
+        """
+        if game is None:
+            key = ("plain", conn.wire)
+            if key not in frames:
+                if conn.wire == wire.WIRE_JSON:
+                    frames[key] = dumps({"type": type_, "payload": payload, "seq": seq})
+                else:
+                    frames[key] = wire.encode(conn.wire, {"type": type_, "payload": wire.compact(payload), "seq": seq})
+            return frames[key]
+
+        version = game.state_version
+        role = game.view_role(conn.player_id)
+        project = VIEW_PAYLOADS.get(type_)
+        if project is not None and payload is not None:
+            # Every frame built from this payload differs per role too
+            frames = frames.setdefault(("view", role), {})
+            if "view_payload" not in frames:
+                frames["view_payload"] = project(game, role, payload)
+            payload = frames["view_payload"]
+        if conn.sync_mode == SYNC_FULL:
+            if not with_state:
+                key = ("full_bare", conn.wire)
+                if key not in frames:
+                    frames[key] = cls._encode(conn, type_, payload, frames, seq=seq)
+                return frames[key]
+            key = ("full", role, conn.wire)
+            if key not in frames:
+                frames[key] = cls._encode(conn, type_, payload, frames, game, role, seq=seq)
+            return frames[key]
+
+        ops = game.state_patch_since(conn.state_version, role) if conn.view_role == role else None
+        base = conn.state_version
+        if conn.view_role != role:
+            conn.role_since = version
+        conn.state_version = version
+        conn.view_role = role
+        if ops is None:
+            key = ("delta_full", role, conn.wire)
+            if key not in frames:
+                frames[key] = cls._encode(conn, type_, payload, frames, game, role, seq=seq, state_version=version)
+        elif not ops and base == version:
+            if type_ == "state":
+                return None  # client already holds this version
+            key = ("delta_current", conn.wire)
+            if key not in frames:
+                frames[key] = cls._encode(conn, type_, payload, frames, seq=seq, state_version=version)
+        else:
+            # May be empty: the version moved on without changing this view
+            key = ("delta_patch", role, base, conn.wire)
+            if key not in frames:
+                frames[key] = cls._encode(conn, type_, payload, frames, seq=seq, state_version=version,
+                                          state_patch={"base": base, "ops": ops})
+        return frames[key]
+
+    @classmethod
+    def _send(cls, conn: Connection, out: List[Union[str, bytes]], batches: Dict) -> Tuple[int, int]:
+        """Enqueue a connection's frames, batched if it negotiated batching; returns (frames, bytes)"""
+        if not conn.batch or len(out) == 1:
+            for data in out:
+                conn.enqueue(data)
+            return len(out), sum(len(data) for data in out)
+        if not out:
+            return 0, 0
+        key = (conn.wire, tuple(map(id, out)))
+        if key not in batches:
+            batches[key] = wire.batch(conn.wire, out)
+        conn.enqueue(batches[key])
+        return 1, len(batches[key])
+
+    @classmethod
+    def _schedule(cls, room_id: str, message: PendingMessage):
+        """Hold a message until the room's next flush (next loop tick or batch window)"""
+        cls._pending.setdefault(room_id, []).append(message)
+        if room_id not in cls._flush_handles:
+            loop = asyncio.get_running_loop()
+            delay = settings.WS_BATCH_WINDOW_MS / 1000
+            cls._flush_handles[room_id] = loop.call_later(delay, cls.flush, room_id)
+
+    @staticmethod
+    def _collapse(messages: List[PendingMessage], player_id: str) -> List[int]:
+        """
+        Indices of the messages a connection should get, dropping "state" messages
+        that a later state-bearing message supersedes (state is rendered at flush
+        time, so the later one already carries everything).
+        """
+        kept: List[int] = []
+        state_follows = False
+        for i in range(len(messages) - 1, -1, -1):
+            msg = messages[i]
+            if msg.player_id is not None and msg.player_id != player_id:
+                continue
+            if msg.type_ == "state" and state_follows:
+                continue
+            if msg.game is not None:
+                state_follows = True
+            kept.append(i)
+        kept.reverse()
+        return kept
+
+    @classmethod
+    def _render_all(cls, conn: Connection, messages: List[PendingMessage], frames: List[Dict], seqs: List[int]) -> List[Union[str, bytes]]:
+        """
+        Render a connection's share of `messages`. A batched full-sync connection
+        gets the whole list in one frame, so only the last state-bearing message
+        carries the state: the earlier ones would repeat an older copy of it.
+        """
+        kept = cls._collapse(messages, conn.player_id)
+        last_state = None
+        if conn.sync_mode == SYNC_FULL and conn.batch:
+            last_state = next((i for i in reversed(kept) if messages[i].game is not None), None)
+        out = []
+        for i in kept:
+            msg = messages[i]
+            with_state = last_state is None or i == last_state
+            data = cls._render(conn, msg.type_, msg.payload, msg.game, frames[i], seqs[i], with_state)
+            if data is not None:
+                out.append(data)
+        return out
+
+    @classmethod
+    def flush(cls, room_id: str):
+        """
+        Send everything collected for a room. Each connection gets its messages in
+        order, as one batch frame if it negotiated batching; every distinct frame is
+        still encoded once and shared by all sockets that need it.
+        """
+        handle = cls._flush_handles.pop(room_id, None)
+        if handle is not None:
+            handle.cancel()
+        messages = cls._pending.pop(room_id, None)
+        if not messages or room_id not in cls.connections:
             return
-        
-        data = json.dumps({"type": type_, "payload": payload})
-        dead = []
-        connection_count = len(cls.connections[room_id])
-        
-        logger.debug(f"Broadcasting {type_} to {connection_count} players in room {room_id}")
-        
-        for pid, ws in list(cls.connections[room_id].items()):
-            try:
-                await ws.send_text(data)
-            except Exception as e:
-                logger.warning(f"Failed to send message to player {pid} in room {room_id}: {e}")
-                dead.append(pid)
-        
-        for pid in dead:
+        started = time.perf_counter()
+
+        for game in {id(m.game): m.game for m in messages if m.game is not None}.values():
+            game.commit_state()
+
+        history = cls._history.get(room_id)
+        if history is None:
+            history = cls._history[room_id] = RoomHistory(settings.WS_RESUME_BUFFER)
+        seqs = [history.append(m) for m in messages]
+        frames: List[Dict] = [{} for _ in messages]
+        batches: Dict = {}
+        sent_frames = sent_bytes = 0
+
+        logger.debug("Flushing {} messages to {} players in room {}", len(messages), len(cls.connections[room_id]), room_id)
+
+        for conn in list(cls.connections[room_id].values()):
+            if conn.closed:
+                continue
+            out = cls._render_all(conn, messages, frames, seqs)
+            n_frames, n_bytes = cls._send(conn, out, batches)
+            sent_frames += n_frames
+            sent_bytes += n_bytes
+
+        metrics.broadcast_flush.observe(time.perf_counter() - started)
+        metrics.broadcast_bytes.observe(sent_bytes)
+        metrics.frames_sent.inc(amount=sent_frames)
+        metrics.bytes_sent.inc(amount=sent_bytes)
+
+    @classmethod
+    def resume(cls, conn: Connection, game: "Game", last_seq: int, version: Optional[int] = None) -> bool:
+        """
+        Send a reconnected client only the messages it missed since `last_seq`,
+        each carrying the current state (as a patch from `version`, the state
+        version it holds, when its view has not changed since). Returns False,
+        sending nothing, when the room no longer has all of them; the caller
+        then sends a full snapshot instead.
+        """
+        room_id, player_id = conn.room_id, conn.player_id
+        history = cls._history.get(room_id)
+        missed = history.since(last_seq) if history is not None else None
+        session = cls._sessions.get(room_id, {}).pop(player_id, None)
+        if missed is None:
+            metrics.resumes.inc("snapshot")
+            logger.info(f"Player {player_id} cannot resume room {room_id} from seq {last_seq}, sending snapshot")
+            return False
+
+        role = game.view_role(player_id)
+        if session is not None and version is not None and session[0] == role and session[1] is not None and version >= session[1]:
+            conn.state_version, conn.view_role, conn.role_since = version, role, session[1]
+
+        game.commit_state()
+        messages = [m for _, m in missed]
+        out = cls._render_all(conn, messages, [{} for _ in messages], [seq for seq, _ in missed])
+        n_frames, n_bytes = cls._send(conn, out, {})
+        metrics.resumes.inc("replayed")
+        metrics.frames_sent.inc(amount=n_frames)
+        metrics.bytes_sent.inc(amount=n_bytes)
+        logger.info(f"Player {player_id} resumed room {room_id} from seq {last_seq}: {len(missed)} missed messages, {n_bytes} bytes")
+        return True
+
+    @classmethod
+    def broadcast(cls, room_id: str, type_: str, payload: Optional[dict], game: Optional["Game"] = None):
+        """
+        Send a message to everyone in the room. When `game` is given, the room
+        state as of the flush is attached according to each connection's sync mode.
+        """
+        for observer in cls.observers:
             try:
-                del cls.connections[room_id][pid]
-                logger.info(f"Removed dead connection for player {pid} in room {room_id}")
+                observer(room_id, type_, payload)
             except Exception as e:
-                logger.error(f"Error removing dead connection for player {pid}: {e}")
+                logger.exception(f"Broadcast observer failed for {type_} in room {room_id}: {e}")
+
+        if room_id not in cls.connections:
+            logger.warning(f"Room {room_id} not found in connections for broadcast")
+            return
+
+        logger.debug("Broadcasting {} to {} players in room {}", type_, len(cls.connections[room_id]), room_id)
+        cls._schedule(room_id, PendingMessage(type_, payload, game, None))
 
     @classmethod
-    async def send_to_player(cls, room_id: str, player_id: str, type_: str, payload: dict):
+    def broadcast_state(cls, room_id: str, game: "Game"):
+        """Broadcast the current room state (full or as a patch, per connection)"""
+        cls.broadcast(room_id, "state", None, game)
+
+    @classmethod
+    def send_to_player(cls, room_id: str, player_id: str, type_: str, payload: Optional[dict], game: Optional["Game"] = None):
         """Send a message to a specific player in a room"""
         if room_id not in cls.connections:
             logger.warning(f"Room {room_id} not found in connections for send_to_player")
             return False
-            
+
         if player_id not in cls.connections[room_id]:
             logger.warning(f"Player {player_id} not found in room {room_id} connections")
             return False
-            
-        try:
-            data = json.dumps({"type": type_, "payload": payload})
-            await cls.connections[room_id][player_id].send_text(data)
-            logger.debug(f"Sent {type_} to player {player_id} in room {room_id}")
-            return True
-        except Exception as e:
-            logger.warning(f"Failed to send message to player {player_id} in room {room_id}: {e}")
-            # Remove dead connection
+
+        if cls.connections[room_id][player_id].closed:
+            return False
+        cls._schedule(room_id, PendingMessage(type_, payload, game, player_id))
+        logger.debug("Queued {} for player {} in room {}", type_, player_id, room_id)
+        return True
+
+
+    # ---------------- Heartbeat ----------------
+    @classmethod
+    def start_heartbeat(cls, on_dead: Callable[[Connection], None]):
+        """
+        Ping every connection each WS_HEARTBEAT_INTERVAL_S and reap those the
+        client has not sent anything on for WS_HEARTBEAT_MISSES intervals. The
+        socket is closed and `on_dead` runs the usual disconnect handling, since
+        a dead peer may never make the receive loop notice. Call on startup.
+        """
+        cls.on_dead = on_dead
+        if settings.WS_HEARTBEAT_INTERVAL_S > 0 and cls._heartbeat is None:
+            cls._heartbeat = asyncio.create_task(cls._heartbeat_loop(), name="ws-heartbeat")
+
+    @classmethod
+    def stop_heartbeat(cls):
+        if cls._heartbeat is not None:
+            cls._heartbeat.cancel()
+            cls._heartbeat = None
+
+    @classmethod
+    async def _heartbeat_loop(cls):
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL_S)
             try:
-                del cls.connections[room_id][player_id]
-                logger.info(f"Removed dead connection for player {player_id} in room {room_id}")
-            except Exception as del_e:
-                logger.error(f"Error removing dead connection for player {player_id}: {del_e}")
-            return False
\ No newline at end of file
+                cls.heartbeat()
+            except Exception as e:
+                logger.exception(f"Heartbeat pass failed: {e}")
+
+    @classmethod
+    def heartbeat(cls) -> int:
+        """One pass over all connections: reap the silent ones, ping the rest. Returns how many were reaped."""
+        now = time.monotonic()
+        timeout = settings.WS_HEARTBEAT_INTERVAL_S * settings.WS_HEARTBEAT_MISSES
+        cls._ping_id += 1
+        reaped = 0
+        for room_id, conns in list(cls.connections.items()):
+            for conn in list(conns.values()):
+                if conn.reaped:
+                    continue  # still listed until its receive loop ends
+                silent = now - conn.last_seen
+                if silent > timeout:
+                    conn.reaped = True
+                    logger.info(f"Reaping connection of player {conn.player_id} in room {room_id}: nothing received for {silent:.0f}s")
+                    metrics.connections_dropped.inc("heartbeat")
+                    asyncio.create_task(conn.close(HEARTBEAT_CLOSE_CODE))
+                    if cls.on_dead is not None:
+                        cls.on_dead(conn)
+                    reaped += 1
+                elif not conn.closed:
+                    conn.ping(cls._ping_id)
+        return reaped
+
+
+@metrics.gauge("ws_connections", "Open WebSocket connections")
+def _open_connections():
+    return {(): sum(len(conns) for conns in WebSocketService.connections.values())}
+
+
+@metrics.gauge("ws_send_queue_frames", "Frames waiting in send queues: total, and the deepest single queue", ("stat",))
+def _send_queue_depths():
+    depths = [conn.queue_depth for conns in WebSocketService.connections.values() for conn in conns.values()]
+    return {("total",): sum(depths), ("max",): max(depths, default=0)}
@@ -0,0 +1,100 @@
+"""
+Outbound wire formats a WebSocket client can negotiate (?wire=...):
+
+- "json":    default, cards as {"suit", "rank"} objects
+- "compact": JSON text, cards as integer ids (cards.py) and hands as bitmasks
+- "msgpack": the compact form packed with MessagePack into binary frames
+             (in requirements.txt; falls back to "compact" if it is not installed)
+"""
+from __future__ import annotations
+from typing import Any, List, Union
+
+from cards import SUIT_INDEX, RANK_INDEX, card_id
+from encoding import dumps
+
+try:
+    import msgpack
+except ImportError:  # optional binary codec
+    msgpack = None
+
+
+WIRE_JSON = "json"
+WIRE_COMPACT = "compact"
+WIRE_MSGPACK = "msgpack"
+WIRE_FORMATS = (WIRE_JSON, WIRE_COMPACT, WIRE_MSGPACK)
+
+# Keys whose card lists are sent as a single bitmask instead of a list of ids
+MASK_KEYS = frozenset({"hand", "cards"})
+
+
+def negotiate(requested: str | None) -> str:
+    if requested not in WIRE_FORMATS:
+        return WIRE_JSON
+    if requested == WIRE_MSGPACK and msgpack is None:
+        return WIRE_COMPACT
+    return requested
+
+
+def _is_card(obj: Any) -> bool:
+    return (
+        isinstance(obj, dict)
+        and len(obj) == 2
+        and obj.get("suit") in SUIT_INDEX
+        and obj.get("rank") in RANK_INDEX
+    )
+
+
+def _is_card_list(obj: Any) -> bool:
+    return isinstance(obj, list) and bool(obj) and all(_is_card(c) for c in obj)
+
+
+def compact(obj: Any, key: str | None = None) -> Any:
+    """Replace cards with ids and hand-like card lists with bitmasks"""
+    if isinstance(obj, dict):
+        if _is_card(obj):
+            return card_id(obj["suit"], obj["rank"])
+        return {k: compact(v, k) for k, v in obj.items()}
+    if isinstance(obj, list):
+        if key in MASK_KEYS and (not obj or _is_card_list(obj)):
+            mask = 0
+            for c in obj:
+                mask |= 1 << card_id(c["suit"], c["rank"])
+            return mask
+        return [compact(v) for v in obj]
+    return obj
+
+
+def compact_ops(ops: List[dict]) -> List[dict]:
+    """Compact JSON-patch operations, treating the last path segment as the key"""
+    out = []
+    for op in ops:
+        if "value" in op:
+            op = {**op, "value": compact(op["value"], op["path"].rsplit("/", 1)[-1])}
+        out.append(op)
+    return out
+
+
+def encode(wire: str, message: dict) -> Union[str, bytes]:
+    """Encode an already-compacted message for the given wire format"""
+    if wire == WIRE_MSGPACK:
+        return msgpack.packb(message)
+    return dumps(message)
+
+
+def _msgpack_array_header(n: int) -> bytes:
+    if n < 16:
+        return bytes([0x90 | n])
+    if n < 1 << 16:
+        return b"\xdc" + n.to_bytes(2, "big")
+    return b"\xdd" + n.to_bytes(4, "big")
+
+
+def batch(wire: str, frames: List[Union[str, bytes]]) -> Union[str, bytes]:
+    """Wrap already-encoded frames into one {"type": "batch", "payload": [...]} frame"""
+    if wire == WIRE_MSGPACK:
+        return (
+            b"\x82" + msgpack.packb("type") + msgpack.packb("batch") + msgpack.packb("payload")
+            + _msgpack_array_header(len(frames)) + b"".join(frames)
+        )
+    return '{"type":"batch","payload":[' + ",".join(frames) + "]}"
+
@@ -0,0 +1,120 @@
+"""
+Front router for a sharded deployment (see sharding.py and run.sh).
+
+Listens on the public port and forwards each room's HTTP requests and
+WebSocket connections to the worker process that owns the room. Room creation
+is spread round-robin (each worker only hands out ids it owns); other requests
+not tied to a room (health, Discord token exchange) go to worker 0.
+"""
+from __future__ import annotations
+import asyncio
+import itertools
+
+import httpx
+import websockets
+from fastapi import FastAPI, Request, Response, WebSocket, WebSocketDisconnect
+from loguru import logger
+
+from config import flush_logging, settings, setup_logging
+from sharding import owner, room_from_path, worker_address
+
+setup_logging("router")
+logger.info(f"Starting shard router for {settings.WORKER_COUNT} workers")
+
+app = FastAPI()
+_client = httpx.AsyncClient(timeout=30.0)
+_create_worker = itertools.cycle(range(settings.WORKER_COUNT))
+
+# Hop-by-hop headers must not be forwarded by a proxy
+_HOP_HEADERS = {
+    "connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+    "te", "trailers", "transfer-encoding", "upgrade", "host", "content-length",
+}
+
+
+def _worker_for(method: str, path: str) -> int:
+    room_id = room_from_path(path)
+    if room_id is not None:
+        return owner(room_id)
+    if method == "POST" and path.rstrip("/") == "/api/v1/rooms":
+        return next(_create_worker)
+    return 0
+
+
+@app.on_event("shutdown")
+async def _close_client():
+    await _client.aclose()
+    flush_logging()
+
+
+@app.websocket("/api/v1/ws/{room_id}/{player_id}")
+async def proxy_ws(ws: WebSocket, room_id: str, player_id: str):
+    worker = owner(room_id)
+    url = f"ws://{worker_address(worker)}{ws.url.path}"
+    if ws.url.query:
+        url += f"?{ws.url.query}"
+    try:
+        upstream = await websockets.connect(url, max_size=None, ping_interval=None)
+    except Exception as e:
+        logger.error(f"Cannot reach worker {worker} for room {room_id}: {e}")
+        await ws.close(code=1011)
+        return
+    await ws.accept()
+    logger.debug(f"Proxying WebSocket for {player_id} in room {room_id} to worker {worker}")
+
+    async def client_to_worker():
+        try:
+            while True:
+                message = await ws.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+                if message.get("text") is not None:
+                    await upstream.send(message["text"])
+                elif message.get("bytes") is not None:
+                    await upstream.send(message["bytes"])
+        except WebSocketDisconnect:
+            pass
+        finally:
+            await upstream.close()
+
+    async def worker_to_client():
+        try:
+            async for message in upstream:
+                if isinstance(message, bytes):
+                    await ws.send_bytes(message)
+                else:
+                    await ws.send_text(message)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            try:
+                await ws.close(code=upstream.close_code or 1000)
+            except Exception:
+                pass  # client already gone
+
+    tasks = [asyncio.create_task(client_to_worker()), asyncio.create_task(worker_to_client())]
+    await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    for task in tasks:
+        task.cancel()
+
+
+@app.api_route("/{path:path}", methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"])
+async def proxy_http(request: Request, path: str):
+    worker = _worker_for(request.method, request.url.path)
+    url = f"http://{worker_address(worker)}{request.url.path}"
+    headers = {k: v for k, v in request.headers.items() if k.lower() not in _HOP_HEADERS}
+    try:
+        upstream = await _client.request(
+            request.method, url,
+            params=request.query_params,
+            headers=headers,
+            content=await request.body(),
+        )
+    except httpx.HTTPError as e:
+        logger.error(f"Cannot reach worker {worker} for {request.method} {request.url.path}: {e}")
+        return Response(status_code=502)
+    return Response(
+        content=upstream.content,
+        status_code=upstream.status_code,
+        headers={k: v for k, v in upstream.headers.items() if k.lower() not in _HOP_HEADERS | {"content-encoding"}},
+    )
@@ -0,0 +1,76 @@
+"""
+Room affinity for running several backend processes.
+
+Every room is owned by exactly one worker, chosen by rendezvous hashing of the
+room id, so a room's Game and its WebSocket connections always live in the
+same process. `shard_router.py` forwards requests to the owner; the
+`RoomShardGuard` middleware rejects anything that reaches the wrong worker.
+"""
+from __future__ import annotations
+import hashlib
+import re
+from typing import Optional
+
+from config import settings
+
+# Paths that belong to a room: /api/v1/rooms/{room_id}/... and /api/v1/ws/{room_id}/...
+_ROOM_PATH = re.compile(r"^/api/v1/(?:rooms/([^/]+)/|ws/([^/]+))")
+
+# Close code for a WebSocket that reached a worker not owning its room
+MISDIRECTED_CLOSE_CODE = 4421
+
+
+def room_from_path(path: str) -> Optional[str]:
+    match = _ROOM_PATH.match(path)
+    if match is None:
+        return None
+    return match.group(1) or match.group(2)
+
+
+def _score(worker: int, room_id: str) -> int:
+    digest = hashlib.blake2b(f"{worker}:{room_id}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def owner(room_id: str, worker_count: int | None = None) -> int:
+    """Index of the worker owning `room_id` (highest random weight hashing)"""
+    count = worker_count if worker_count is not None else settings.WORKER_COUNT
+    if count <= 1:
+        return 0
+    return max(range(count), key=lambda w: _score(w, room_id))
+
+
+def worker_address(index: int) -> str:
+    return f"{settings.WORKER_HOST}:{settings.WORKER_BASE_PORT + index}"
+
+
+def is_local(room_id: str) -> bool:
+    return owner(room_id) == settings.WORKER_INDEX
+
+
+class RoomShardGuard:
+    """
+    ASGI middleware for workers: requests for a room owned by another worker
+    get 421 (HTTP) or close code 4421 (WebSocket) instead of silently creating
+    a second copy of the room here.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if settings.WORKER_COUNT > 1 and scope["type"] in ("http", "websocket"):
+            room_id = room_from_path(scope["path"])
+            if room_id is not None and not is_local(room_id):
+                if scope["type"] == "websocket":
+                    await send({"type": "websocket.close", "code": MISDIRECTED_CLOSE_CODE})
+                    return
+                body = b'{"detail":"Room is owned by another worker"}'
+                await send({
+                    "type": "http.response.start",
+                    "status": 421,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+import copy
+from collections import deque
+from typing import Any, Deque, List, Optional, Tuple
+
+
+def _escape(key: Any) -> str:
+    # JSON pointer escaping (RFC 6901)
+    return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def diff_state(old: Any, new: Any, path: str = "") -> List[dict]:
+    """
+    Build a JSON-patch style list of operations turning `old` into `new`.
+    Dicts are diffed key by key; lists and scalars are replaced wholesale.
+    """
+    if old == new:
+        return []
+    if not isinstance(old, dict) or not isinstance(new, dict):
+        return [{"op": "replace", "path": path, "value": new}]
+
+    ops: List[dict] = []
+    for key in old:
+        if key not in new:
+            ops.append({"op": "remove", "path": f"{path}/{_escape(key)}"})
+    for key, value in new.items():
+        child = f"{path}/{_escape(key)}"
+        if key not in old:
+            ops.append({"op": "add", "path": child, "value": value})
+        elif old[key] != value:
+            ops.extend(diff_state(old[key], value, child))
+    return ops
+
+
+def apply_patch(doc: Any, ops: List[dict]) -> Any:
+    """Apply operations from `diff_state` to a copy of `doc` (what a delta client does)"""
+    doc = copy.deepcopy(doc)
+    for op in ops:
+        keys = [k.replace("~1", "/").replace("~0", "~") for k in op["path"].split("/")[1:]]
+        if not keys:
+            doc = op["value"]
+            continue
+        node = doc
+        for key in keys[:-1]:
+            node = node[key]
+        if op["op"] == "remove":
+            del node[keys[-1]]
+        else:
+            node[keys[-1]] = op["value"]
+    return doc
+
+
+class StateTracker:
+    """
+    Keeps the last committed state snapshot, a monotonically increasing
+    version and a bounded history of patches between consecutive versions.
+    """
+
+    def __init__(self, history: int = 32):
+        self.version = 0
+        self.snapshot: Optional[dict] = None
+        self._patches: Deque[Tuple[int, List[dict]]] = deque(maxlen=history)
+        self._floor = 0  # oldest version patches can still be computed from
+
+    def commit(self, state: dict, version: Optional[int] = None) -> int:
+        """
+        Record a new snapshot. Without `version` the tracker bumps its own version
+        when something changed; with it, the snapshot is filed under that version
+        (used by trackers that follow another tracker's numbering).
+        """
+        if self.snapshot is None:
+            self.snapshot = state
+            self.version = version if version is not None else self.version + 1
+            self._floor = self.version
+            return self.version
+
+        ops = diff_state(self.snapshot, state)
+        if ops:
+            new_version = version if version is not None else self.version + 1
+            if len(self._patches) == self._patches.maxlen:
+                self._floor = self._patches[0][0]
+            self._patches.append((new_version, ops))
+            self.snapshot = state
+            self.version = new_version
+        elif version is not None:
+            self.version = version
+        return self.version
+
+    def patches_since(self, version: Optional[int]) -> Optional[List[dict]]:
+        """
+        Return the combined operations taking a client from `version` to the
+        current version, or None if the history no longer covers that gap.
+        """
+        if version is None or version > self.version or version < self._floor:
+            return None
+        ops: List[dict] = []
+        for v, patch in self._patches:
+            if v > version:
+                ops.extend(patch)
+        return ops
@@ -0,0 +1,109 @@
+"""
+Game keeps its seat/team/card/table counters (room_index.py) current
+incrementally; these tests play seeded games with verify_counters on and
+compare what Game's read helpers report with a recount over the state.
+"""
+from __future__ import annotations
+
+import pytest
+from loguru import logger
+
+from bots import Knowledge, next_to_act, view_for
+from cards import SET_INDEX
+from game import Game
+from room_index import TEAMS
+from tools.simulate import MAX_ACTIONS, POLICIES, apply, check_invariants
+
+SEEDS = range(1, 9)
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    logger.disable("")
+    yield
+    logger.enable("")
+
+
+def _recount(game: Game) -> dict:
+    s = game.state
+    held = {pid: game.hand_mask(pid).bit_count() for pid in s.players}
+    teams = {t: {pid for pid, p in s.players.items() if p.team == t} for t in TEAMS}
+    claimed = 0
+    for ts in s.table_sets:
+        claimed |= 1 << SET_INDEX[(ts.suit, ts.set_type)]
+    return {
+        "claimed": claimed,
+        "card_count": {pid: n for pid, n in held.items() if n},
+        "members": teams,
+        "holding": {t: {pid for pid in members if held[pid]} for t, members in teams.items()},
+        "team_cards": {t: sum(held[pid] for pid in members) for t, members in teams.items()},
+        "sets_won": {t: sum(ts.owner_team == t for ts in s.table_sets) for t in TEAMS},
+    }
+
+
+def _counters(game: Game) -> dict:
+    return {
+        "claimed": game.claimed_sets(),
+        "card_count": {pid: game.cards_held(pid) for pid in game.players_with_cards()},
+        "members": {t: set(game.team_members(t)) for t in TEAMS},
+        "holding": {t: set(game.players_with_cards(t)) for t in TEAMS},
+        "team_cards": {t: game.team_cards(t) for t in TEAMS},
+        "sets_won": {t: game.sets_won(t) for t in TEAMS},
+    }
+
+
+def _assert_counters(game: Game):
+    assert _counters(game) == _recount(game)
+
+
+def _seated_game(seed: int) -> Game:
+    game = Game(f"counters-{seed}", seed=seed)
+    game.verify_counters = True
+    for i in range(6):
+        game.add_ai_player(f"p{i}", f"P{i}", "🤖", "AB"[i % 2])
+    return game
+
+
+@pytest.mark.parametrize("policy", sorted(POLICIES))
+@pytest.mark.parametrize("seed", SEEDS)
+def test_counters_follow_a_game(seed: int, policy: str):
+    game = _seated_game(seed)
+    game.start()
+    choose = POLICIES[policy]
+    knowledge = Knowledge()
+    for _ in range(MAX_ACTIONS):
+        if game.state.phase == "ended":
+            break
+        bot_id = next_to_act(game)
+        assert bot_id is not None, f"nobody can move in phase {game.state.phase}"
+        try:
+            apply(game, knowledge, choose(view_for(game, bot_id, knowledge)))
+        except ValueError:
+            pass  # rejected by the rules; counters must not have moved either
+        check_invariants(game)
+        _assert_counters(game)
+    assert game.state.phase == "ended"
+    assert game.claimed_sets() == (1 << len(SET_INDEX)) - 1
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_counters_survive_replay(seed: int):
+    game = _seated_game(seed)
+    game.start()
+    game.shuffle_deal_new_game(game.state.current_dealer)
+    replayed = Game.replay(game.state.room_id, game.events.events, seed=seed)
+    assert _counters(replayed) == _counters(game) == _recount(replayed)
+
+
+def test_counters_follow_players_leaving():
+    game = Game("counters-lobby", seed=1)
+    game.verify_counters = True
+    for i in range(4):
+        game.join(f"p{i}", f"P{i}", "🙂")
+        game.select_seat(f"p{i}", i, "AB"[i % 2])
+    game.remove_from_seat("p1")
+    _assert_counters(game)
+    game.player_disconnected("p2")
+    game.remove_disconnected_players()
+    assert "p2" not in game.state.players
+    _assert_counters(game)
@@ -0,0 +1,76 @@
+"""
+Micro-benchmark for the room lookups in room_index.py: times a vote round and
+choosing the next player after an empty-handed target, in a seated 6-player
+game watched by a growing number of spectators.
+
+Uses only Game's public actions, so the same script runs against older trees
+for comparison.
+
+    cd backend && python -m tools.bench_index
+    python -m tools.bench_index --spectators 0 100 5000 --rounds 5000
+"""
+from __future__ import annotations
+import argparse
+import time
+from typing import Callable, List
+
+from loguru import logger
+
+from cards import to_cards
+from game import Game
+
+
+def _room(spectators: int) -> Game:
+    game = Game("bench", seed=1)
+    for i in range(6):
+        pid = f"p{i}"
+        game.join(pid, pid, "🙂")
+        game.select_seat(pid, i, "AB"[i % 2])
+    game.start()
+    for i in range(spectators):
+        game.join(f"s{i}", f"s{i}", "👀")
+    game.shuffle_deal_new_game(game.state.current_dealer)
+    return game
+
+
+def _per_call_us(fn: Callable[[], None], rounds: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench(spectators: int, rounds: int) -> List[float]:
+    game = _room(spectators)
+
+    def vote_round():
+        # Team A asks and agrees, then team B refuses: counts run after every ballot
+        game.request_abort("p0")
+        game.vote_abort("p2", True)
+        game.vote_abort("p1", False)
+
+    # p1 (team B) hands everything to p0, so a NO from p1 must skip to a teammate with cards
+    game.pass_cards("p1", "p0", to_cards(game.hand_mask("p1")))
+
+    def turn_selection():
+        game.confirm_pass("p0", "p1", [])
+
+    return [_per_call_us(vote_round, rounds), _per_call_us(turn_selection, rounds)]
+
+
+def main(argv: List[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spectators", type=int, nargs="+", default=[0, 10, 100, 1000])
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    print(f"{'spectators':>10} {'vote round µs':>14} {'next turn µs':>13}")
+    for n in args.spectators:
+        vote_us, turn_us = bench(n, args.rounds)
+        print(f"{n:>10} {vote_us:>14.1f} {turn_us:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
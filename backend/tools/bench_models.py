@@ -0,0 +1,129 @@
+"""
+Benchmark for the room state classes: the slotted ones Game works on
+(room_state.py) against the pydantic models (models/) holding the same room
+the way Game used to, with hands as lists of the shared Card instances.
+
+Reports memory per room (Python allocations for the state objects, measured
+with tracemalloc over --rooms copies), the time to dump the state to a
+JSON-ready dict, and to dump and encode it as commit_state and the socket
+layer do. The room is a dealt 6-seat game with two sets claimed, watched by
+--spectators spectators.
+
+    cd backend && python -m tools.bench_models
+    python -m tools.bench_models --rooms 2000 --spectators 0 50
+"""
+from __future__ import annotations
+import argparse
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+from loguru import logger
+
+import models
+from cards import set_mask, to_cards
+from encoding import dumps
+from game import Game
+from room_state import RoomState
+
+
+def _room(spectators: int) -> Game:
+    game = Game("bench", seed=1)
+    for i in range(6):
+        pid = f"p{i}"
+        game.join(pid, pid, "🙂")
+        game.select_seat(pid, i, "AB"[i % 2])
+    game.start()
+    for i in range(spectators):
+        game.join(f"s{i}", f"s{i}", "👀")
+    game.shuffle_deal_new_game(game.state.current_dealer)
+    for suit in ("hearts", "spades"):
+        game._claim_set(suit, "lower", set_mask(suit, "lower"), "A")  # sizes only: the cards stay in hands too
+    return game
+
+
+def as_pydantic(state: RoomState) -> models.RoomState:
+    """The same state as pydantic models, cards as shared Card instances (cards.to_cards)"""
+    return models.RoomState(
+        room_id=state.room_id,
+        players={
+            pid: models.Player(
+                id=p.id, name=p.name, avatar=p.avatar, team=p.team, seat=p.seat, hand=to_cards(p.hand),
+                connected=p.connected, is_spectator=p.is_spectator,
+                spectator_request_pending=p.spectator_request_pending, is_ai=p.is_ai, stand_in=p.stand_in,
+            )
+            for pid, p in state.players.items()
+        },
+        seats=dict(state.seats),
+        team_scores=dict(state.team_scores),
+        table_sets=[
+            models.TableSet(suit=ts.suit, set_type=ts.set_type, cards=to_cards(ts.cards), owner_team=ts.owner_team)
+            for ts in state.table_sets
+        ],
+        phase=state.phase,
+        turn_player=state.turn_player,
+        ask_chain_from=state.ask_chain_from,
+        deck_count=state.deck_count,
+        current_dealer=state.current_dealer,
+        abort_votes=dict(state.abort_votes),
+        lobby_locked=state.lobby_locked,
+        back_to_lobby_votes=dict(state.back_to_lobby_votes),
+        admin_player_id=state.admin_player_id,
+        spectator_requests=dict(state.spectator_requests),
+    )
+
+
+def _bytes_per_room(build: Callable[[], Any], rooms: int) -> float:
+    build()  # warm up (caches, interned strings)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = [build() for _ in range(rooms)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return (after - before) / rooms
+
+
+def _per_call_us(fn: Callable[[], Any], rounds: int) -> float:
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1e6
+
+
+def bench(spectators: int, rooms: int, rounds: int) -> List[List[float]]:
+    state = _room(spectators).state
+    snapshot = state.to_dict()
+    pyd = as_pydantic(state)
+    assert pyd.model_dump(mode="json") == snapshot, "pydantic and slotted states differ"
+    return [
+        [
+            _bytes_per_room(lambda: as_pydantic(state), rooms),
+            _per_call_us(lambda: pyd.model_dump(mode="json"), rounds),
+            _per_call_us(lambda: dumps(pyd.model_dump(mode="json")), rounds),
+        ],
+        [
+            _bytes_per_room(lambda: RoomState.from_dict(snapshot), rooms),
+            _per_call_us(state.to_dict, rounds),
+            _per_call_us(lambda: dumps(state.to_dict()), rounds),
+        ],
+    ]
+
+
+def main(argv: List[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--spectators", type=int, nargs="+", default=[0, 10])
+    parser.add_argument("--rooms", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    logger.remove()
+    print(f"{'spectators':>10} {'model':>9} {'KB/room':>8} {'dump µs':>8} {'dump+encode µs':>15}")
+    for n in args.spectators:
+        for name, (size, dump_us, encode_us) in zip(("pydantic", "slotted"), bench(n, args.rooms, args.rounds)):
+            print(f"{n:>10} {name:>9} {size / 1024:>8.1f} {dump_us:>8.1f} {encode_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+"""
+WebSocket load test: many simulated clients playing real games against a
+backend, over the same HTTP and WebSocket protocol the frontend uses.
+
+Each room gets 6 clients that join over HTTP, connect a WebSocket, take a
+seat, start and deal, then play with the server bot policy (bots.decide) on
+their own view of the state, answering asks aimed at them with confirm_pass.
+Finished games are dealt again until the run ends.
+
+Reported as one JSON object: p50/p99 action-to-broadcast latency per message
+type (time from a client sending an action to that client receiving the first
+broadcast it causes), bytes and frames received per action, and the server's
+CPU and RSS sampled from /proc (when it runs on this host).
+
+    cd backend && python -m tools.loadtest --rooms 200 --duration 60 > before.json
+    python -m tools.loadtest --url http://127.0.0.1:8000 --server-pid 1234 --rooms 50
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+import httpx
+import websockets
+
+from bots import BotView, Knowledge, decide, mask_of_dicts
+from state_sync import apply_patch
+
+# First broadcast each action causes, and the payload field naming the sender
+# (None: any). The sender's latency is measured up to that broadcast.
+RESPONSE = {
+    "select_seat": ("state", None),
+    "start": ("game_started", None),
+    "shuffle_deal": ("new_game_started", "dealer_id"),
+    "ask": ("ask_started", "asker_id"),
+    "confirm_pass": ("ask_result", "target_id"),
+    "laydown": ("laydown_started", "who_id"),
+    "handoff_after_laydown": ("handoff_result", "from_id"),
+}
+
+
+class Client:
+    """One simulated player: a socket, its view of the room, and its pending actions"""
+
+    def __init__(self, room: "Room", seat: int, rng: random.Random):
+        self.room = room
+        self.seat = seat
+        self.pid = f"{room.room_id}-p{seat}"
+        self.rng = rng
+        self.ws = None
+        self.state: Optional[dict] = None
+        self.updates = 0  # state updates received
+        self.sent: Dict[str, List[float]] = {}  # awaited response type -> send times
+        self.busy = False  # a move is being sent
+        self.asking = False  # an ask of ours is not answered yet
+        self.acted_at = -1  # `updates` when we last moved
+
+    async def send(self, type_: str, payload: dict):
+        self.sent.setdefault(RESPONSE[type_][0], []).append(time.perf_counter())
+        self.room.stats["actions"] += 1
+        await self.ws.send(json.dumps({"type": type_, "payload": payload}))
+
+    def _on_state(self, msg: dict):
+        payload = msg.get("payload")
+        full = payload if msg["type"] == "state" else payload.get("state") if isinstance(payload, dict) else None
+        if full is not None:
+            self.state = full
+        elif "state_patch" in msg and self.state is not None:
+            self.state = apply_patch(self.state, msg["state_patch"]["ops"])
+        else:
+            return
+        self.updates += 1
+
+    async def run(self, url: str, query: str, until: float):
+        self.ws = await websockets.connect(f"{url}/api/v1/ws/{self.room.room_id}/{self.pid}?{query}", max_size=None, ping_interval=None)
+        await self.send("select_seat", {"player_id": self.pid, "seat": self.seat, "team": "AB"[self.seat % 2]})
+        try:
+            while time.perf_counter() < until:
+                try:
+                    raw = await asyncio.wait_for(self.ws.recv(), timeout=max(0.01, until - time.perf_counter()))
+                except asyncio.TimeoutError:
+                    break
+                self.room.stats["bytes"] += len(raw)
+                self.room.stats["frames"] += 1
+                frame = json.loads(raw)
+                for msg in frame["payload"] if frame["type"] == "batch" else [frame]:
+                    await self._handle(msg)
+        except websockets.ConnectionClosed:
+            self.room.stats["errors"] += 1
+        finally:
+            await self.ws.close()
+
+    async def _handle(self, msg: dict):
+        now = time.perf_counter()
+        t = msg["type"]
+        payload = msg.get("payload") if isinstance(msg.get("payload"), dict) else {}
+        if t == "ping":
+            await self.ws.send(json.dumps({"type": "pong", "payload": payload}))
+            return
+        pending = self.sent.get(t)
+        if pending and self._caused_by_me(t, payload):
+            self.room.latencies.setdefault(t, []).append(now - pending.pop(0))
+        self._on_state(msg)
+        if self.seat == 0:
+            self.room.knowledge.observe(t, payload)  # one client per room keeps the public knowledge
+        if t == "ask_pending" and payload.get("target_id") == self.pid:
+            await self.send("confirm_pass", {
+                "asker_id": payload["asker_id"], "target_id": self.pid, "cards": payload.get("pending_cards") or [],
+                "suit": payload.get("suit"), "ranks": payload.get("ranks") or [],
+            })
+        elif t == "ask_result" and payload.get("asker_id") == self.pid:
+            self.asking = False
+        elif t in ("laydown_result", "cards_passed") and (payload.get("game_end") or {}).get("game_ended"):
+            self.room.stats["games"] += self.seat == 0
+        self._maybe_act()
+
+    def _caused_by_me(self, t: str, payload: dict) -> bool:
+        for response, field in RESPONSE.values():
+            if response == t:
+                return field is None or payload.get(field) == self.pid
+        return False
+
+    def _maybe_act(self):
+        s = self.state
+        if s is None or self.busy or self.asking or self.acted_at == self.updates:
+            return
+        if self.seat == 0 and s["phase"] == "lobby" and all(s["seats"].values()) and not self.room.started:
+            self.room.started = True
+            decision = ("start", {})
+        elif s["phase"] == "ended" and s.get("current_dealer") == self.pid:
+            decision = ("shuffle_deal", {"dealer_id": self.pid})
+        else:
+            decision = decide(self._view(s))
+        if decision is None:
+            return
+        self.acted_at = self.updates
+        self.busy = True
+        self.asking = decision[0] == "ask"
+        asyncio.create_task(self._act(*decision))
+
+    async def _act(self, type_: str, payload: dict):
+        """Send a move after the think delay, without holding up this client's reads"""
+        await asyncio.sleep(self.room.think)
+        try:
+            await self.send(type_, payload)
+        except websockets.ConnectionClosed:
+            pass
+        self.busy = False
+
+    def _view(self, s: dict) -> BotView:
+        k = self.room.knowledge
+        players = s["players"]
+        seated = [pid for pid in s["seats"].values() if pid]
+        return BotView(
+            me=self.pid, seed=self.rng.getrandbits(64), phase=s["phase"], turn_player=s.get("turn_player"),
+            dealer=s.get("current_dealer"), hand=mask_of_dicts(players[self.pid]["hand"]),
+            teams={pid: players[pid]["team"] for pid in seated},
+            counts={pid: players[pid].get("hand_count", len(players[pid]["hand"])) for pid in seated},
+            holds=dict(k.holds), lacks=dict(k.lacks), asked_sets=dict(k.asked_sets), out=k.out,
+            vote_back_to_lobby=False, vote_abort=False,
+        )
+
+
+class Room:
+    def __init__(self, room_id: str, think: float, stats: Dict[str, int], latencies: Dict[str, List[float]]):
+        self.room_id = room_id
+        self.think = think
+        self.stats = stats
+        self.latencies = latencies
+        self.knowledge = Knowledge()
+        self.started = False
+
+
+async def run_rooms(url: str, rooms: int, query: str, duration: float, ramp: float, think: float, seed: int) -> dict:
+    stats = {"actions": 0, "bytes": 0, "frames": 0, "games": 0, "errors": 0}
+    latencies: Dict[str, List[float]] = {}
+    ws_url = url.replace("http", "ws", 1)
+    until = time.perf_counter() + ramp + duration
+    rng = random.Random(seed)
+
+    async with httpx.AsyncClient(base_url=url, timeout=30.0) as http:
+        async def one_room(i: int):
+            await asyncio.sleep(ramp * i / max(rooms, 1))
+            try:
+                room_id = (await http.post("/api/v1/rooms/")).json()["room_id"]
+                room = Room(room_id, think, stats, latencies)
+                clients = [Client(room, seat, random.Random(rng.getrandbits(64))) for seat in range(6)]
+                for c in clients:
+                    await http.post(f"/api/v1/rooms/{room_id}/players", json={"id": c.pid, "name": c.pid, "avatar": "🤖"})
+                await asyncio.gather(*(c.run(ws_url, query, until) for c in clients))
+            except (httpx.HTTPError, OSError, websockets.WebSocketException):
+                stats["errors"] += 1
+
+        await asyncio.gather(*(one_room(i) for i in range(rooms)))
+    return {"stats": stats, "latencies": latencies}
+
+
+def _run_process(args: tuple) -> dict:
+    return asyncio.run(run_rooms(*args))
+
+
+class ServerMonitor(threading.Thread):
+    """Samples a process's CPU time and RSS from /proc once a second"""
+
+    def __init__(self, pid: int):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.samples: List[tuple] = []  # (wall time, cpu seconds, rss bytes)
+        self._done = threading.Event()
+
+    def _read(self) -> Optional[tuple]:
+        try:
+            with open(f"/proc/{self.pid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            with open(f"/proc/{self.pid}/statm") as f:
+                rss_pages = int(f.read().split()[1])
+        except OSError:
+            return None
+        ticks = os.sysconf("SC_CLK_TCK")
+        return time.perf_counter(), (int(fields[11]) + int(fields[12])) / ticks, rss_pages * os.sysconf("SC_PAGE_SIZE")
+
+    def run(self):
+        while not self._done.wait(1.0):
+            sample = self._read()
+            if sample and sample[2]:  # a process that is exiting reports no resident pages
+                self.samples.append(sample)
+
+    def stop(self) -> dict:
+        self._done.set()
+        self.join()
+        if len(self.samples) < 2:
+            return {}
+        cpu = [100 * (b[1] - a[1]) / (b[0] - a[0]) for a, b in zip(self.samples, self.samples[1:])]
+        return {
+            "cpu_percent_avg": round(sum(cpu) / len(cpu), 1),
+            "cpu_percent_peak": round(max(cpu), 1),
+            "rss_mb_peak": round(max(s[2] for s in self.samples) / 2**20, 1),
+            "rss_mb_end": round(self.samples[-1][2] / 2**20, 1),
+        }
+
+
+def start_server(port: int) -> subprocess.Popen:
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=backend, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for _ in range(100):
+        if server.poll() is not None:
+            raise RuntimeError(f"Server exited with {server.returncode} (is port {port} in use?)")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/v1/rooms/health").status_code == 200:
+                return server
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def _percentiles(values: List[float]) -> dict:
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+    pick = lambda q: round(1000 * values[min(len(values) - 1, int(q * len(values)))], 2)
+    return {"count": len(values), "p50_ms": pick(0.5), "p99_ms": pick(0.99), "max_ms": round(1000 * values[-1], 2)}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rooms", type=int, default=50, help="rooms to play (6 clients each)")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to play after the ramp-up")
+    parser.add_argument("--ramp", type=float, default=5.0, help="seconds over which rooms are opened")
+    parser.add_argument("--think-ms", type=float, default=50.0, help="client delay before each move")
+    parser.add_argument("--sync", default="delta", choices=["full", "delta"])
+    parser.add_argument("--batch", action="store_true", help="negotiate batched frames")
+    parser.add_argument("--procs", type=int, default=1, help="client processes to spread rooms over")
+    parser.add_argument("--url", help="test a running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="pid to sample CPU/RSS from with --url")
+    parser.add_argument("--port", type=int, default=8790)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args(argv)
+
+    # Every client holds a socket, and so does the server for each of them
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    server = None
+    url, pid = args.url, args.server_pid
+    if url is None:
+        server = start_server(args.port)
+        url, pid = f"http://127.0.0.1:{args.port}", server.pid
+    monitor = ServerMonitor(pid) if pid else None
+    if monitor:
+        monitor.start()
+
+    query = f"sync={args.sync}&batch={int(args.batch)}"
+    procs = max(1, min(args.procs, args.rooms))
+    jobs = [
+        (url, args.rooms // procs + (i < args.rooms % procs), query, args.duration, args.ramp, args.think_ms / 1000, args.seed + i)
+        for i in range(procs)
+    ]
+    start = time.perf_counter()
+    try:
+        if procs == 1:
+            results = [_run_process(jobs[0])]
+        else:
+            with ProcessPoolExecutor(max_workers=procs) as pool:
+                results = list(pool.map(_run_process, jobs))
+    finally:
+        elapsed = time.perf_counter() - start
+        server_stats = monitor.stop() if monitor else {}
+        if server:
+            server.terminate()
+            server.wait()
+
+    stats = {k: sum(r["stats"][k] for r in results) for k in results[0]["stats"]}
+    latencies: Dict[str, List[float]] = {}
+    for r in results:
+        for t, values in r["latencies"].items():
+            latencies.setdefault(t, []).extend(values)
+    actions = max(stats["actions"], 1)
+    report = {
+        "config": {"rooms": args.rooms, "clients": 6 * args.rooms, "duration_s": args.duration, "ramp_s": args.ramp,
+                   "think_ms": args.think_ms, "sync": args.sync, "batch": args.batch, "procs": procs},
+        "elapsed_s": round(elapsed, 2),
+        "actions": stats["actions"],
+        "actions_per_sec": round(stats["actions"] / elapsed, 1),
+        "games_completed": stats["games"],
+        "errors": stats["errors"],
+        "bytes_received": stats["bytes"],
+        "frames_received": stats["frames"],
+        "bytes_per_action": round(stats["bytes"] / actions, 1),
+        "frames_per_action": round(stats["frames"] / actions, 2),
+        "latency": {"all": _percentiles([v for vs in latencies.values() for v in vs]),
+                    **{t: _percentiles(vs) for t, vs in sorted(latencies.items())}},
+        "server": server_stats,
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
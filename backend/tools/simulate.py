@@ -0,0 +1,238 @@
+"""
+Headless self-play: runs complete 6-seat games directly against `Game`, with no
+server or sockets, across a process pool.
+
+Reports games/sec, actions/sec and a latency histogram per engine method, and
+checks the engine's invariants after every action, so it doubles as the
+regression benchmark for engine changes and as a rule fuzzer. A failing game
+is reported with its seed; rerunning with `--seed <seed> --games 1` replays it
+exactly.
+
+    cd backend && python -m tools.simulate --games 2000 --policy bot
+    python -m tools.simulate --games 500 --policy random --json
+
+With VERIFY_COUNTERS=1 the engine also checks its incremental counters
+against a full recompute after every action (slower; a drift fails the game).
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from loguru import logger
+
+from bots import CARD_SET, HALF_SUITS, BotView, Decision, Knowledge, decide, mask_of_dicts, next_to_act, view_for
+from cards import CARD_RANK, FULL_DECK_MASK, ids_of, to_cards
+from game import POINTS, Game
+
+TIMED_METHODS = ["prepare_ask", "confirm_pass", "laydown", "pass_cards", "handoff_after_laydown", "check_game_end", "shuffle_deal_new_game"]
+MAX_ACTIONS = 5000  # a game still running after this many actions is reported as stuck
+PASS_CHANCE = 0.05  # how often the random policy gifts a card to an opponent
+
+# Latencies are bucketed by bit length of the duration in ns: bucket b holds [2^(b-1), 2^b) ns
+Histogram = List[int]
+HIST_BUCKETS = 40
+
+
+def _timed(method: Callable, hist: Histogram) -> Callable:
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter_ns()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            hist[min((time.perf_counter_ns() - start).bit_length(), HIST_BUCKETS - 1)] += 1
+    return wrapper
+
+
+def random_decision(view: BotView) -> Optional[Decision]:
+    """Any legal-looking move, chosen at random (exercises paths the bot policy avoids)"""
+    rng = random.Random(view.seed)
+    if view.phase == "ready" and view.dealer == view.me:
+        return "shuffle_deal", {"dealer_id": view.me}
+    my_team = view.teams.get(view.me)
+    others = [pid for pid, n in view.counts.items() if pid != view.me and n > 0]
+    opponents = [pid for pid in others if view.teams.get(pid) != my_team]
+    team = [pid for pid in others if view.teams.get(pid) == my_team]
+    if view.phase != "playing":
+        return None
+    if view.turn_player != view.me or not view.hand:
+        return decide(view)  # handoffs and end-of-game laydowns
+    cards = ids_of(view.hand)
+    if opponents and rng.random() < PASS_CHANCE:
+        cid = rng.choice(cards)
+        return "pass_cards", {"from_player_id": view.me, "to_player_id": rng.choice(opponents), "cards": [cid]}
+    if opponents and rng.random() < 0.9:
+        cid = rng.choice(cards)
+        suit, set_type, ranks = _half_suit(cid)
+        return "ask", {"asker_id": view.me, "target_id": rng.choice(opponents), "suit": suit, "set_type": set_type, "ranks": [rng.choice(ranks)]}
+    suit, set_type, ranks = _half_suit(rng.choice(cards))
+    collaborators = [{"player_id": pid, "ranks": ranks} for pid in team]
+    return "laydown", {"who_id": view.me, "suit": suit, "set_type": set_type, "collaborators": collaborators}
+
+
+def _half_suit(cid: int):
+    for suit, set_type, m in HALF_SUITS:
+        if m == CARD_SET[cid]:
+            return suit, set_type, [CARD_RANK[c] for c in ids_of(m)]
+    raise ValueError(cid)
+
+
+POLICIES: Dict[str, Callable[[BotView], Optional[Decision]]] = {"bot": decide, "random": random_decision}
+
+
+def apply(game: Game, knowledge: Knowledge, decision: Decision):
+    """Apply a decision the way the WebSocket handler does, feeding knowledge the same public results"""
+    t, p = decision
+    if t == "ask":
+        knowledge.observe("ask_started", p)
+        res = game.prepare_ask(p["asker_id"], p["target_id"], p["suit"], p["set_type"], p["ranks"])
+        if res.get("reason") == "target_empty":
+            return
+        res = game.confirm_pass(p["asker_id"], p["target_id"], to_cards(mask_of_dicts(res.get("pending_cards"))))
+        knowledge.observe("ask_result", {**p, "transferred": res.get("transferred", []), "reason": res.get("reason")})
+    elif t == "laydown":
+        knowledge.observe("laydown_result", game.laydown(p["who_id"], p["suit"], p["set_type"], p["collaborators"]))
+    elif t == "pass_cards":
+        cards = to_cards(sum(1 << c for c in p["cards"]))
+        knowledge.observe("cards_passed", game.pass_cards(p["from_player_id"], p["to_player_id"], cards))
+    elif t == "handoff_after_laydown":
+        game.handoff_after_laydown(p["who_id"], p["to_id"])
+    elif t == "shuffle_deal":
+        knowledge.observe("new_game_started", game.shuffle_deal_new_game(p["dealer_id"]))
+    else:
+        raise ValueError(f"Simulator cannot apply {t}")
+
+
+def check_invariants(game: Game):
+    """Raise AssertionError when the room is in a state the rules should make impossible"""
+    s = game.state
+    seen = 0
+    for pid in s.players:
+        hand = game.hand_mask(pid)
+        assert not hand & seen, f"card held twice ({pid})"
+        seen |= hand
+    table = 0
+    for ts in s.table_sets:
+        table |= ts.cards
+    assert not seen & table, "card both in a hand and on the table"
+    if s.phase in ("playing", "ended"):
+        assert seen | table == FULL_DECK_MASK, "cards lost"
+    scores = {"A": 0, "B": 0}
+    for ts in s.table_sets:
+        scores[ts.owner_team] += POINTS[ts.set_type]
+    assert scores == s.team_scores, f"scores {s.team_scores} do not match the table {scores}"
+    if s.phase == "playing":
+        assert s.turn_player in s.players, "no turn player"
+
+
+def play_game(seed: int, policy: str, hists: Dict[str, Histogram]) -> dict:
+    """Play one game to the end; returns counters and, if a rule broke, the error"""
+    game = Game(f"sim-{seed}", seed=seed)
+    for i in range(6):
+        game.add_ai_player(f"p{i}", f"P{i}", "🤖", "AB"[i % 2])
+    game.start()
+    for name in TIMED_METHODS:
+        setattr(game, name, _timed(getattr(game, name), hists[name]))
+    choose = POLICIES[policy]
+    knowledge = Knowledge()
+    actions = 0
+    try:
+        while game.state.phase != "ended":
+            bot_id = next_to_act(game)
+            decision = choose(view_for(game, bot_id, knowledge)) if bot_id else None
+            if decision is None:
+                raise AssertionError(f"nobody can move (phase {game.state.phase}, turn {game.state.turn_player})")
+            try:
+                apply(game, knowledge, decision)
+            except ValueError:
+                pass  # rejected by the rules, like a bad client message
+            actions += 1
+            check_invariants(game)
+            if actions >= MAX_ACTIONS:
+                raise AssertionError(f"still playing after {actions} actions")
+    except AssertionError as e:
+        return {"seed": seed, "actions": actions, "error": str(e), "events": len(game.events.events)}
+    return {"seed": seed, "actions": actions, "error": None, "scores": dict(game.state.team_scores)}
+
+
+def run_batch(seeds: List[int], policy: str) -> dict:
+    """Play games for `seeds` in this process; returns merged counters and histograms"""
+    logger.remove()
+    hists = {name: [0] * HIST_BUCKETS for name in TIMED_METHODS}
+    results = [play_game(seed, policy, hists) for seed in seeds]
+    return {
+        "games": len(results),
+        "actions": sum(r["actions"] for r in results),
+        "failures": [r for r in results if r["error"]],
+        "hists": hists,
+    }
+
+
+def percentile_us(hist: Histogram, q: float) -> float:
+    """Upper bound (µs) of the bucket holding the q-th quantile"""
+    total = sum(hist)
+    if not total:
+        return 0.0
+    running = 0
+    for b, n in enumerate(hist):
+        running += n
+        if running >= q * total:
+            return (1 << b) / 1000
+    return (1 << (len(hist) - 1)) / 1000
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="bot")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--seed", type=int, default=1, help="seed of the first game; game i uses seed + i")
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of a table")
+    args = parser.parse_args(argv)
+
+    seeds = [args.seed + i for i in range(args.games)]
+    workers = max(1, min(args.workers, args.games))
+    chunks = [seeds[i::workers] for i in range(workers)]
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        batches = list(pool.map(run_batch, chunks, [args.policy] * workers))
+    elapsed = time.perf_counter() - start
+
+    games = sum(b["games"] for b in batches)
+    actions = sum(b["actions"] for b in batches)
+    failures = [f for b in batches for f in b["failures"]]
+    hists = {name: [sum(col) for col in zip(*(b["hists"][name] for b in batches))] for name in TIMED_METHODS}
+    report = {
+        "policy": args.policy,
+        "workers": workers,
+        "games": games,
+        "seconds": round(elapsed, 3),
+        "games_per_sec": round(games / elapsed, 1),
+        "actions_per_sec": round(actions / elapsed, 1),
+        "failures": failures,
+        "methods": {
+            name: {"calls": sum(h), "p50_us": percentile_us(h, 0.5), "p99_us": percentile_us(h, 0.99), "hist": h}
+            for name, h in hists.items()
+        },
+    }
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"{games} games ({args.policy} policy, {workers} workers) in {elapsed:.2f}s: "
+              f"{report['games_per_sec']} games/s, {report['actions_per_sec']} actions/s")
+        print(f"{'method':<24}{'calls':>10}{'p50 µs':>10}{'p99 µs':>10}")
+        for name, m in report["methods"].items():
+            print(f"{name:<24}{m['calls']:>10}{m['p50_us']:>10.1f}{m['p99_us']:>10.1f}")
+        for f in failures:
+            print(f"FAILED seed {f['seed']} after {f['actions']} actions: {f['error']}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
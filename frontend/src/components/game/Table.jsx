@@ -259,7 +259,7 @@ export default function Table() {
     return () => window.removeEventListener('lay_anim', onLayAnim);
   }, []);
 
-  const handCount = (pid) => (players[pid]?.hand?.length ?? 0);
+  const handCount = (pid) => (players[pid]?.hand_count ?? players[pid]?.hand?.length ?? 0);
 
   const setSeatRef = (playerId) => (el) => {
     if (!playerId || !el) return;
@@ -731,6 +731,31 @@ export const useStore = create((set, get) => ({
       get().showToast("success", "Player Reconnected", `${playerName} has reconnected`);
     }
 
+    // BOT STANDS IN for a player who stayed disconnected past the grace period
+    if (msg.type === "bot_stand_in") {
+      const s = msg.payload.state;
+      set({ state: s });
+      const playerName = msg.payload.player_name || "Unknown";
+      get().setGameMessage("BOT STANDS IN", [
+        `${playerName} is still disconnected`,
+        "A bot plays their seat until they reconnect"
+      ]);
+      get().showToast("info", "Bot Stands In", `A bot is playing for ${playerName}`);
+    }
+
+    // TURN TIMEOUT - turn passed to an opponent
+    if (msg.type === "turn_timeout") {
+      const s = msg.payload.state;
+      set({ state: s });
+      const players = s.players || {};
+      const playerName = players[msg.payload.player_id]?.name || msg.payload.player_name || "Unknown";
+      const nextName = players[msg.payload.next_turn]?.name || "the next player";
+      get().setGameMessage("TURN TIMED OUT", [
+        `${playerName} ran out of time`,
+        `Turn passes to ${nextName}`
+      ]);
+    }
+
     // GAME STARTED - trigger navigation for all players
     if (msg.type === "game_started") {
       const s = msg.payload.state;
@@ -1,19 +1,103 @@
 import { WS_BASE } from './config.js';
 
-export function connectWS(roomId, playerId, onMessage) {
-    const ws = new WebSocket(`/api/v1/ws/${roomId}/${playerId}`);
-    
+// Apply JSON-patch style ops (add/remove/replace) without mutating `doc`,
+// so store subscribers still see a new state object.
+function applyPatch(doc, ops) {
+  let root = doc;
+  for (const op of ops) {
+    const keys = op.path.split('/').slice(1).map(k => k.replace(/~1/g, '/').replace(/~0/g, '~'));
+    if (keys.length === 0) {
+      root = op.value;
+      continue;
+    }
+    root = Array.isArray(root) ? [...root] : { ...root };
+    let node = root;
+    for (const key of keys.slice(0, -1)) {
+      node[key] = Array.isArray(node[key]) ? [...node[key]] : { ...node[key] };
+      node = node[key];
+    }
+    const last = keys[keys.length - 1];
+    if (op.op === 'remove') delete node[last];
+    else node[last] = op.value;
+  }
+  return root;
+}
+
+// Rebuild full state for messages sent in delta sync mode, so the store
+// keeps receiving `payload.state` exactly as in full mode.
+function createStateSync(getSocket) {
+  let state = null;
+  let version = null;
+
+  const resolve = (msg) => {
+    if (msg.state_version === undefined) return msg;
+
+    const full = msg.type === 'state' ? msg.payload : msg.payload?.state;
+    if (full) {
+      state = full;
+    } else if (msg.state_patch) {
+      if (state && msg.state_patch.base === version) {
+        state = applyPatch(state, msg.state_patch.ops);
+      } else {
+        send(getSocket(), 'resync', { version });
+        return msg.type === 'state' ? null : { ...msg, payload: { ...msg.payload, state } };
+      }
+    } else if (msg.state_version !== version) {
+      send(getSocket(), 'resync', { version });
+      return msg.type === 'state' ? null : { ...msg, payload: { ...msg.payload, state } };
+    }
+    version = msg.state_version;
+
+    if (msg.type === 'state') return { ...msg, payload: state };
+    return { ...msg, payload: { ...msg.payload, state } };
+  };
+  return { resolve, version: () => (state ? version : null) };
+}
+
+// What survives a reconnect: the last message sequence number seen and the
+// rebuilt state, so the server only has to send what was missed.
+function createSession() {
+  const session = { ws: null, seq: null };
+  session.sync = createStateSync(() => session.ws);
+  return session;
+}
+
+export function connectWS(roomId, playerId, onMessage, session = createSession()) {
+    let url = `/api/v1/ws/${roomId}/${playerId}?sync=delta&batch=1`;
+    if (session.seq !== null) {
+      url += `&resume=${session.seq}`;
+      if (session.sync.version() !== null) url += `&version=${session.sync.version()}`;
+    }
+    const ws = new WebSocket(url);
+    session.ws = ws;
+
+    const dispatch = (raw) => {
+      if (raw.seq !== undefined) session.seq = raw.seq;
+      const msg = session.sync.resolve(raw);
+      if (msg) onMessage(msg);
+    };
+
     ws.onmessage = (ev) => {
-      try { onMessage(JSON.parse(ev.data)); } catch {}
+      try {
+        const data = JSON.parse(ev.data);
+        // Server heartbeat: a socket that stops answering is closed and reaped
+        if (data.type === 'ping') {
+          send(ws, 'pong', data.payload);
+          return;
+        }
+        // Messages produced in the same server tick arrive together
+        if (data.type === 'batch') data.payload.forEach(dispatch);
+        else dispatch(data);
+      } catch {}
     };
-    
+
     ws.onclose = (event) => {
       // If the connection was closed unexpectedly (not a clean close), attempt to reconnect
       if (event.code !== 1000 && event.code !== 1001) {
         console.log('WebSocket connection lost, attempting to reconnect...');
         setTimeout(() => {
           // Attempt to reconnect after 3 seconds
-          const newWs = connectWS(roomId, playerId, onMessage);
+          const newWs = connectWS(roomId, playerId, onMessage, session);
           // Replace the old WebSocket reference
           if (window.currentWS) {
             window.currentWS = newWs;
@@ -25,15 +109,14 @@ export function connectWS(roomId, playerId, onMessage) {
         }, 3000);
       }
     };
-    
+
     ws.onerror = (error) => {
       console.error('WebSocket error:', error);
     };
-    
+
     return ws;
   }
-  
+
   export function send(ws, type, payload) {
     ws?.readyState === 1 && ws.send(JSON.stringify({ type, payload }));
   }
-  
\ No newline at end of file